@@ -0,0 +1,149 @@
+import threading
+from time import perf_counter
+
+
+
+###################### Tick Barrier ######################
+
+# The barrier every creature thread waits at between timesteps. Creatures join
+# it when they start and leave it when they die, so births and deaths in the
+# middle of a tick only change a counter and never have to look at the species
+# lists. Each tick has a "generation" with its own Event. The last creature to
+# arrive swaps in the Event for the next generation and sets the old one,
+# which wakes every waiter at once without handing a lock from thread to
+# thread. The action (which may wait to keep to the tick rate, see TickPacer)
+# runs after the lock is released.
+class TickBarrier:
+    def __init__(self, action=None, lock=None):
+        """
+        Initializes a TickBarrier class object
+
+        Args:
+        - action (function): Called by the last creature to arrive, before
+        anyone is released, with the total time creatures spent waiting this
+        tick and the time the first arrival waited for the last one.
+        - lock: The lock to use (e.g. a ProfiledLock). Defaults to a new
+        threading.Lock.
+
+        """
+        self.action = action
+        self.lock = lock if lock is not None else threading.Lock()
+        self.parties = 0
+        self.arrived = 0
+        self.generation = 0
+        self.release_event = threading.Event()
+        # set while the last arrival runs the action so that a creature
+        # leaving at the same time can't end the tick a second time
+        self.tripping = False
+        self.broken = False
+        # wait-time accounting. We only store the number of waiters, the sum
+        # of their arrival times and the first arrival time. That is enough to
+        # work out how long everyone waited once the last creature arrives
+        self.arrival_sum = 0.0
+        self.first_arrival = None
+        self.last_wait = 0.0
+        self.last_straggler_wait = 0.0
+
+    def join(self):
+        """
+        Adds a creature to the barrier. Creatures that join in the middle of
+        a tick have to arrive before that tick can end.
+
+        """
+        with self.lock:
+            self.parties += 1
+
+    def leave(self):
+        """
+        Removes a creature from the barrier. If everyone else already arrived
+        the leaving creature ends the tick for them.
+
+        """
+        with self.lock:
+            self.parties -= 1
+            last = (not self.tripping and self.arrived > 0 and
+                    self.arrived >= self.parties)
+            if last:
+                # every creature that arrived is waiting on us
+                event = self._startTrip(self.arrived)
+        if last:
+            self._trip(event)
+
+    def wait(self):
+        """
+        Waits until every creature in the barrier has arrived.
+
+        """
+        with self.lock:
+            if self.broken:
+                return
+            now = perf_counter()
+            self.arrived += 1
+            if self.arrived < self.parties or self.tripping:
+                # remember when we arrived for the wait-time accounting
+                self.arrival_sum += now
+                if self.first_arrival is None:
+                    self.first_arrival = now
+                event = self.release_event
+                last = False
+            else:
+                # everyone but us is waiting
+                event = self._startTrip(self.arrived - 1)
+                last = True
+        if last:
+            self._trip(event)
+        else:
+            event.wait()
+
+    def _startTrip(self, waiters):
+        """
+        Marks the tick as ending. Must be called while holding the lock.
+
+        Args:
+        - waiters (int): The number of creatures waiting to be released.
+
+        Returns:
+        - threading.Event: The event the waiters of this tick are waiting on.
+
+        """
+        self.tripping = True
+        now = perf_counter()
+        # everyone waited from when they arrived until now
+        wait_time = max(waiters * now - self.arrival_sum, 0.0)
+        straggler_wait = 0.0
+        if self.first_arrival is not None:
+            straggler_wait = now - self.first_arrival
+        self.last_wait = wait_time
+        self.last_straggler_wait = straggler_wait
+        return self.release_event
+
+    def _trip(self, event):
+        """
+        Ends the tick and releases every waiting creature. Called without the
+        lock by whoever ended the tick.
+
+        Args:
+        - event (threading.Event): The event of the tick that is ending.
+
+        """
+        if self.action is not None:
+            self.action(self.last_wait, self.last_straggler_wait)
+        with self.lock:
+            self.arrived = 0
+            self.arrival_sum = 0.0
+            self.first_arrival = None
+            self.generation += 1
+            self.release_event = threading.Event()
+            self.tripping = False
+        event.set()
+
+    def abort(self):
+        """
+        Releases every waiting creature and makes any later wait() return
+        immediately. Used when the simulation ends.
+
+        """
+        with self.lock:
+            self.broken = True
+            event = self.release_event
+        event.set()
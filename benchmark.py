@@ -0,0 +1,414 @@
+import argparse
+import itertools
+import json
+import math
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime
+from time import perf_counter
+
+
+
+# Every scenario is run in its own python process, in a World built from the
+# command line of that scenario. That way the peak memory we report is only
+# the memory of that one scenario and nothing one scenario leaves behind (like
+# the sharded engine's processes) slows down the next.
+
+###################### Scenarios ######################
+
+# the simulation arguments for each scenario. --rabbits can't be 0 so the
+# plants-only scenario still has a single rabbit
+SCENARIOS = {
+    'plants-only': ['--plants', '400', '--rabbits', '1'],
+    'rabbit-heavy': ['--plants', '200', '--rabbits', '300'],
+    'predation': ['--plants', '200', '--rabbits', '150', '--foxes', '30'],
+    'large-map': ['--width', '1500', '--height', '1000', '--plants', '400',
+                  '--rabbits', '300', '--foxes', '300'],
+    'large-world': ['--large-world'],
+}
+
+# the scenarios run when --scenarios isn't given. The large world is too big
+# for anything but --engine vector so it's only run when asked for
+DEFAULT_SCENARIOS = ['plants-only', 'rabbit-heavy', 'predation', 'large-map']
+
+# the world the microbenchmarks run in
+MICRO_ARGS = ['--plants', '200', '--rabbits', '100', '--foxes', '20']
+
+# how long each microbenchmark runs for, in seconds
+MICRO_TIME = 0.2
+
+# how many children the batched mutation microbenchmark makes per call
+MUTATE_BATCH = 100
+
+
+
+
+###################### Helper Functions ######################
+
+def percentile(values, p):
+    """
+    Finds a percentile of a list of values (nearest rank).
+
+    Args:
+    - values (list): The values.
+    - p (float): The percentile, between 0 and 100.
+
+    Returns:
+    - float: The value at that percentile, or None if there are no values.
+
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+def peak_rss_kb():
+    """
+    Returns:
+    - int: The peak memory (resident set size) of this process or any of its
+    children in kilobytes.
+
+    """
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # macOS reports bytes, linux reports kilobytes
+    if sys.platform == 'darwin':
+        peak //= 1024
+    return peak
+
+def simulation_argv(scenario_args, engine, ticks, seed):
+    """
+    Builds the command line the simulation sees for a benchmark run.
+
+    Returns:
+    - list: The arguments.
+
+    """
+    return (['--headless', '--engine', engine,
+             '--ticks', str(ticks), '--seed', str(seed)] + scenario_args)
+
+def build_world(argv):
+    """
+    Args:
+    - argv (list): The simulation's command line.
+
+    Returns:
+    - World: A new world set up from the command line.
+
+    """
+    from global_stuff import parse_args
+    from world import World
+    return World(parse_args(argv))
+
+def time_op(op):
+    """
+    Runs a function over and over for about MICRO_TIME seconds.
+
+    Args:
+    - op (function): The function to time. Takes no arguments.
+
+    Returns:
+    - dict: Nanoseconds per call and calls per second.
+
+    """
+    count = 1
+    while True:
+        start = perf_counter()
+        for _ in range(count):
+            op()
+        elapsed = perf_counter() - start
+        if elapsed >= MICRO_TIME:
+            break
+        count *= 2
+    return {'calls': count,
+            'ns_per_op': elapsed / count * 1e9,
+            'ops_per_sec': count / elapsed}
+
+
+
+
+###################### Benchmark Processes ######################
+
+def run_scenario(name, engine, ticks, seed):
+    """
+    Runs one scenario in this process and prints its results as JSON. Must
+    be run in a fresh process (see the top of this file).
+
+    """
+    import simulation
+    world = build_world(simulation_argv(SCENARIOS[name], engine, ticks, seed))
+    stats_collector = world.stats_collector
+
+    # time every tick by noting when each one is recorded. The sharded engine
+    # records its ticks in the tile processes so it only gets a tick rate
+    tick_ends = []
+    record_tick = stats_collector.record_tick
+    def timed_record_tick(*args):
+        record_tick(*args)
+        tick_ends.append(perf_counter())
+    stats_collector.record_tick = timed_record_tick
+
+    start = perf_counter()
+    simulation.main(report=False, world=world)
+    wall_time = perf_counter() - start
+
+    starts = [stats_collector.start_counter] + tick_ends[:-1]
+    latencies = [end - begin for begin, end in zip(starts, tick_ends)]
+    p50 = percentile(latencies, 50)
+    p99 = percentile(latencies, 99)
+    print(json.dumps({
+        'args': SCENARIOS[name],
+        'ticks': stats_collector.ticks,
+        'ticks_per_sec': stats_collector.ticks_per_second(),
+        'p50_tick_ms': p50 * 1000 if p50 is not None else None,
+        'p99_tick_ms': p99 * 1000 if p99 is not None else None,
+        'peak_rss_kb': peak_rss_kb(),
+        'wall_time_s': wall_time,
+    }))
+
+def run_micro(seed):
+    """
+    Times some of the functions the simulation spends most of its time in,
+    on their own, and prints the results as JSON.
+
+    """
+    import simulation
+    from gene import Gene
+    from genome import np, genome_table, mutate_genomes
+    from stats_collector import StatsCollector
+
+    # build the world but don't start it
+    world = build_world(simulation_argv(MICRO_ARGS, 'threads', 1, seed))
+    simulation.populate_world(world)
+    view = world.world_view.current
+    all_rabbits = itertools.cycle(world.rabbits)
+    all_plants = itertools.cycle(world.plants)
+    priorities = [(rabbit, rabbit.generatePriorityList())
+                  for rabbit in world.rabbits]
+    all_priorities = itertools.cycle(priorities)
+    gene = Gene(world.rabbitStartingGenes)
+    collector = StatsCollector(world.n_rabbits, world.n_plants,
+                               world.n_foxes, world.rabbitSpeed,
+                               world.fearFactor, world.hungerFactor)
+
+    def find_closest():
+        next(all_rabbits).findClosest(view.plants)
+
+    def find_movement_vector():
+        rabbit, points = next(all_priorities)
+        rabbit.findMovementVector(rabbit.size_step, points)
+
+    def gen_new_position():
+        next(all_plants).genNewPosition(world.minPlantDistance,
+                                        world.maxPlantDistance, view.plants)
+        # forget the spot we claimed so every call sees the same world
+        view.plants.birth_spots.clear()
+
+    def child_gene():
+        gene.childGene(world.sim_random)
+
+    # the vector engine mutates every child born in a tick at once. Time a
+    # tick with MUTATE_BATCH births to compare with as many childGene calls
+    if np is not None:
+        parents = genome_table([gene] * MUTATE_BATCH)
+        np_rng = np.random.default_rng(seed)
+    def batch_mutate():
+        mutate_genomes(parents, np_rng)
+
+    def log_event():
+        plant = next(all_plants)
+        collector.log_event('New plant born', plant)
+
+    results = {
+        'findClosest': time_op(find_closest),
+        'findMovementVector': time_op(find_movement_vector),
+        'genNewPosition': time_op(gen_new_position),
+        'Gene.childGene': time_op(child_gene),
+        'StatsCollector.log_event': time_op(log_event),
+    }
+    if np is not None:
+        results['mutate_genomes x%d' % MUTATE_BATCH] = time_op(batch_mutate)
+    print(json.dumps(results))
+
+def run_child(child_args):
+    """
+    Runs this file again in a new process and reads the JSON it prints.
+
+    Args:
+    - child_args (list): Arguments for the new process.
+
+    Returns:
+    - dict: The results printed by the new process.
+
+    """
+    result = subprocess.run([sys.executable, __file__] + child_args,
+                            stdin=subprocess.DEVNULL, capture_output=True,
+                            text=True)
+    if result.returncode != 0:
+        raise RuntimeError("benchmark process failed:\n" + result.stderr)
+    # the results are the last thing printed
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+
+
+###################### Comparing Runs ######################
+
+def find_regressions(results, baseline, threshold):
+    """
+    Compares a benchmark run against an earlier one.
+
+    Args:
+    - results (dict): The results of this run.
+    - baseline (dict): The results of the earlier run.
+    - threshold (float): How much worse (as a fraction) a number has to be
+    to count as a regression.
+
+    Returns:
+    - list: A description of every regression found.
+
+    """
+    regressions = []
+
+    def check(name, metric, new, old, higher_is_better):
+        if new is None or old is None or old == 0:
+            return
+        change = (new - old) / old
+        if higher_is_better:
+            change = -change
+        if change > threshold:
+            regressions.append(f'{name} {metric}: {old:.4g} -> {new:.4g} '
+                               f'({change:+.1%} worse)')
+
+    for name, new in results.get('scenarios', {}).items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        check(name, 'ticks_per_sec', new['ticks_per_sec'],
+              old['ticks_per_sec'], True)
+        check(name, 'p99_tick_ms', new['p99_tick_ms'], old['p99_tick_ms'],
+              False)
+        check(name, 'peak_rss_kb', new['peak_rss_kb'], old['peak_rss_kb'],
+              False)
+    for name, new in results.get('micro', {}).items():
+        old = baseline.get('micro', {}).get(name)
+        if old is None:
+            continue
+        check(name, 'ns_per_op', new['ns_per_op'], old['ns_per_op'], False)
+    return regressions
+
+def print_results(results):
+    """
+    Prints a benchmark run as a table.
+
+    """
+    def fmt(value):
+        return '-' if value is None else f'{value:.3f}'
+
+    if results['scenarios']:
+        print(f"{'scenario':<16}{'ticks':>8}{'ticks/s':>12}{'p50 ms':>10}"
+              f"{'p99 ms':>10}{'peak MB':>10}")
+    for name, r in results['scenarios'].items():
+        print(f"{name:<16}{r['ticks']:>8}{r['ticks_per_sec']:>12.1f}"
+              f"{fmt(r['p50_tick_ms']):>10}{fmt(r['p99_tick_ms']):>10}"
+              f"{r['peak_rss_kb'] / 1024:>10.1f}")
+    if results['micro']:
+        print(f"\n{'microbenchmark':<28}{'ns/op':>12}{'ops/s':>14}")
+    for name, r in results['micro'].items():
+        print(f"{name:<28}{r['ns_per_op']:>12.0f}{r['ops_per_sec']:>14.0f}")
+
+
+
+
+###################### Main ######################
+
+def main():
+    parser = argparse.ArgumentParser(description=
+                                "Benchmark the simulation and save the results.")
+    parser.add_argument('--engine', default='threads',
+                        choices=['threads', 'pool', 'vector', 'sharded'],
+                        help="Engine to run the scenarios with")
+    parser.add_argument('--ticks', type=int, default=500,
+                        help="Ticks to run each scenario for")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="Seed so runs start from the same world")
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS),
+                        help="Comma separated scenarios to run")
+    parser.add_argument('--no-micro', action='store_true',
+                        help="Skip the microbenchmarks")
+    parser.add_argument('--output', default='benchmark.json',
+                        help="Where to save the results as JSON")
+    parser.add_argument('--compare', metavar='BASELINE',
+                        help="""Results of an earlier run. Numbers that got
+                                worse by more than --threshold are flagged
+                                and the exit status is 1""")
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help="Fraction a number may get worse by")
+    # used when this file runs itself for a single scenario
+    parser.add_argument('--run-scenario', help=argparse.SUPPRESS)
+    parser.add_argument('--run-micro', action='store_true',
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        run_scenario(args.run_scenario, args.engine, args.ticks, args.seed)
+        return
+    if args.run_micro:
+        run_micro(args.seed)
+        return
+
+    names = [name for name in args.scenarios.split(',') if name]
+    for name in names:
+        if name not in SCENARIOS:
+            parser.error("unknown scenario %s (choose from %s)" %
+                         (name, ', '.join(SCENARIOS)))
+
+    results = {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'engine': args.engine,
+        'ticks': args.ticks,
+        'seed': args.seed,
+        'scenarios': {},
+        'micro': {},
+    }
+    for name in names:
+        print("running", name, file=sys.stderr)
+        results['scenarios'][name] = run_child(
+            ['--run-scenario', name, '--engine', args.engine,
+             '--ticks', str(args.ticks), '--seed', str(args.seed)])
+    if not args.no_micro:
+        print("running microbenchmarks", file=sys.stderr)
+        results['micro'] = run_child(['--run-micro', '--seed',
+                                      str(args.seed)])
+
+    regressions = []
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        regressions = find_regressions(results, baseline, args.threshold)
+        results['compared_to'] = args.compare
+        results['regressions'] = regressions
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+
+    print_results(results)
+    if args.compare:
+        print()
+        if regressions:
+            print("REGRESSIONS:")
+            for regression in regressions:
+                print("  " + regression)
+        else:
+            print("No regressions against", args.compare)
+    sys.exit(1 if regressions else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+import os
+
+
+
+# How big a world can get used to be capped by hard limits on the starting
+# populations and the canvas, sized for one thread per creature. Now the
+# limits come from what the engine can afford instead: an estimate of the
+# memory a run needs at its biggest (--memory-budget) and of how fast it
+# will tick (--min-tick-rate). The costs below were measured headless on one
+# core (python 3.11) with 3k and 12k creatures on a 4000x4000 canvas, so they
+# are rough, but they're good enough to turn away runs that would swap or
+# crawl before they start.
+
+###################### Engine Costs ######################
+
+# bytes of memory each creature takes, microseconds of each tick it takes
+# with 1000 creatures, and how fast that grows with the population. Every
+# creature thread fights over the GIL and the barrier so a tick of the
+# threads engine gets slower with the square of the population on top
+ENGINE_COSTS = {
+    'threads': (19000, 4.3, 2),
+    'pool': (4500, 12, 0),
+    'vector': (4700, 2.5, 0),
+    'sharded': (7000, 20, 0),
+}
+
+# memory of the interpreter and the modules the simulation imports
+BASE_MB = 40
+# memory of each tile process of the sharded engine
+TILE_MB = 40
+
+def default_memory_budget():
+    """
+    Returns:
+    - int: Half of the machine's memory in MB, or 4096 if we can't tell how
+    much it has.
+
+    """
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 4096
+    return max(total // 2 ** 21, 1)
+
+def peak_population(args, parameters):
+    """
+    Finds the most creatures a run can have at once: every species starts
+    with its starting population and can grow up to its cap.
+
+    Args:
+    - args (argparse.Namespace): The options of the run.
+    - parameters (dict): The simulation parameters of the run.
+
+    Returns:
+    - int: The number of creatures.
+
+    """
+    return (max(args.plants, parameters['maxPlants']) +
+            max(args.rabbits, parameters['maxRabbits']) +
+            max(args.foxes, parameters['maxFoxes']))
+
+def estimate_cost(engine, creatures, tiles=1):
+    """
+    Estimates what a run costs.
+
+    Args:
+    - engine (str): The engine the run uses.
+    - creatures (int): How many creatures there are.
+    - tiles (int): Number of tiles for the sharded engine.
+
+    Returns:
+    - tuple: The memory needed in MB and the seconds each tick takes.
+
+    """
+    creature_bytes, micros, growth = ENGINE_COSTS[engine]
+    memory = BASE_MB + creatures * creature_bytes / 2 ** 20
+    seconds = micros * creatures * (creatures / 1000) ** growth / 1e6
+    if engine == 'sharded':
+        memory += tiles * TILE_MB
+        # the tiles only run side by side as far as there are cores
+        seconds /= max(min(tiles, os.cpu_count() or 1), 1)
+    return memory, seconds
+
+def check_budget(args, parameters):
+    """
+    Checks that a run fits in --memory-budget and --min-tick-rate.
+
+    Args:
+    - args (argparse.Namespace): The options of the run.
+    - parameters (dict): The simulation parameters of the run.
+
+    Returns:
+    - str: What's over budget, or None if the run fits.
+
+    """
+    creatures = peak_population(args, parameters)
+
+    def fits(engine):
+        memory, seconds = estimate_cost(engine, creatures, args.tiles)
+        return (memory <= args.memory_budget and
+                seconds * args.min_tick_rate <= 1)
+
+    if fits(args.engine):
+        return None
+    memory, seconds = estimate_cost(args.engine, creatures, args.tiles)
+    if memory > args.memory_budget:
+        problem = ("would need about %d MB, more than --memory-budget %d" %
+                   (memory, args.memory_budget))
+    else:
+        problem = ("would run at about %.2g ticks per second, less than "
+                   "--min-tick-rate %g" % (1 / seconds, args.min_tick_rate))
+    message = ("with --engine %s, up to %d creatures (the starting "
+               "populations or maxPlants, maxRabbits and maxFoxes) %s" %
+               (args.engine, creatures, problem))
+    # the vector and sharded engines only run headless
+    better = [engine for engine in ENGINE_COSTS if engine != args.engine and
+              (args.headless or engine in ('threads', 'pool')) and
+              fits(engine)]
+    if better:
+        message += "; try --engine %s" % ' or '.join(better)
+    return message
@@ -0,0 +1,302 @@
+import argparse
+import random
+import sys
+import numpy as np
+import simulation
+from gene import Gene
+from genome import GENE_FIELDS, genome_table, mutate_genomes
+from global_stuff import parse_args
+from scheduler import TickScheduler
+from vector_engine import (VectorWorld, fox_pursuit_vectors,
+                           rabbit_movement_vectors)
+from world import World
+
+
+
+# The vector engine is meant to move, feed and starve creatures exactly like
+# the creature objects of the other engines do, only for every creature at
+# once. This runs both on the same seeded world and fails if they disagree:
+#
+#   $ python3 check_engines.py
+#
+# The engines don't share their random numbers, so anything random (births,
+# foxes wandering) is left out and the checks stick to what both engines
+# work out from the same world: where every creature moves to, what it eats,
+# how much health it has and when it dies and is removed.
+#
+# It also checks that mutate_genomes, which the vector engine makes the genes
+# of every child born in a tick with, mutates them like Gene.childGene does
+# when both are given the same random numbers.
+
+###################### Settings ######################
+
+# how far apart positions and health may be and still count as the same
+TOLERANCE = 1e-6
+
+# the world the ticks are compared in. Births are turned off as they are
+# random
+TICK_ARGS = ['--plants', '300', '--rabbits', '150', '--foxes', '20']
+TICK_PARAMETERS = {'plantRate': 0, 'rabbitRate': 0, 'foxRate': 0}
+
+# the world the movement of a single tick is compared in, with enough foxes
+# that some of them run from each other instead of chasing rabbits
+MOVE_ARGS = ['--plants', '200', '--rabbits', '100', '--foxes', '100']
+
+# how many parents mutate_genomes makes children for in one go
+GENOME_BATCH = 500
+
+
+
+
+###################### Helper Functions ######################
+
+# Hands out a list of numbers between 0 and 1 in order, for uniform() to
+# scale. childGene takes one number per gene and mutate_genomes takes one per
+# parent for each gene, so the same list gives both the same mutations if
+# it's handed to childGene a gene at a time (see check_genomes)
+class ReplayRandom:
+    def __init__(self, numbers):
+        """
+        Initializes a ReplayRandom class object
+
+        Args:
+        - numbers (list): The numbers to hand out.
+
+        """
+        self.numbers = iter(numbers)
+
+    def uniform(self, low, high, size=None):
+        """
+        Takes the next number (or size numbers) and scales it between low
+        and high, like random.Random.uniform or np.random.Generator.uniform.
+
+        """
+        if size is None:
+            return low + (high - low) * next(self.numbers)
+        numbers = np.array([next(self.numbers) for _ in range(size)])
+        return low + (high - low) * numbers
+
+def random_gene(rng):
+    """
+    Makes a gene with every value picked at random, some of them past the
+    limits mutation keeps them in so clamping gets checked too.
+
+    Args:
+    - rng (random.Random): Where to get the random numbers from.
+
+    Returns:
+    - Gene: The gene.
+
+    """
+    return Gene([rng.uniform(0, 2), rng.uniform(0, 4000),
+                 rng.uniform(0, 12000), rng.uniform(0, 3), 0.004,
+                 rng.uniform(-10, 300), rng.uniform(0, 120),
+                 rng.uniform(0, 120), rng.uniform(0, 120),
+                 (rng.uniform(0, 300), rng.uniform(0, 300),
+                  rng.uniform(0, 300)),
+                 100, rng.randint(1, 50)])
+
+def build_world(argv, seed, parameters=None):
+    """
+    Builds and populates a world. The creatures are nudged off the whole
+    numbers they start on: there, two plants are often exactly as far from a
+    rabbit and each engine is free to pick a different one.
+
+    Args:
+    - argv (list): The simulation's command line.
+    - seed (int): Seed for the world and the nudges.
+    - parameters (dict): Simulation parameters to change.
+
+    Returns:
+    - tuple: The world and every creature in it, in the order to step them
+    in.
+
+    """
+    world = World(parse_args(['--headless', '--seed', str(seed)] + argv),
+                  parameters)
+    creatures = simulation.populate_world(world)
+    nudge = random.Random(seed)
+    for creature in creatures:
+        creature.position = [creature.position[0] + nudge.random(),
+                             creature.position[1] + nudge.random()]
+    world.publish_snapshot()
+    return world, creatures
+
+def compare(name, expected, actual):
+    """
+    Compares what the object engine and the vector engine came up with.
+
+    Args:
+    - name (str): What is being compared, for the message.
+    - expected (np.ndarray): The object engine's numbers.
+    - actual (np.ndarray): The vector engine's numbers, the same shape.
+
+    Returns:
+    - str: What's different, or None if they're the same.
+
+    """
+    if expected.shape != actual.shape:
+        return "%s: %d in the object engine, %d in the vector engine" % (
+            name, len(expected), len(actual))
+    off = ~np.isclose(expected, actual, rtol=0, atol=TOLERANCE)
+    if off.ndim > 1:
+        off = off.any(axis=1)
+    if not off.any():
+        return None
+    first = np.flatnonzero(off)[0]
+    return "%s: %d differ, e.g. #%d is %s instead of %s" % (
+        name, off.sum(), first, actual[first].tolist(),
+        expected[first].tolist())
+
+
+
+
+###################### Checks ######################
+
+def check_movement(seed):
+    """
+    Moves every rabbit and fox once from the same world with the creature
+    objects (moveForSurvival) and with the vector engine's kernels.
+
+    Args:
+    - seed (int): Seed for the world.
+
+    Returns:
+    - list: What's different.
+
+    """
+    world, _ = build_world(MOVE_ARGS, seed)
+    vector = VectorWorld.from_creatures(world)
+    problems = []
+
+    expected = np.array([rabbit.moveForSurvival()[:2]
+                         for rabbit in world.rabbits])
+    genome = vector.rabbit_genome
+    dx, dy, _ = rabbit_movement_vectors(
+        vector.rabbit_pos, genome['speed'], genome['hungerFactor'],
+        genome['fearFactor'], genome['avoidOthersFactor'], vector.plant_pos,
+        vector.fox_pos, world.rabbitRadius)
+    actual = vector.rabbit_pos + np.column_stack([dx, dy])
+    problems.append(compare('rabbit moves', expected, actual))
+
+    # foxes with nothing to chase or run from wander at random
+    dx, dy, _, wander = fox_pursuit_vectors(
+        vector.fox_pos, vector.fox_speed, vector.rabbit_pos, world.avoidOthers)
+    expected = np.array([fox.moveForSurvival()[:2] for fox in world.foxes])
+    actual = vector.fox_pos + np.column_stack([dx, dy])
+    problems.append(compare('fox moves', expected[~wander], actual[~wander]))
+    return [problem for problem in problems if problem]
+
+def check_ticks(seed, ticks):
+    """
+    Runs the same world with the pool engine (on one worker) and the vector
+    engine and compares every creature after every tick, including the dead
+    ones that haven't been removed yet. Stops once the rabbits are gone as
+    the last fox left would only wander at random.
+
+    Args:
+    - seed (int): Seed for the world.
+    - ticks (int): Most ticks to run.
+
+    Returns:
+    - tuple: What's different and how many ticks were compared.
+
+    """
+    world, creatures = build_world(TICK_ARGS, seed, TICK_PARAMETERS)
+    vector = VectorWorld.from_creatures(world)
+    scheduler = TickScheduler(world, 1)
+    for creature in creatures:
+        scheduler.add(creature)
+
+    def columns(creatures, name):
+        return np.array([getattr(creature, name) for creature in creatures],
+                        dtype=float)
+
+    for tick in range(1, ticks + 1):
+        scheduler.runTick()
+        world.publish_snapshot()
+        vector.step()
+        problems = [
+            compare('rabbit positions',
+                    columns(world.rabbits, 'position').reshape(-1, 2),
+                    vector.rabbit_pos),
+            compare('rabbit health', columns(world.rabbits, 'health'),
+                    vector.rabbit_health),
+            compare('fox positions',
+                    columns(world.foxes, 'position').reshape(-1, 2),
+                    vector.fox_pos),
+            compare('fox health', columns(world.foxes, 'health'),
+                    vector.fox_health),
+            compare('plant positions',
+                    columns(world.plants, 'position').reshape(-1, 2),
+                    vector.plant_pos),
+        ]
+        problems = ["tick %d, %s" % (tick, problem)
+                    for problem in problems if problem]
+        if problems:
+            return problems, tick
+        if len(world.rabbits) == 0:
+            return [], tick
+    return [], ticks
+
+def check_genomes(seed):
+    """
+    Makes children for a batch of random parents with Gene.childGene, one at
+    a time, and with mutate_genomes, all at once, from the same random
+    numbers.
+
+    Args:
+    - seed (int): Seed for the parents and the random numbers.
+
+    Returns:
+    - list: What's different.
+
+    """
+    rng = random.Random(seed)
+    parents = [random_gene(rng) for _ in range(GENOME_BATCH)]
+    # the energy budget, fear, hunger, avoid others, the 3 colors and the
+    # starting health each take one number
+    numbers = [[rng.random() for _ in parents] for _ in range(8)]
+
+    expected = genome_table([
+        parent.childGene(ReplayRandom([gene[i] for gene in numbers]))
+        for i, parent in enumerate(parents)])
+    actual = mutate_genomes(genome_table(parents),
+                            ReplayRandom(np.concatenate(numbers)))
+    problems = [compare('child ' + name, expected[name].astype(float),
+                        actual[name].astype(float))
+                for name in GENE_FIELDS]
+    return [problem for problem in problems if problem]
+
+
+
+
+###################### Main ######################
+
+def main():
+    parser = argparse.ArgumentParser(description=
+                        "Check that the vector engine matches the others.")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="Seed for the worlds that are compared")
+    parser.add_argument('--ticks', type=int, default=1000,
+                        help="Most ticks to compare")
+    args = parser.parse_args()
+
+    problems = check_movement(args.seed)
+    print("movement:", "different" if problems else "same")
+    tick_problems, compared = check_ticks(args.seed, args.ticks)
+    print("ticks:", "different" if tick_problems else "same",
+          "(%d compared)" % compared)
+    problems += tick_problems
+    gene_problems = check_genomes(args.seed)
+    print("genes:", "different" if gene_problems else "same")
+    problems += gene_problems
+
+    for problem in problems:
+        print("  " + problem)
+    sys.exit(1 if problems else 0)
+
+
+
+if __name__ == "__main__":
+    main()
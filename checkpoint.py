@@ -0,0 +1,293 @@
+import json
+import os
+import struct
+import threading
+from array import array
+
+
+
+# A checkpoint holds everything needed to carry on a run of the threads or
+# pool engine: every creature (position, health, genes and the state of its
+# random number stream), the order the creatures are stepped in, the stats
+# collector's totals and its event log. Everything is stored as columns of
+# plain numbers, so taking a checkpoint never pickles a creature (or the
+# thread running it). Numbers are in the machine's own byte order, since a
+# checkpoint is meant to be resumed where it was taken:
+#
+#   preamble    PREAMBLE (16 bytes): MAGIC, VERSION and header length
+#   header      JSON with the tick, the run's parameters, the stats totals
+#               and the name, array typecode and length of every section,
+#               padded with spaces to a multiple of 8 bytes
+#   sections    one column after another, each padded to a multiple of 8
+#               bytes, in the order the header lists them
+#
+# Checkpoints are taken between ticks (see Checkpointer) and read back with
+# read_checkpoint().
+
+###################### Layout ######################
+
+MAGIC = b'FRPCKPT\n'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sII')
+
+# the numbers kept for each creature of a species, on top of the state of its
+# random number stream
+PLANT_FIELDS = ('x', 'y', 'foodValue', 'reproduceRate')
+GENE_FIELDS = ('mutationRate', 'metabolism', 'stomachSize', 'speed',
+               'reproduceRate', 'reproduceCutoff', 'fearFactor',
+               'hungerFactor', 'avoidOthersFactor', 'red', 'green', 'blue',
+               'startingHealth', 'generation')
+RABBIT_FIELDS = ('x', 'y', 'health') + GENE_FIELDS
+FOX_FIELDS = ('x', 'y', 'health')
+SPECIES = ('plant', 'rabbit', 'fox')
+
+# random.Random.getstate() is 624 words of Mersenne Twister state plus where
+# it is in them
+RNG_WORDS = 625
+
+
+def _align(n):
+    # round up to a multiple of 8 bytes
+    return (n + 7) // 8 * 8
+
+def _plant_values(plant):
+    return (plant.position[0], plant.position[1], plant.foodValue,
+            plant.reproduceRate)
+
+def _rabbit_values(rabbit):
+    genes = rabbit.genes
+    return (rabbit.position[0], rabbit.position[1], rabbit.health,
+            genes.mutationRate, genes.metabolism, genes.stomachSize,
+            genes.speed, genes.reproduceRate, genes.reproduceCutoff,
+            genes.fearFactor, genes.hungerFactor, genes.avoidOthersFactor,
+            *genes.color, genes.startingHealth, genes.generation)
+
+def _fox_values(fox):
+    return (fox.position[0], fox.position[1], fox.health)
+
+SPECIES_FIELDS = {'plant': (PLANT_FIELDS, _plant_values),
+                  'rabbit': (RABBIT_FIELDS, _rabbit_values),
+                  'fox': (FOX_FIELDS, _fox_values)}
+
+def creature_sections(species, creatures):
+    """
+    Packs one species into columns.
+
+    Args:
+    - species (str): One of SPECIES.
+    - creatures (list): The creatures of that species.
+
+    Returns:
+    - list: (name, array) for each field of SPECIES_FIELDS, then the random
+    number states ('<species>.rng', RNG_WORDS per creature) and their cached
+    gaussians ('<species>.gauss', nan if there is none).
+
+    """
+    fields, values = SPECIES_FIELDS[species]
+    columns = [array('d') for _ in fields]
+    rng = array('I')
+    gauss = array('d')
+    for creature in creatures:
+        for column, value in zip(columns, values(creature)):
+            column.append(value)
+        _, state, gauss_next = creature.rng.getstate()
+        rng.extend(state)
+        gauss.append(float('nan') if gauss_next is None else gauss_next)
+    sections = [(f'{species}.{field}', column)
+                for field, column in zip(fields, columns)]
+    sections.append((f'{species}.rng', rng))
+    sections.append((f'{species}.gauss', gauss))
+    return sections
+
+def rng_state(sections, species, i):
+    """
+    Args:
+    - sections (dict): The sections of a checkpoint (see read_checkpoint).
+    - species (str): One of SPECIES.
+    - i (int): Which creature of the species.
+
+    Returns:
+    - tuple: The state of the creature's random number stream, for
+    random.Random.setstate().
+
+    """
+    state = tuple(sections[f'{species}.rng'][i * RNG_WORDS:
+                                             (i + 1) * RNG_WORDS])
+    gauss = sections[f'{species}.gauss'][i]
+    return 3, state, None if gauss != gauss else gauss
+
+
+
+
+###################### Checkpointer ######################
+
+# Takes checkpoints every few ticks. Copying the world into columns is the
+# only part done between ticks (with every creature waiting); writing the file
+# happens on a thread of its own while the simulation carries on. The file is
+# written next to the old checkpoint and only replaces it once it's complete,
+# so a crash while writing still leaves the previous checkpoint.
+class Checkpointer:
+    def __init__(self, path, every, parameters=None):
+        """
+        Initializes a Checkpointer class object
+
+        Args:
+        - path (str): The file to write.
+        - every (int): Take a checkpoint every this many ticks.
+        - parameters (dict): The parameters of the run, saved in the header.
+
+        """
+        self.path = path
+        self.every = every
+        self.parameters = parameters or {}
+        self.writer = None
+        self.saved = 0
+
+    def due(self, tick):
+        """
+        Args:
+        - tick (int): The number of ticks finished so far.
+
+        Returns:
+        - bool: Whether a checkpoint should be taken after this tick.
+
+        """
+        return tick % self.every == 0
+
+    def save(self, tick, sim_random, plants, rabbits, foxes, stats, order):
+        """
+        Takes a checkpoint. Must only be called between ticks.
+
+        Args:
+        - tick (int): The number of ticks finished so far.
+        - sim_random (random.Random): The simulation's own random numbers.
+        - plants (list): Every plant.
+        - rabbits (list): Every rabbit.
+        - foxes (list): Every fox.
+        - stats (StatsCollector): The stats of the run.
+        - order (list): Every creature in the order they are stepped. Ones
+        that aren't in the species lists are left out.
+
+        """
+        sections = []
+        index = {}
+        for code, (species, creatures) in enumerate(
+                zip(SPECIES, (plants, rabbits, foxes))):
+            sections.extend(creature_sections(species, creatures))
+            for i, creature in enumerate(creatures):
+                index[creature] = (code, i)
+        order_species = array('B')
+        order_index = array('I')
+        for creature in order:
+            where = index.get(creature)
+            if where is not None:
+                order_species.append(where[0])
+                order_index.append(where[1])
+        sections.append(('order.species', order_species))
+        sections.append(('order.index', order_index))
+        state, events, births = stats.checkpoint_state()
+        sections.extend(('events.' + name, column)
+                        for name, column in events.items())
+        if births is not None:
+            sections.extend(('births.' + name, column)
+                            for name, column in births.items())
+        header = {
+            'tick': tick,
+            'parameters': self.parameters,
+            'random': list(sim_random.getstate()[1]),
+            'stats': state,
+            'sections': [[name, column.typecode, len(column)]
+                         for name, column in sections],
+        }
+        # only one checkpoint is written at a time
+        self.wait()
+        self.writer = threading.Thread(target=self._write,
+                                       args=(header, sections))
+        self.writer.start()
+        self.saved += 1
+
+    def _write(self, header, sections):
+        header = json.dumps(header).encode()
+        header += b' ' * (_align(len(header)) - len(header))
+        partial = self.path + '.partial'
+        with open(partial, 'wb') as file:
+            file.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+            file.write(header)
+            for _, column in sections:
+                data = column.tobytes()
+                file.write(data)
+                file.write(b'\0' * (_align(len(data)) - len(data)))
+        os.replace(partial, self.path)
+
+    def wait(self):
+        """
+        Waits for the checkpoint being written, if there is one, to be on
+        disk.
+
+        """
+        if self.writer is not None:
+            self.writer.join()
+            self.writer = None
+
+
+
+
+###################### Reading ######################
+
+def read_header(file):
+    """
+    Reads the start of a checkpoint.
+
+    Args:
+    - file: The checkpoint, opened in binary mode.
+
+    Returns:
+    - dict: The header.
+
+    Raises:
+    - ValueError: If the file isn't a checkpoint this version can read.
+
+    """
+    preamble = file.read(PREAMBLE.size)
+    # an empty file or one cut short can't be unpacked
+    if len(preamble) < PREAMBLE.size:
+        raise ValueError("not a checkpoint")
+    magic, version, header_length = PREAMBLE.unpack(preamble)
+    if magic != MAGIC:
+        raise ValueError("not a checkpoint")
+    if version != VERSION:
+        raise ValueError("unsupported checkpoint version %d" % version)
+    header = file.read(header_length)
+    if len(header) < header_length:
+        raise ValueError("the checkpoint is cut short")
+    return json.loads(header)
+
+def read_checkpoint(path):
+    """
+    Reads a checkpoint.
+
+    Args:
+    - path (str): The checkpoint.
+
+    Returns:
+    - tuple: The header (dict) and the sections (a dict of arrays by name,
+    e.g. 'rabbit.speed').
+
+    Raises:
+    - ValueError: If the file isn't a checkpoint this version can read or
+    is cut short.
+
+    """
+    with open(path, 'rb') as file:
+        header = read_header(file)
+        sections = {}
+        for name, typecode, length in header['sections']:
+            column = array(typecode)
+            size = length * column.itemsize
+            data = file.read(size)
+            if len(data) < size:
+                raise ValueError("the checkpoint is cut short")
+            column.frombytes(data)
+            file.read(_align(size) - size)
+            sections[name] = column
+    return header, sections
@@ -1,11 +1,9 @@
-import tkinter as tk
 import threading
-from time import sleep
 import random
 import math
+from time import perf_counter_ns
 from global_stuff import *
 from gene import *
-from stats_collector import *
 
 
 
@@ -14,13 +12,68 @@ from stats_collector import *
 # Creature class has most of the functions used by more than one type of
 # creature. Also defines each creature to have an poistion array
 class Creature:
-    def __init__(self, initial_pos):
+    def __init__(self, world, initial_pos, rng=None):
         """
         Initializes a Creature class object
 
+        Args:
+        - world (World): The world the creature lives in.
+        - initial_pos (list): The starting position.
+        - rng (random.Random): Where the creature gets its random numbers
+        from. Defaults to a new stream seeded from the world's sim_random.
+
         """
+        self.world = world
         self.position = initial_pos
-        random.seed()
+        if rng is None:
+            rng = random.Random(world.sim_random.getrandbits(64))
+        self.rng = rng
+
+    def childRng(self):
+        """
+        Makes the random number stream for a child of this creature. It is
+        seeded from our own stream so a seeded run always gives the same
+        child the same numbers.
+
+        Returns:
+        - random.Random: The child's random number stream.
+
+        """
+        return random.Random(self.rng.getrandbits(64))
+
+    def start(self):
+        """
+        Starts running the creature, either in its own thread or by handing
+        it to the scheduler.
+
+        """
+        world = self.world
+        if world.scheduler is not None:
+            world.scheduler.add(self)
+        else:
+            # join before the thread starts so the current tick waits for us
+            world.tick_barrier.join()
+            threading.Thread(target=self.run, daemon=True).start()
+
+    def run(self):
+        """
+        Runs the creature in its own thread until it dies or the simulation
+        ends, waiting for every other creature at the end of each timestep.
+
+        """
+        world = self.world
+        while self.isAlive() and not world.sim_done_event.is_set():
+            self.step()
+            if world.phase_timing:
+                start = perf_counter_ns()
+                world.tick_barrier.wait()
+                world.phase_timers.lap(type(self).__name__, 'barrier', start)
+            else:
+                world.tick_barrier.wait()
+        self.die()
+        world.tick_barrier.leave()
+        if world.phase_timing:
+            world.phase_timers.flushThread()
 
     def getDistanceTo(self, otherCreature):
         """
@@ -55,47 +108,42 @@ class Creature:
         return math.sqrt(((self.position[0] - x) ** 2) +
                          ((self.position[1] - y) ** 2))
 
-    def findClosest(self, creatureList, lock):
+    def findClosest(self, view, maxDist=math.inf):
         """
-        Finds the closest creature to this creature from a list of creatures.
+        Finds the closest creature to this creature in the snapshot of a
+        species. Reading the snapshot doesn't need a lock.
 
         Args:
-        - creatureList (list): List of creatures to search.
-        - lock (threading.Lock): Lock for thread-safe access to shared data.
+        - view (SpeciesView): Snapshot of the creatures to search.
+        - maxDist (float): Ignore creatures further away than this.
 
         Returns:
-        - The closest creature to this creature.
+        - Seen: The snapshot entry of the closest creature (its creature,
+        position and health at the start of the tick), or None if there
+        isn't one.
 
         """
-        with lock:
-            if (len(creatureList) == 0):
-                return None
-            return min(creatureList, key=self.getDistanceTo)
+        return view.nearest(self.position[0], self.position[1],
+                            exclude=self, max_dist=maxDist)[0]
 
     # gets the closest creature of specific type to the location
-    def findClosestCreatureTo(self, x, y, creatureList, lock):
+    def findClosestCreatureTo(self, x, y, view):
         """
-        Finds the closest creature to a specified point from a list of creatures.
+        Finds the closest creature to a specified point in the snapshot of a
+        species.
 
         Args:
         - x (float): The x-coordinate of the point.
         - y (float): The y-coordinate of the point.
-        - creatureList (list): List of creatures to search.
-        - lock (threading.Lock): Lock for thread-safe access to shared data.
+        - view (SpeciesView): Snapshot of the creatures to search.
 
         Returns:
-        - The closest creature to the specified point.
+        - Seen: The snapshot entry of the closest creature to the point.
 
         """
-        def dist(creature):
-            return math.sqrt(((x - creature.position[0]) ** 2) +
-                             ((y - creature.position[1]) ** 2))
-        with lock:
-            if (len(creatureList) == 0):
-                return None
-            return min(creatureList, key=dist)
+        return view.nearest(x, y)[0]
 
-    def checkDensity(self, x, y, creatureList, lock):
+    def checkDensity(self, x, y, view):
         """
         Checks the density of creatures around a specified point. Choose a
         point, creature type and returns the distance between the point
@@ -104,16 +152,14 @@ class Creature:
         Args:
         - x (float): The x-coordinate of the point.
         - y (float): The y-coordinate of the point.
-        - creatureList (list): List of creatures to search.
-        - lock (threading.Lock): Lock for thread-safe access to shared data.
+        - view (SpeciesView): Snapshot of the creatures to search.
 
         Returns:
-        - float: The distance to the nearest creature from the specified point.
+        - float: The distance to the nearest creature from the specified point
+        (infinity if there are none), counting children born this tick.
 
         """
-        nearest = self.findClosestCreatureTo(x, y, creatureList, lock)
-        return nearest.getDistanceToCoord(x, y)
-
+        return view.distanceToNearest(x, y)
 
     def findMovementVector(self, sizeStep, pointsOfInterest):
         """
@@ -151,60 +197,16 @@ class Creature:
         # finally, we move one timestep in the direction dx, dy
         return dx * sizeStep, dy * sizeStep
 
-    def waitForOtherThreads(self, plants, plant_lock, rabbits,
-                            rabbit_lock, foxes, fox_lock):
-        """
-        Waits for other threads to arrive at a synchronization point.
-
-        Args:
-        - plants (list): List of plants.
-        - plant_lock (threading.Lock): Lock for plant-related operations.
-        - rabbits (list): List of rabbits.
-        - rabbit_lock (threading.Lock): Lock for rabbit-related operations.
-        - foxes (list): List of foxes.
-        - fox_lock (threading.Lock): Lock for fox-related operations.
-
-        """
-        global semList
-        notLast = True
-        mySem = threading.Semaphore(value=0)
-        # we need to aquire all of the locks so the number of creatures doesn't
-        # change while we are checking if we are the last creature
-        with semListLock:
-            with plant_lock:
-                with rabbit_lock:
-                    with fox_lock:
-                        # this could maybe be handled as just a count
-                        numArrived = len(semList)
-                        if (numArrived + 1 == (len(plants) +
-                                               len(rabbits) +
-                                               len(foxes))):
-                            notLast = False
-                            # Sleep for 0.01 seconds here to cap the framerate
-                            # at 100fps
-                            sleep(.01)
-                            # release all of the waiting threads
-                            for sem in semList:
-                                sem.release()
-                            # empty the list
-                            semList = []
-                        else:
-                            semList.append(mySem)
-  
-        if notLast:
-            mySem.acquire()
-
-            
-    def genNewPosition(self, minDist, maxDist, creatureList, lock):
+    def genNewPosition(self, minDist, maxDist, view):
         """
         Generates a new valid set of coordinates for a child for the given
-        creature within a specified distance range.
+        creature within a specified distance range. The spot is reserved so
+        no other child can be born on top of it this tick.
 
         Args:
         - minDist (float): Minimum distance from current position.
         - maxDist (float): Maximum distance from current position.
-        - creatureList (list): List of creatures to avoid.
-        - lock (threading.Lock): Lock for thread-safe access to shared data.
+        - view (SpeciesView): Snapshot of the creatures to avoid.
 
         Returns:
         - tuple: A tuple containing the new x and y coordinates.
@@ -212,8 +214,8 @@ class Creature:
         """
         # use polar coordinates to pick a random point within a circular
         # distance from self.
-        angle = random.uniform(0, 2 * math.pi)
-        distance = random.uniform(minDist, maxDist)
+        angle = self.rng.uniform(0, 2 * math.pi)
+        distance = self.rng.uniform(minDist, maxDist)
         # translate to euclidean coordinates
         x = int(self.position[0] + distance * math.cos(angle))
         y = int(self.position[1] + distance * math.sin(angle))
@@ -223,11 +225,13 @@ class Creature:
         while numTries > 0:
             # assuming the point is within bounds and more than minDist from
             # any other creature of the same type it's a valid point
-            if check_bounds(x,y) and (self.checkDensity(x,
-                                                        y,
-                                                        creatureList,
-                                                        lock) > minDist):
-                return x, y
+            if self.world.check_bounds(x,y):
+                claimed = view.claimSpot(x, y, minDist)
+                if claimed:
+                    return x, y
+                # the spot was handed to another process (sharded engine)
+                elif claimed is None:
+                    break
             numTries -= 1
         # if no point can be found return none
         return None, None
@@ -242,7 +246,7 @@ class Creature:
 
         """
         dx, dy = 0, 0
-        direction = random.randint(1, 4)
+        direction = self.rng.randint(1, 4)
         if (direction == 1): ## above
             dy = -self.size_step
         elif (direction == 2): ## right
@@ -258,40 +262,31 @@ class Creature:
 
 ###################### Fox Class ######################
 
-class Fox(Creature, threading.Thread):
-    def __init__(self, initial_pos, health): 
+class Fox(Creature):
+    def __init__(self, world, initial_pos, health, rng=None): 
         """
         Initializes a Fox class object
 
         """
-        Creature.__init__(self, initial_pos)
-        threading.Thread.__init__(self, daemon=True)
-        self.size_step = foxSpeed
+        Creature.__init__(self, world, initial_pos, rng)
+        self.size_step = world.foxSpeed
         self.health = health
         self.target = None
-        self.canvas_object = canvas.create_polygon([initial_pos[0] - 10,
-                                                    initial_pos[1] - 10,  
-                                                    initial_pos[0] + 10,
-                                                    initial_pos[1] - 10,  
-                                                    initial_pos[0],
-                                                    initial_pos[1] + 10],    
-                                                    fill="red",             
-                                                    outline="")    
 
     # gets the closest edible creature
     def findClosestFood(self):
         """
-        Wrapper for findClosest(rabbits, rabbit_lock)
+        Wrapper for findClosest(world_view.current.rabbits)
 
         """
-        return self.findClosest(rabbits, rabbit_lock)
+        return self.findClosest(self.world.world_view.current.rabbits)
 
     def findClosestPredator(self):
         """
-        Wrapper for findClosest(foxes, fox_lock)
+        Wrapper for findClosest(world_view.current.foxes)
 
         """
-        return self.findClosest(foxes, fox_lock)
+        return self.findClosest(self.world.world_view.current.foxes)
 
     def moveForSurvival(self):
         """
@@ -306,8 +301,13 @@ class Fox(Creature, threading.Thread):
         # rewriting their movement and adding genetics. Foxes avoid
         # one another which is why they use the closest "predator"
         # even though they are also a predator
+        world = self.world
+        if world.phase_timing:
+            start = perf_counter_ns()
         food = self.findClosestFood()
         predator = self.findClosestPredator()
+        if world.phase_timing:
+            start = world.phase_timers.lap('Fox', 'perception', start)
 
         # if nothing of interest, move randomly
         if not predator and not food:
@@ -323,8 +323,8 @@ class Fox(Creature, threading.Thread):
 
         # the avoidOthers parameter controls how much foxes care about other
         # foxes or food
-        if (distance_to_food * avoidOthers) < (distance_to_predator *
-                                              (1 - avoidOthers)):
+        if (distance_to_food * world.avoidOthers) < (distance_to_predator *
+                                                    (1 - world.avoidOthers)):
             self.target = food
             # get vector towards the food
             dx = food.position[0] - self.position[0]
@@ -344,6 +344,8 @@ class Fox(Creature, threading.Thread):
             dy = (dy / distance) * self.size_step
             # print(dx, dy)
 
+        if world.phase_timing:
+            world.phase_timers.lap('Fox', 'steering', start)
         return self.position[0] + dx, self.position[1] + dy, self.target
 
     def reproduce(self):
@@ -352,120 +354,135 @@ class Fox(Creature, threading.Thread):
         the maximum limit.
 
         """
-        if len(foxes) < maxFoxes:
-            x, y = self.genNewPosition(minFoxDistance, maxFoxDistance,
-                                                        foxes, fox_lock)
+        world = self.world
+        if (len(world.foxes) + world.remote_population['foxes'] <
+                world.maxFoxes):
+            x, y = self.genNewPosition(world.minFoxDistance,
+                                       world.maxFoxDistance,
+                                       world.world_view.current.foxes)
             # if we found a valid point then make a new fox.
             # because we handle reproduction this way, there is a chance when
             # a fox "reproduces" it doesn't spawn a new fox because there were
             # too many other foxes nearby
             if (x and y):
-                newFox = Fox([x, y], health)
-                with fox_lock:
-                    foxes.append(newFox)
+                newFox = Fox(world, [x, y], world.health, self.childRng())
+                with world.fox_lock:
+                    world.foxes.append(newFox)
                 newFox.start()
 
-    def run(self): 
+    def isAlive(self):
         """
-        Runs the behavior of the fox in the simulation.
+        Returns:
+        - bool: True while the fox has health left.
 
         """
-        # as long as it's alive and the simulation is running
-        while self.health > 0 and not sim_done_event.is_set():
-            # move the fox
-            new_col, new_row, target = self.moveForSurvival()
-            self.position[0] = clamp(new_col, 0, canvas_width)
-            self.position[1] = clamp(new_row, stat_bottom, canvas_height)
-            
-            # if it's hunting a rabbit, is close enough and another fox didn't
-            # get it earlier this timestep, then we can increase our health
-            if isinstance(target, Rabbit):
-                if (self.getDistanceTo(target) < 1 and target.getEaten()):
-                    stats_collector.log_event('Rabbit was eaten',
-                                            f'''Died at position
-                                            ({self.position[0]:.3f},
-                                             {self.position[1]:.3f})''', self)
-                    self.health = max(self.health + foxMetabolism,
-                                                    foxStomachSize)
-            elif target == None:
-                # move randomly
+        return self.health > 0
+
+    def step(self):
+        """
+        Runs one timestep of the fox's behavior.
+
+        """
+        # move the fox
+        world = self.world
+        new_col, new_row, target = self.moveForSurvival()
+        if world.phase_timing:
+            start = perf_counter_ns()
+        self.position[0] = clamp(new_col, 0, world.canvas_width)
+        self.position[1] = clamp(new_row, world.stat_bottom,
+                                 world.canvas_height)
+        
+        # if it's hunting a rabbit, is close enough and another fox didn't
+        # get it earlier this timestep, then we can increase our health
+        if target is not None and isinstance(target.creature, Rabbit):
+            if (self.getDistanceTo(target) < 1 and
+                                            target.creature.getEaten()):
+                world.stats_collector.log_event('Rabbit was eaten', self)
+                self.health = max(self.health + world.foxMetabolism,
+                                                world.foxStomachSize)
+                if world.phase_timing:
+                    start = world.phase_timers.lap('Fox', 'eating', start)
+            elif world.phase_timing:
+                # it didn't eat, so don't count the check as eating or as
+                # part of the reproduction that comes next
+                start = perf_counter_ns()
+        elif target == None:
+            # move randomly
+            new_col, new_row = self.generate_position()
+            while(not world.check_bounds(new_col, new_row)):
                 new_col, new_row = self.generate_position()
-                while(not check_bounds(new_col, new_row)):
-                    new_col, new_row = self.generate_position()
 
-                self.position[0] = clamp(new_col, 0, canvas_width)
-                self.position[1] = clamp(new_row, stat_bottom, canvas_height)
-            
-            # update our visual position
-            with canvas_lock:
-                canvas.moveto(self.canvas_object, int(self.position[0]) - 10,
-                                                  int(self.position[1]) - 10)
-            
-            # do reproduction
-            if self.health > foxReproductionCutoff and random.random() < foxRate:
-                stats_collector.log_event('New fox born',
-                                f'''Born at position ({self.position[0]:.3f},
-                                {self.position[1]:.3f})''', self)
-                self.reproduce()
+            self.position[0] = clamp(new_col, 0, world.canvas_width)
+            self.position[1] = clamp(new_row, world.stat_bottom,
+                                     world.canvas_height)
+            if world.phase_timing:
+                start = world.phase_timers.lap('Fox', 'steering', start)
+        
+        # do reproduction
+        if (self.health > world.foxReproductionCutoff
+                        and self.rng.random() < world.foxRate):
+            world.stats_collector.log_event('New fox born', self)
+            self.reproduce()
+            if world.phase_timing:
+                world.phase_timers.lap('Fox', 'reproduction', start)
+
+        self.health -= 1
+
+    def die(self):
+        """
+        Removes the fox from the simulation.
 
-            self.health -= 1
-            # wait for other threads to finsih this timestep
-            self.waitForOtherThreads(plants, plant_lock, rabbits, rabbit_lock,
-                                                         foxes, fox_lock)
-        with fox_lock:
-                stats_collector.log_event('Fox passed away',
-                                f'''Died at position ({self.position[0]:.3f},
-                                {self.position[1]:.3f})''', self)
-                foxes.remove(self)
-        with canvas_lock:
-            canvas.delete(self.canvas_object)
+        """
+        world = self.world
+        with world.fox_lock:
+                # foxes that are still alive when the simulation ends didn't
+                # actually die so we don't report them
+                if self.health <= 0:
+                    world.stats_collector.log_event('Fox passed away', self)
+                world.foxes.remove(self)
 
 
 
 
 ###################### Rabbit Class ######################
 
-class Rabbit(Creature, threading.Thread):    
-    def __init__(self, initial_pos, genes):
+class Rabbit(Creature):    
+    def __init__(self, world, initial_pos, genes, rng=None):
         """
         Initializes a Rabbit class object
 
         """
-        Creature.__init__(self, initial_pos)
-        threading.Thread.__init__(self, daemon=True)
+        Creature.__init__(self, world, initial_pos, rng)
         self.genes = genes
         self.size_step = genes.speed
         self.health = genes.startingHealth
         self.target = None
-        self.canvas_object = canvas.create_oval(initial_pos[0]-7,
-                                                        initial_pos[1]-7,
-                                                        initial_pos[0]+7,
-                                                        initial_pos[1]+7, 
-                                                        fill=rgb_to_hex(
-                                                            genes.color),
-                                                        outline="")
 
     # we should make this detect if there is no food on the map
     def findClosestFood(self):
         """
-        Wrapper for findClosest(plants, plant_lock)
+        Wrapper for findClosest(world_view.current.plants)
 
         """
-        return self.findClosest(plants, plant_lock)
+        return self.findClosest(self.world.world_view.current.plants)
     
     def findClosestPredator(self):
         """
-        Wrapper for findClosest(foxes, fox_lock)
+        Wrapper for findClosest(world_view.current.foxes)
 
         """
-        return self.findClosest(foxes, fox_lock)
+        return self.findClosest(self.world.world_view.current.foxes)
 
     def findClosestRabbit(self):
         """
-        Wrapper for findClosest(rabbits, rabbit_lock)
+        Wrapper for findClosest(world_view.current.rabbits, rabbitRadius).
+        Rabbits only avoid other rabbits within rabbitRadius so we don't look
+        further
 
         """
-        return self.findClosest(rabbits, rabbit_lock)
+        world = self.world
+        return self.findClosest(world.world_view.current.rabbits,
+                                world.rabbitRadius)
     
     def generatePriorityList(self):
         """
@@ -502,7 +519,7 @@ class Rabbit(Creature, threading.Thread):
         # out too much and ended up not leaving space for food to spawn before
         # being immidietly eaten
         if rabbit:
-            if self.getDistanceTo(rabbit) < rabbitRadius:
+            if self.getDistanceTo(rabbit) < self.world.rabbitRadius:
                 priorities.append((rabbit.position[0],
                                    rabbit.position[1],
                                    self.genes.avoidOthersFactor * -1))
@@ -520,11 +537,18 @@ class Rabbit(Creature, threading.Thread):
         """
         # we still look for the closest food here so we can check if we are
         # close enough to eat it
+        world = self.world
+        if world.phase_timing:
+            start = perf_counter_ns()
         food = self.findClosestFood()
+        priorities = self.generatePriorityList()
+        if world.phase_timing:
+            start = world.phase_timers.lap('Rabbit', 'perception', start)
 
         # see the findMovementVector and generatePriorityList functions
-        dx, dy = self.findMovementVector(self.size_step,
-                                         self.generatePriorityList())
+        dx, dy = self.findMovementVector(self.size_step, priorities)
+        if world.phase_timing:
+            world.phase_timers.lap('Rabbit', 'steering', start)
 
         return self.position[0] + dx, self.position[1] + dy, food
     
@@ -543,7 +567,7 @@ class Rabbit(Creature, threading.Thread):
         # itself from the simulation on its next timestep. We originally
         # removed the rabbit both here and seperatly if it starved which ended
         # up causing a lot of problems so this was much cleaner.
-        with rabbit_lock:
+        with self.world.rabbit_lock:
             if self.health > 0:
                 self.health = 0
                 return True
@@ -560,21 +584,26 @@ class Rabbit(Creature, threading.Thread):
         successful, 0 otherwise.
 
         """
-        if len(rabbits) < maxRabbits:
-            x, y = self.genNewPosition(minRabbitDistance, maxRabbitDistance,
-                                                          rabbits, rabbit_lock)
+        world = self.world
+        if (len(world.rabbits) + world.remote_population['rabbits'] <
+                world.maxRabbits):
+            x, y = self.genNewPosition(world.minRabbitDistance,
+                                       world.maxRabbitDistance,
+                                       world.world_view.current.rabbits)
             if (x and y):
                 # since the above check can fail, there is a chance that a
                 # rabbit won't produce a child even if it calls this function
 
                 # mutate the parent genes to produce child genes
-                newGenes = self.genes.childGene()
+                newGenes = self.genes.childGene(self.rng)
 
                 # create and add a new rabbit
-                newRabbit = Rabbit([x, y], newGenes)
-                with rabbit_lock:
-                    rabbits.append(newRabbit)
+                newRabbit = Rabbit(world, [x, y], newGenes, self.childRng())
+                with world.rabbit_lock:
+                    world.rabbits.append(newRabbit)
                 newRabbit.start()
+                world.stats_collector.log_event('New rabbit born', self,
+                                                newGenes)
 
                 # if a child is born the parent loses some food/health
                 # proportional to the amount the child was born with.
@@ -587,54 +616,64 @@ class Rabbit(Creature, threading.Thread):
         # if no child was produced the rabbit is not penalized
         return 0
 
-    def run(self): 
+    def isAlive(self):
+        """
+        Returns:
+        - bool: True while the rabbit has health left.
+
+        """
+        return self.health > 0
+
+    def step(self):
         """
-        Runs the behavior of the rabbit in the simulation.
+        Runs one timestep of the rabbit's behavior.
 
         """
-        while (self.health > 0 and not sim_done_event.is_set()):
-            new_col, new_row, target = self.moveForSurvival()
-            self.position[0] = clamp(new_col, 0, canvas_width)
-            self.position[1] = clamp(new_row, stat_bottom, canvas_height)
+        world = self.world
+        new_col, new_row, target = self.moveForSurvival()
+        if world.phase_timing:
+            start = perf_counter_ns()
+        self.position[0] = clamp(new_col, 0, world.canvas_width)
+        self.position[1] = clamp(new_row, world.stat_bottom,
+                                 world.canvas_height)
+
+        # eat a plant if it's close enough
+        if target is not None and isinstance(target.creature, Plant):
+            if ((self.getDistanceTo(target) < 5) and
+                                            target.creature.getEaten()):
+                self.health = max(self.health + world.rabbitMetabolism,
+                                                world.rabbitStomachSize)
+                if world.phase_timing:
+                    start = world.phase_timers.lap('Rabbit', 'eating', start)
+            elif world.phase_timing:
+                # it didn't eat, so don't count the check as eating or as
+                # part of the reproduction that comes next
+                start = perf_counter_ns()
 
-            # eat a plant if it's close enough
-            if isinstance(target, Plant):
-                if ((self.getDistanceTo(target) < 5) and target.getEaten()):
-                    self.health = max(self.health + rabbitMetabolism,
-                                                    rabbitStomachSize)
-                
-            with canvas_lock:
-                canvas.moveto(self.canvas_object, int(self.position[0]) - 7,
-                                                  int(self.position[1]) - 7)
+        # do reproduction
+        if (self.health > world.rabbitReproductionCutoff
+                        and self.rng.random() < world.rabbitRate):
+            cost = self.reproduce()
+            # lose half the health we give to child
+            self.health -= (cost / 2)
+            if world.phase_timing:
+                world.phase_timers.lap('Rabbit', 'reproduction', start)
 
-            # do reproduction
-            if (self.health > rabbitReproductionCutoff
-                            and random.random() < rabbitRate):
-                cost = self.reproduce()
-                if cost > 0:
-                    stats_collector.log_event('New rabbit born',
-                                                    f'''Born at position
-                                                    ({self.position[0]:.3f},
-                                                    {self.position[1]:.3f})''',
-                                                     self)
-                # lose half the health we give to child
-                self.health -= (cost / 2)
+        # decriment our health each timestep to represent starvation
+        self.health -= 1
 
-            # decriment our health each timestep to represent starvation
-            self.health -= 1
+    def die(self):
+        """
+        Removes the rabbit from the simulation.
 
-            # wait for other threads
-            self.waitForOtherThreads(plants, plant_lock, rabbits, rabbit_lock,
-                                                         foxes, fox_lock)
-        with rabbit_lock:
-            if self in rabbits:
-                stats_collector.log_event('Rabbit passed away',
-                                        f'''Died at position
-                                        ({self.position[0]:.3f},
-                                         {self.position[1]:.3f})''', self)
-                rabbits.remove(self)
-        with canvas_lock:
-            canvas.delete(self.canvas_object)
+        """
+        world = self.world
+        with world.rabbit_lock:
+            if self in world.rabbits:
+                if self.health <= 0:
+                    world.stats_collector.log_event('Rabbit passed away',
+                                                    self)
+                world.rabbits.remove(self)
 
 
 
@@ -642,22 +681,15 @@ class Rabbit(Creature, threading.Thread):
 
 ###################### Plant Class ######################
 
-class Plant(Creature, threading.Thread):
-    def __init__(self, initial_pos, health, reproduceRate): 
+class Plant(Creature):
+    def __init__(self, world, initial_pos, health, reproduceRate, rng=None): 
         """
         Initializes a Plant class object
 
         """
-        Creature.__init__(self, initial_pos)
-        threading.Thread.__init__(self, daemon=True)
+        Creature.__init__(self, world, initial_pos, rng)
         self.foodValue = health
         self.reproduceRate = reproduceRate
-        self.canvas_object = canvas.create_rectangle(initial_pos[0]-5,
-                                                        initial_pos[1]-5,
-                                                        initial_pos[0]+5,
-                                                        initial_pos[1]+5, 
-                                                        fill="green",
-                                                        outline="")
 
     def reproduce(self):
         """
@@ -665,33 +697,67 @@ class Plant(Creature, threading.Thread):
         the maximum limit.
 
         """
-        if len(plants) < maxPlants:
-            x, y = self.genNewPosition(minPlantDistance, maxPlantDistance,
-                                                         plants, plant_lock)
+        world = self.world
+        if (len(world.plants) + world.remote_population['plants'] <
+                world.maxPlants):
+            x, y = self.genNewPosition(world.minPlantDistance,
+                                       world.maxPlantDistance,
+                                       world.world_view.current.plants)
             if (x and y):
                 # plant reproduction is the same as rabbits and foxes although
                 # the restriction on density is much more important since it
                 # effectivly caps the number of plants that can exist in an
                 # area
-                newPlant = Plant([x, y], foodValue, plantRate)
-                stats_collector.log_event('New plant born',
-                            f'''Born at position ({newPlant.position[0]:.3f},
-                            {newPlant.position[1]:.3f})''', newPlant)
-                with plant_lock:
-                    plants.append(newPlant)
-                newPlant.start()
+                Plant.sprout(world, x, y, self.childRng())
+
+    @staticmethod
+    def sprout(world, x, y, rng=None):
+        """
+        Creates a new plant at a spot that was already checked and adds it
+        to the simulation.
+
+        Args:
+        - world (World): The world to add the plant to.
+        - x (float): The x-coordinate of the new plant.
+        - y (float): The y-coordinate of the new plant.
+        - rng (random.Random): The new plant's random number stream.
+
+        """
+        newPlant = Plant(world, [x, y], world.foodValue, world.plantRate, rng)
+        world.stats_collector.log_event('New plant born', newPlant)
+        with world.plant_lock:
+            world.plants.append(newPlant)
+        newPlant.start()
+
+    def isAlive(self):
+        """
+        Returns:
+        - bool: True until the plant has been eaten.
 
-    def run(self):
         """
-        Runs the behavior of the plant in the simulation.
+        return self.foodValue > 0
 
+    def step(self):
         """
-        while self.foodValue > 0 and not sim_done_event.is_set():
-            # plants just reproduce and can be eaten
-            if random.random() < self.reproduceRate:
-                self.reproduce()
-            self.waitForOtherThreads(plants, plant_lock, rabbits, rabbit_lock,
-                                                         foxes, fox_lock)
+        Runs one timestep of the plant's behavior.
+
+        """
+        # plants just reproduce and can be eaten
+        if self.rng.random() < self.reproduceRate:
+            world = self.world
+            if world.phase_timing:
+                start = perf_counter_ns()
+            self.reproduce()
+            if world.phase_timing:
+                world.phase_timers.lap('Plant', 'reproduction', start)
+
+    def die(self):
+        """
+        Plants remove themselves from the simulation as soon as they are
+        eaten (see getEaten) so there is nothing left to do here.
+
+        """
+        pass
 
     def getEaten(self):
         """
@@ -704,16 +770,15 @@ class Plant(Creature, threading.Thread):
         # We built in the ability for plants to have more than bite taken
         # out of them but found it cause rabbits to bunch up more than
         # we liked so we kept it at 1 most of the time.
-        if (self.foodValue > 0):
+        # Several rabbits can see the same plant in the snapshot so taking a
+        # bite has to happen under the lock.
+        world = self.world
+        with world.plant_lock:
+            if (self.foodValue <= 0):
+                return False
             self.foodValue -= 1
-            if (self.foodValue == 0):
-                with plant_lock:
-                    stats_collector.log_event('plant eaten',
-                                f'''Died at position ({self.position[0]:.3f},
-                                {self.position[1]:.3f})''', self)
-                    plants.remove(self)
-                with canvas_lock:
-                    canvas.delete(self.canvas_object)
-            return True
-        else:
-            return False
+            eaten = self.foodValue == 0
+            if eaten:
+                world.stats_collector.log_event('plant eaten', self)
+                world.plants.remove(self)
+        return True
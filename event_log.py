@@ -0,0 +1,251 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+###################### Event Types ######################
+
+# every kind of event the simulation logs. Events only store their index in
+# this tuple
+EVENT_TYPES = ('New plant born', 'plant eaten', 'New rabbit born',
+               'Rabbit passed away', 'Rabbit was eaten', 'New fox born',
+               'Fox passed away')
+EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+SPECIES = ('plant', 'rabbit', 'fox')
+# the species each kind of event is about
+EVENT_SPECIES = (0, 0, 1, 1, 1, 2, 2)
+
+# how each kind of event is described. The details are only built from these
+# when someone asks for them
+EVENT_DETAILS = ('Born at position ({:.3f}, {:.3f})',
+                 'Died at position ({:.3f}, {:.3f})',
+                 'Born at position ({:.3f}, {:.3f})',
+                 'Died at position ({:.3f}, {:.3f})',
+                 'Died at position ({:.3f}, {:.3f})',
+                 'Born at position ({:.3f}, {:.3f})',
+                 'Died at position ({:.3f}, {:.3f})')
+
+# the typecode of each column
+COLUMNS = (('timestamp', 'q'), ('code', 'B'), ('species', 'B'),
+           ('x', 'd'), ('y', 'd'))
+
+
+
+
+###################### Event Log ######################
+
+# The events are stored as a set of parallel arrays ("columns") of plain
+# numbers instead of a dict per event, which takes 26 bytes per event instead
+# of a few hundred. With a cap, the log is a ring buffer that keeps only the
+# newest events. The log isn't thread safe on its own; StatsCollector only
+# uses it while holding its lock.
+class EventLog:
+    def __init__(self, cap=None):
+        """
+        Initializes an empty EventLog class object
+
+        Args:
+        - cap (int): The most events to keep. Once the log is full, each new
+        event replaces the oldest one. None keeps every event.
+
+        """
+        self.cap = cap
+        if cap is None:
+            self.columns = {name: array(typecode)
+                            for name, typecode in COLUMNS}
+        else:
+            self.columns = {name: array(typecode, [0]) * cap
+                            for name, typecode in COLUMNS}
+        # where the next event goes in a capped log
+        self.next = 0
+        self.size = 0
+        # how many events of each type were pushed out of a capped log, so
+        # population counts can still be worked out from what's left
+        self.dropped = [0] * len(EVENT_TYPES)
+
+    def __len__(self):
+        return self.size
+
+    def append(self, timestamp, event_type, x, y):
+        """
+        Adds an event to the log.
+
+        Args:
+        - timestamp (int): When the event happened (monotonic nanoseconds or
+        a tick number).
+        - event_type (str): One of EVENT_TYPES.
+        - x (float): The x-coordinate the event happened at.
+        - y (float): The y-coordinate the event happened at.
+
+        """
+        code = EVENT_CODES[event_type]
+        values = (timestamp, code, EVENT_SPECIES[code], x, y)
+        columns = self.columns
+        if self.cap is None:
+            for (name, _), value in zip(COLUMNS, values):
+                columns[name].append(value)
+            self.size += 1
+            return
+        i = self.next
+        if self.size == self.cap:
+            self.dropped[columns['code'][i]] += 1
+        else:
+            self.size += 1
+        for (name, _), value in zip(COLUMNS, values):
+            columns[name][i] = value
+        self.next = (i + 1) % self.cap
+
+    def _index(self, i):
+        # where the i-th oldest event is stored
+        if self.cap is None or self.size < self.cap:
+            return i
+        return (self.next + i) % self.cap
+
+    def records(self):
+        """
+        Goes through the events from oldest to newest.
+
+        Returns:
+        - generator: (timestamp, event type code, species id, x, y) for each
+        event.
+
+        """
+        columns = [self.columns[name] for name, _ in COLUMNS]
+        for i in range(self.size):
+            j = self._index(i)
+            yield tuple(column[j] for column in columns)
+
+    def event(self, i):
+        """
+        Builds the description of one event.
+
+        Args:
+        - i (int): Which event, counting from the oldest.
+
+        Returns:
+        - dict: The timestamp, event type and details of the event.
+
+        """
+        timestamp, code, _, x, y = (self.columns[name][self._index(i)]
+                                    for name, _ in COLUMNS)
+        return {'timestamp': timestamp, 'event_type': EVENT_TYPES[code],
+                'details': self.details(i)}
+
+    def details(self, i):
+        """
+        Args:
+        - i (int): Which event, counting from the oldest.
+
+        Returns:
+        - str: A description of where the event happened.
+
+        """
+        j = self._index(i)
+        return EVENT_DETAILS[self.columns['code'][j]].format(
+            self.columns['x'][j], self.columns['y'][j])
+
+    def view(self):
+        """
+        Gives numpy arrays of the columns for analysis. They share memory
+        with the log, so an uncapped log can't grow while they're still
+        around. Take them at the end of a run.
+
+        Returns:
+        - dict: A numpy array per column, oldest event first. The arrays are
+        copies only if a capped log has wrapped around.
+
+        """
+        if np is None:
+            raise RuntimeError("EventLog.view() needs numpy installed")
+        view = {}
+        for name, _ in COLUMNS:
+            column = np.frombuffer(self.columns[name],
+                                   dtype=self.columns[name].typecode)
+            column = column[:self.size]
+            if self.cap is not None and self.size == self.cap:
+                column = np.roll(column, -self.next)
+            view[name] = column
+        return view
+
+    def arrays(self):
+        """
+        Copies the columns without going through the events one by one.
+
+        Returns:
+        - dict: A copy of each column as an array, oldest event first.
+
+        """
+        arrays = {}
+        for name, _ in COLUMNS:
+            column = self.columns[name]
+            if self.cap is not None and self.size == self.cap:
+                arrays[name] = column[self.next:] + column[:self.next]
+            else:
+                arrays[name] = column[:self.size]
+        return arrays
+
+    def load(self, arrays, dropped):
+        """
+        Replaces the events with the ones from another log's arrays() (e.g.
+        saved in a checkpoint). If there are more than the cap, only the
+        newest are kept.
+
+        Args:
+        - arrays (dict): An array per column, oldest event first.
+        - dropped (list): How many events of each type the other log had
+        already dropped.
+
+        """
+        self.__init__(self.cap)
+        n = len(arrays['code'])
+        extra = 0 if self.cap is None else max(n - self.cap, 0)
+        codes = arrays['code'][:extra].tobytes()
+        self.dropped = [count + codes.count(code)
+                        for code, count in enumerate(dropped)]
+        for name, typecode in COLUMNS:
+            column = arrays[name][extra:]
+            if self.cap is not None:
+                column += array(typecode, [0]) * (self.cap - len(column))
+            self.columns[name] = column
+        self.size = n - extra
+        if self.cap is not None:
+            self.next = self.size % self.cap
+
+    def export(self):
+        """
+        Returns:
+        - dict: The events as plain arrays, oldest first, and the dropped
+        counts (for another process).
+
+        """
+        exported = {name: array(typecode) for name, typecode in COLUMNS}
+        for record in self.records():
+            for (name, _), value in zip(COLUMNS, record):
+                exported[name].append(value)
+        exported['dropped'] = list(self.dropped)
+        return exported
+
+    def merge(self, other):
+        """
+        Adds the events exported by another log to this one, keeping the
+        events in time order.
+
+        Args:
+        - other (dict): The result of another log's export().
+
+        """
+        records = list(self.records())
+        columns = [other[name] for name, _ in COLUMNS]
+        records.extend(zip(*columns))
+        # sorted() is stable so events with the same timestamp stay in order
+        records.sort(key=lambda record: record[0])
+        dropped = [a + b for a, b in zip(self.dropped, other['dropped'])]
+        self.__init__(self.cap)
+        self.dropped = dropped
+        for timestamp, code, _, x, y in records:
+            self.append(timestamp, EVENT_TYPES[code], x, y)
@@ -4,7 +4,7 @@ from global_stuff import *
 
 
 
-def _mutateValue(value, rate, min_val, max_val):
+def _mutateValue(value, rate, min_val, max_val, rng=random):
     """
     Mutates a value within a specified range.
 
@@ -13,19 +13,20 @@ def _mutateValue(value, rate, min_val, max_val):
     - rate (float): The mutation rate.
     - min_val (float): The minimum value allowed.
     - max_val (float): The maximum value allowed.
+    - rng (random.Random): Where to get the random numbers from.
 
     Returns:
     - float: The mutated value.
 
     """
-    newValue = value * (1 - random.uniform(-rate, rate))
+    newValue = value * (1 - rng.uniform(-rate, rate))
     return clamp(newValue, min_val, max_val)
 
 # this needs to be a different function because these values are linked
 # when speed increases efficency should decrease and vice versa. This is to
 # prevent speed from increasing without restriction through evolution.
 # also I didn't add allow min/max parameters because that's a lot of params
-def _mutateEnergyBudget(metabolism, stomachSize, speed, rate):
+def _mutateEnergyBudget(metabolism, stomachSize, speed, rate, rng=random):
     """
     Mutates the energy budget parameters.
 
@@ -34,13 +35,14 @@ def _mutateEnergyBudget(metabolism, stomachSize, speed, rate):
     - stomachSize (float): The stomach size parameter.
     - speed (float): The speed parameter.
     - rate (float): The mutation rate.
+    - rng (random.Random): Where to get the random numbers from.
 
     Returns:
     - tuple: A tuple containing the mutated metabolism, stomach size,
     and speed parameters.
 
     """
-    m = random.uniform(-rate, rate)
+    m = rng.uniform(-rate, rate)
     # when speed increases, metabolism decreases and vice versa
     sChange = (1 - m)
     eChange = (1 + (5*m))
@@ -70,10 +72,27 @@ class Gene:
         self.startingHealth = startingGenes[10]
         self.generation = startingGenes[11]
 
-    def childGene(self):
+    def genome(self):
+        """
+        Returns the list of genes this Gene was built from.
+
+        Returns:
+        - list: The genes in the order Gene() takes them.
+
+        """
+        return [self.mutationRate, self.metabolism, self.stomachSize,
+                self.speed, self.reproduceRate, self.reproduceCutoff,
+                self.fearFactor, self.hungerFactor, self.avoidOthersFactor,
+                self.color, self.startingHealth, self.generation]
+
+    def childGene(self, rng=random):
         """
         Generates a child gene by mutating the current gene.
 
+        Args:
+        - rng (random.Random): Where to get the random numbers from. Usually
+        the parent's stream.
+
         Returns:
         - Gene: The child gene.
 
@@ -81,19 +100,20 @@ class Gene:
         m = self.mutationRate
         meta, ssize, speed = _mutateEnergyBudget(self.metabolism,
                                                  self.stomachSize,
-                                                 self.speed, m)
+                                                 self.speed, m, rng)
         rate = self.reproduceRate
         cutoff = self.reproduceCutoff
-        fear = _mutateValue(self.fearFactor, m, 0, 100)
-        hunger = _mutateValue(self.hungerFactor, m, 0, 100)
-        avoid = _mutateValue(self.avoidOthersFactor, m, 0, 100)
+        fear = _mutateValue(self.fearFactor, m, 0, 100, rng)
+        hunger = _mutateValue(self.hungerFactor, m, 0, 100, rng)
+        avoid = _mutateValue(self.avoidOthersFactor, m, 0, 100, rng)
         r, g, b = self.color
-        color = (_mutateValue(r, 0.5, 0, 255), _mutateValue(g, 0.5, 0, 255),
-                 _mutateValue(b, 0.5, 0, 255))
+        color = (_mutateValue(r, 0.5, 0, 255, rng),
+                 _mutateValue(g, 0.5, 0, 255, rng),
+                 _mutateValue(b, 0.5, 0, 255, rng))
         # the starting health can't exceed the reproduction cutoff of the
         # parent. This prevents parents from giving birth to too large
         # children
-        health = _mutateValue(r, m, 0, cutoff)
+        health = _mutateValue(r, m, 0, cutoff, rng)
         generation = self.generation + 1
         # generate the array of genes for the child
         return Gene([m, meta, ssize, speed, rate, cutoff, fear,
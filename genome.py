@@ -0,0 +1,146 @@
+from gene import Gene
+
+# numpy is only needed for the vector engine so the threaded simulation still
+# runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+# A genome table holds the genes of a whole population of rabbits as a numpy
+# structured array with one row per rabbit, instead of a Gene object each.
+# The children born in a tick are all mutated in one call (mutate_genomes)
+# and stats over the whole population, like the mean speed or how fearful
+# the rabbits are, are a single reduction over a column:
+#
+#   >>> table = genome_table([rabbit.genes for rabbit in world.rabbits])
+#   >>> table['speed'].mean()
+#   >>> np.histogram(table['fearFactor'], bins=10)
+#
+# Code that wants a Gene for one rabbit can have a GeneView of its row.
+
+###################### Genome Table ######################
+
+# the columns of a genome table, in the order Gene() takes them
+GENE_FIELDS = ('mutationRate', 'metabolism', 'stomachSize', 'speed',
+               'reproduceRate', 'reproduceCutoff', 'fearFactor',
+               'hungerFactor', 'avoidOthersFactor', 'color',
+               'startingHealth', 'generation')
+
+if np is not None:
+    GENOME_DTYPE = np.dtype([(name, np.int64) if name == 'generation' else
+                             (name, np.float64, (3,)) if name == 'color' else
+                             (name, np.float64) for name in GENE_FIELDS])
+else:
+    GENOME_DTYPE = None
+
+def genome_table(genes):
+    """
+    Builds a genome table from Gene objects.
+
+    Args:
+    - genes (list): The Gene of every rabbit.
+
+    Returns:
+    - np.ndarray: The table, one row per Gene in the same order.
+
+    """
+    table = np.zeros(len(genes), dtype=GENOME_DTYPE)
+    if len(genes) == 0:
+        return table
+    for name in GENE_FIELDS:
+        table[name] = [getattr(gene, name) for gene in genes]
+    return table
+
+def _clamp(values, low, high):
+    # the batched version of clamp
+    return np.maximum(np.minimum(values, high), low)
+
+def _mutate(values, rate, rng, low, high):
+    # the batched version of _mutateValue
+    change = 1 - rng.uniform(-rate, rate, len(values))
+    return _clamp(values * change, low, high)
+
+def mutate_genomes(parents, rng):
+    """
+    Makes the genes of one child for every parent in one go. This is the
+    batched version of Gene.childGene and mutates every gene the same way
+    and within the same limits.
+
+    Args:
+    - parents (np.ndarray): Genome table of the parents.
+    - rng (np.random.Generator): Where to get the random numbers from.
+
+    Returns:
+    - np.ndarray: Genome table of the children, in the same order.
+
+    """
+    children = parents.copy()
+    m = parents['mutationRate']
+
+    # _mutateEnergyBudget: when speed increases, metabolism decreases and
+    # vice versa
+    change = rng.uniform(-m, m, len(parents))
+    children['metabolism'] = _clamp(parents['metabolism'] *
+                                    (1 + 5 * change), 0, 3000)
+    children['stomachSize'] = _clamp(parents['stomachSize'] *
+                                     (1 + 5 * change), 0, 10000)
+    children['speed'] = _clamp(parents['speed'] * (1 - change), 0, 1.9)
+
+    for name in ('fearFactor', 'hungerFactor', 'avoidOthersFactor'):
+        children[name] = _mutate(parents[name], m, rng, 0, 100)
+    for channel in range(3):
+        children['color'][:, channel] = _mutate(
+            parents['color'][:, channel], 0.5, rng, 0, 255)
+    # like childGene, the child's starting health comes from the parent's red
+    # and can't exceed the reproduction cutoff of the parent
+    children['startingHealth'] = _mutate(parents['color'][:, 0], m, rng, 0,
+                                         parents['reproduceCutoff'])
+    children['generation'] = parents['generation'] + 1
+    return children
+
+def gene_means(table):
+    """
+    Args:
+    - table (np.ndarray): A genome table.
+
+    Returns:
+    - dict: The mean of every gene but color over the population, or an
+    empty dict if the table is empty.
+
+    """
+    if len(table) == 0:
+        return {}
+    return {name: float(table[name].mean()) for name in GENE_FIELDS
+            if name != 'color'}
+
+
+
+
+###################### Gene View ######################
+
+# A Gene that reads its genes from a row of a genome table, for the code
+# that still expects a Gene (log_event, the run file's GeneLog and so on).
+# Rows of a numpy structured array are views, so nothing is copied
+class GeneView(Gene):
+    def __init__(self, row):
+        """
+        Initializes a GeneView class object
+
+        Args:
+        - row (np.void): The row of a genome table to read, e.g. table[i].
+
+        """
+        self.row = row
+
+    def __getattr__(self, name):
+        # only called for the genes, which aren't attributes of their own
+        if name not in GENE_FIELDS:
+            raise AttributeError(name)
+        if name == 'color':
+            return tuple(float(c) for c in self.row['color'])
+        if name == 'generation':
+            return int(self.row['generation'])
+        return float(self.row[name])
@@ -1,8 +1,15 @@
-import tkinter as tk
-import threading
 import math
 import argparse
-from stats_collector import *
+import ast
+import os
+from checkpoint import read_header
+from budget import check_budget, default_memory_budget
+
+
+
+# Everything here is a plain helper, the command line options or one of the
+# defaults of the simulation parameters. Importing this file doesn't do
+# anything; the state of a running simulation lives in a World (see world.py)
 
 
 ###################### Helper Functions ######################
@@ -35,29 +42,6 @@ def normalize_vector(x, y):
         normalized_y = y / magnitude
         return (normalized_x, normalized_y, magnitude)
 
-def check_bounds(col, row): 
-    """
-    Checks if a given column and row are within the bounds of the canvas.
-
-    Args:
-    - col (int): Column value.
-    - row (int): Row value.
-
-    Returns:
-    - bool: True if the column and row are within the bounds, False otherwise.
-
-    """
-    # We had a problem where things could spawn at x = 0 but not move there
-    # so plants and rabbits would be attracted to the top and left sides of
-    # screen and changing the minimum spawn location to x = 1 not 0 fixed the
-    # issue
-    if col < 1 or col > canvas_width:
-        return False
-    elif row < stat_bottom or row > canvas_height:
-        return False
-    else:
-        return True
-
 def capped_int(value, cap):
     """
     Converts a value to an integer and checks if it is within a specified
@@ -85,9 +69,65 @@ def capped_int(value, cap):
     
     return ivalue
 
+def positive_int(value):
+    """
+    Converts a value to an integer and checks that it is more than 0, for
+    the options that can be as big as the machine allows.
+
+    Args:
+    - value: The value to convert and check.
+
+    Returns:
+    - int: The value as an integer.
+
+    Raises:
+    - argparse.ArgumentTypeError: If the value is not a positive integer.
+
+    """
+    return capped_int(value, float('inf'))
 
 
 
+def is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def sim_parameters(settings=()):
+    """
+    Gets the simulation parameters, changed as asked with --set.
+
+    Args:
+    - settings (list): NAME=VALUE strings, where VALUE is a python literal
+    like the default in this file.
+
+    Returns:
+    - dict: The value of every one of SIM_PARAMETERS.
+
+    Raises:
+    - ValueError: If a setting doesn't name a parameter or has the wrong
+    kind of value.
+
+    """
+    parameters = {name: globals()[name] for name in SIM_PARAMETERS}
+    for setting in settings:
+        name, _, value = setting.partition('=')
+        if name not in SIM_PARAMETERS:
+            raise ValueError("unknown parameter %s (choose from %s)" %
+                             (name, ', '.join(SIM_PARAMETERS)))
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            raise ValueError("%s isn't a valid value for %s" % (value, name))
+        default = parameters[name]
+        if isinstance(default, tuple):
+            if not (isinstance(value, tuple) and len(value) == len(default)
+                    and all(is_number(v) for v in value)):
+                raise ValueError("%s has to look like %s" % (name, default))
+        elif not is_number(value):
+            raise ValueError("%s has to be a number" % name)
+        parameters[name] = value
+    return parameters
+
+
 
 
 ###################### Argument Parsing ######################
@@ -95,30 +135,223 @@ def capped_int(value, cap):
 parser = argparse.ArgumentParser(description=
                                     "Parse simulation start configurations.")
 
-parser.add_argument('--plants', metavar='PLANTS', type=lambda x:
-                                        capped_int(x, 400), default=200,
+parser.add_argument('--plants', metavar='PLANTS', type=positive_int,
+                    default=200,
                     help="""Number of plants at the start of the simulation;
-                            Max number of plants to start with is 400""")
-parser.add_argument('--rabbits', metavar='RABBITS', type=lambda x:
-                                        capped_int(x, 300), default=100,
+                            How many the engine can cope with is checked
+                            against --memory-budget and --min-tick-rate""")
+parser.add_argument('--rabbits', metavar='RABBITS', type=positive_int,
+                    default=100,
                     help="""Number of rabbits at the start of the simulation;
-                            Max number of rabbits to start with is 300""")
-parser.add_argument('--foxes', metavar='FOXES', type=lambda x:
-                                        capped_int(x, 300), default=0,
+                            Checked like --plants""")
+parser.add_argument('--foxes', metavar='FOXES', type=positive_int,
+                    default=0,
                     help="""Number of foxes at the start of the simulation;
-                            Max number of foxes to start with is 300""")
-parser.add_argument('--height', metavar='HEIGHT', type=lambda x:
-                                        capped_int(x, 1000), default=500,
-                    help='Height of the canvas; Max height is 1000')
-parser.add_argument('--width', metavar='WIDTH', type=lambda x:
-                                        capped_int(x, 1500), default=500,
-                    help='Width of the canvas; Max width is 1500')
+                            Checked like --plants""")
+parser.add_argument('--height', metavar='HEIGHT', type=positive_int,
+                    default=500,
+                    help='Height of the canvas')
+parser.add_argument('--width', metavar='WIDTH', type=positive_int,
+                    default=500,
+                    help='Width of the canvas')
+parser.add_argument('--headless', action='store_true',
+                    help="""Run without a window. The simulation runs as fast
+                            as it can and prints its stats when it ends""")
+parser.add_argument('--ticks', metavar='TICKS', type=positive_int,
+                    default=None,
+                    help="""Number of ticks to run before stopping; By default
+                            the simulation runs until the animals go extinct
+                            (or until you type q)""")
+parser.add_argument('--engine', choices=['threads', 'pool', 'vector',
+                                         'sharded'],
+                    default='threads',
+                    help="""How the simulation is run. threads gives every
+                            creature its own thread, pool steps the creatures
+                            on a fixed pool of worker threads, vector keeps the
+                            world in numpy arrays and moves every creature at
+                            once (needs numpy and --headless), sharded splits
+                            the canvas into tiles with a process per tile
+                            (needs --headless)""")
+parser.add_argument('--workers', metavar='WORKERS', type=positive_int,
+                    default=os.cpu_count() or 1,
+                    help="""Number of worker threads used by the pool engine;
+                            Defaults to the number of CPUs""")
+parser.add_argument('--tiles', metavar='TILES', type=positive_int,
+                    default=os.cpu_count() or 1,
+                    help="""Number of tiles (and processes) used by the
+                            sharded engine; Defaults to the number of CPUs""")
+parser.add_argument('--seed', metavar='SEED', type=int, default=None,
+                    help="""Seed for the random numbers so runs can be
+                            repeated. Headless runs with the same seed and
+                            --ticks write the exact same output.csv with the
+                            pool engine on 1 worker, the vector engine and the
+                            sharded engine""")
+
+parser.add_argument('--phase-timing', action='store_true',
+                    help="""Time each phase of every creature's timestep
+                            (perception, steering, eating, reproduction,
+                            canvas updates and barrier waits) and print a
+                            breakdown per species at the end""")
+parser.add_argument('--phase-json', metavar='FILE', default=None,
+                    help="""Also save the phase timings to FILE as JSON;
+                            Turns on --phase-timing""")
+parser.add_argument('--event-cap', metavar='EVENTS', type=positive_int,
+                    default=None,
+                    help="""Only keep the newest EVENTS events in memory
+                            so long runs don't keep growing; By default every
+                            event is kept""")
+parser.add_argument('--lock-profile', action='store_true',
+                    help="""Keep track of how long threads wait for and
+                            hold each of the shared locks and print a report
+                            at the end""")
+sampling = parser.add_mutually_exclusive_group()
+sampling.add_argument('--sample-ticks', metavar='TICKS', type=positive_int,
+                      default=None,
+                      help="""Also write the min, max and mean population of
+                              every TICKS ticks to output_<TICKS>ticks.csv,
+                              with rollups 10 and 100 times as long in their
+                              own files""")
+sampling.add_argument('--sample-seconds', metavar='SECONDS', type=float,
+                      default=None,
+                      help="""Like --sample-ticks but every SECONDS seconds
+                              of running, e.g. --sample-seconds 1 writes
+                              output_1s.csv, output_10s.csv and
+                              output_100s.csv""")
+parser.add_argument('--tick-rate', metavar='TICKS', type=float, default=None,
+                    help="""Most ticks per second; 0 runs as fast as
+                            possible. Defaults to 100 with a window and as fast
+                            as possible with --headless""")
+parser.add_argument('--fps', metavar='FPS', type=float, default=60,
+                    help="""Frames drawn per second in the window, however
+                            fast the simulation runs""")
+parser.add_argument('--renderer', choices=['canvas', 'raster'],
+                    default='canvas',
+                    help="""How the window is drawn. canvas keeps a canvas
+                            item per creature, raster draws each frame into
+                            one image so it copes with thousands of creatures
+                            (needs numpy)""")
+parser.add_argument('--share', metavar='NAME', nargs='?',
+                    const='foxes-rabbits-plants', default=None,
+                    help="""Share the world through shared memory so it can
+                            be watched with viewer.py (in its own process)
+                            while the simulation runs headless; NAME defaults
+                            to foxes-rabbits-plants. Needs numpy, --headless
+                            and the threads or pool engine""")
+parser.add_argument('--run-file', metavar='FILE', default=None,
+                    help="""Also write the population over time, the genes of
+                            every rabbit born and the simulation parameters
+                            to FILE in a binary format numpy can memmap (see
+                            run_file.py)""")
+parser.add_argument('--set', metavar='NAME=VALUE', action='append',
+                    default=None,
+                    help="""Change one of the simulation parameters in
+                            global_stuff.py, e.g. --set plantRate=0.2; Can be
+                            given more than once""")
+parser.add_argument('--checkpoint', metavar='FILE', default=None,
+                    help="""Save the whole world to FILE every
+                            --checkpoint-every ticks (and when --ticks runs
+                            out) so the run can be carried on with --resume.
+                            Only works with the threads and pool engines""")
+parser.add_argument('--checkpoint-every', metavar='TICKS', type=positive_int,
+                    default=1000,
+                    help="Ticks between checkpoints; Defaults to 1000")
+parser.add_argument('--resume', metavar='FILE', default=None,
+                    help="""Carry on the run saved in the checkpoint FILE.
+                            The canvas size and seed are the checkpoint's and
+                            --ticks counts the ticks it already ran""")
+parser.add_argument('--memory-budget', metavar='MB', type=positive_int,
+                    default=default_memory_budget(),
+                    help="""Most memory the run may need at its biggest, in
+                            MB (estimated from the engine, the starting
+                            populations and maxPlants, maxRabbits and
+                            maxFoxes); Defaults to half the machine's
+                            memory""")
+parser.add_argument('--min-tick-rate', metavar='TICKS', type=float,
+                    default=1,
+                    help="""Fewest ticks per second the run may be expected
+                            to manage at its biggest; 0 turns the check off.
+                            Defaults to 1""")
+parser.add_argument('--large-world', action='store_true',
+                    help="""Start from the large world: 100000 plants, 10000
+                            rabbits and 1000 foxes on a 10000x10000 canvas
+                            run headless by the vector engine (see LARGE_WORLD
+                            in global_stuff.py). Other options change it as
+                            usual""")
+
+def parse_args(argv=None):
+    """
+    Reads the command line options and checks that they go together. With
+    --resume the starting populations, canvas size, seed and --set are the
+    ones the checkpoint was taken with.
+
+    Args:
+    - argv (list): The options to read. Defaults to the command line.
 
-args = parser.parse_args()
+    Returns:
+    - argparse.Namespace: The options, along with resume_header (the header
+    of the --resume checkpoint, or None).
 
-n_plants = args.plants
-n_rabbits = args.rabbits
-n_foxes = args.foxes
+    """
+    args = parser.parse_args(argv)
+    if args.large_world:
+        # read the options again on top of the large world so only the ones
+        # given change it
+        args = parser.parse_args(argv, argparse.Namespace(**LARGE_WORLD))
+        args.set = LARGE_WORLD_SET + (args.set or [])
+
+    if args.sample_seconds is not None and args.sample_seconds <= 0:
+        parser.error("--sample-seconds must be more than 0")
+    if args.fps <= 0:
+        parser.error("--fps must be more than 0")
+    if args.share is not None and (not args.headless or
+                                   args.engine not in ('threads', 'pool')):
+        parser.error("--share needs --headless and --engine threads or pool")
+    if args.tick_rate is not None and args.tick_rate < 0:
+        parser.error("--tick-rate can't be negative")
+    if args.min_tick_rate < 0:
+        parser.error("--min-tick-rate can't be negative")
+
+    if args.engine in ('vector', 'sharded') and not args.headless:
+        parser.error("--engine %s only works with --headless" % args.engine)
+    if ((args.checkpoint is not None or args.resume is not None) and
+            args.engine not in ('threads', 'pool')):
+        parser.error("--checkpoint and --resume need --engine threads or "
+                     "pool")
+
+    # a resumed run happens in the world the checkpoint was taken in
+    args.resume_header = None
+    if args.resume is not None:
+        try:
+            with open(args.resume, 'rb') as file:
+                args.resume_header = read_header(file)
+        except (OSError, ValueError) as e:
+            parser.error("can't resume from %s: %s" % (args.resume, e))
+        parameters = args.resume_header['parameters']
+        for name in ('plants', 'rabbits', 'foxes', 'height', 'width',
+                     'seed'):
+            setattr(args, name, parameters[name])
+        args.set = parameters.get('set')
+        if args.ticks is not None and args.ticks <= args.resume_header['tick']:
+            parser.error("the checkpoint already ran %d ticks, so --ticks "
+                         "has to be more than that" %
+                         args.resume_header['tick'])
+
+    try:
+        parameters = sim_parameters(args.set or ())
+    except ValueError as e:
+        parser.error("--set: %s" % e)
+
+    # every starting creature needs a spot of its own below the stat boxes
+    # (see World.stat_bottom)
+    stat_bottom = int(args.height * .1) + 10
+    spots = args.width * max(args.height - stat_bottom, 0)
+    if args.plants + args.rabbits + args.foxes > spots:
+        parser.error("a %dx%d canvas only has room for %d starting "
+                     "creatures" % (args.width, args.height, spots))
+    problem = check_budget(args, parameters)
+    if problem is not None:
+        parser.error(problem)
+    return args
 
 
 
@@ -154,13 +387,6 @@ maxRabbits = 150 # max number of rabbits
 minRabbitDistance = 30 # minimum distance rabbits must be from each other
 maxRabbitDistance = 50 # maximum distance rabbits can be from their parent
 
-# create a genome for the starting population
-rabbitStartingGenes = [rabbitMutationRate, rabbitMetabolism,
-                        rabbitStomachSize, rabbitSpeed, rabbitRate,
-                        rabbitReproductionCutoff, fearFactor, hungerFactor,
-                        avoidOthersFactor, rabbitColor, rabbitHealth,
-                        generation]
-
 # fox info
 foxMetabolism = 50 # amount of health that fox get back per food
 foxStomachSize = 350 # max amount of health a fox can have
@@ -173,60 +399,42 @@ maxFoxes = 50 # max number of foxes
 minFoxDistance = 30 # minimum distance foxes must be from each other
 maxFoxDistance = 50 # maximum distance foxes can be from their parent
 
+# the parameters above, which --set can change
+SIM_PARAMETERS = ('health', 'foodValue', 'plantRate', 'maxPlants',
+                  'minPlantDistance', 'maxPlantDistance', 'rabbitMutationRate',
+                  'rabbitMetabolism', 'rabbitStomachSize', 'rabbitSpeed',
+                  'rabbitRate', 'rabbitReproductionCutoff', 'fearFactor',
+                  'hungerFactor', 'avoidOthersFactor', 'rabbitRadius',
+                  'generation', 'rabbitColor', 'rabbitHealth', 'maxRabbits',
+                  'minRabbitDistance', 'maxRabbitDistance', 'foxMetabolism',
+                  'foxStomachSize', 'foxSpeed', 'foxRate',
+                  'foxReproductionCutoff', 'avoidOthers', 'maxFoxes',
+                  'minFoxDistance', 'maxFoxDistance')
 
 
 
 
-###################### Stat Block Information ######################
-
-canvas_height = args.height
-canvas_width = args.width
-stat_height = int(canvas_height * .1)
-stat_bottom = int(stat_height + 10) # y-coord of bottom count boxes
-fox_color = "#ff8585"
-rabbit_color = "#7c9feb"
-plant_color = "#91c795"
-
-
-
-
-
-###################### Tkinter Canvas Info ######################
 
-window = tk.Tk() 
-window.title("Foxes, Rabbits, & Plants Simulation")
-canvas = tk.Canvas(window, width=canvas_width,
-                           height=canvas_height,
-                           bg="white")
-canvas.pack()
+###################### Large World ######################
 
-canvas_lock = threading.Lock()
+# the options --large-world starts from. Plants are packed closer than usual
+# so the canvas has room for the 150000 the cap allows, and only the newest
+# million events are kept in memory. Check the throughput targets in the
+# README before changing these
+LARGE_WORLD = {'headless': True, 'engine': 'vector', 'width': 10000,
+               'height': 10000, 'plants': 100000, 'rabbits': 10000,
+               'foxes': 1000, 'event_cap': 1000000}
+# the --set the large world starts with. Any --set given goes after these
+LARGE_WORLD_SET = ['maxPlants=150000', 'maxRabbits=20000', 'maxFoxes=2000',
+                   'minPlantDistance=20']
 
 
 
 
-###################### Global Shared Information ######################
 
-# these lists are super important. Creatures have acess to these lists and use
-# them to locate other creatures among a number of other useful things like
-# representing how many threads are running (for the barrier)
-rabbits = []
-plants = []
-foxes = []
-
-# protect the above lists
-rabbit_lock = threading.Lock()
-plant_lock = threading.Lock()
-fox_lock = threading.Lock()
-
-# used in the barrier
-semList = []
-semListLock = threading.Lock()
-
-# signal the end of the simulation
-sim_done = False
-sim_done_event = threading.Event()
+###################### Stat Block Information ######################
 
-# global stats collector to report stats to
-stats_collector = StatsCollector(n_plants, n_plants, n_foxes,
-                                 rabbitSpeed, fearFactor, hungerFactor)
\ No newline at end of file
+# the colors of the stat boxes at the top of the window
+fox_color = "#ff8585"
+rabbit_color = "#7c9feb"
+plant_color = "#91c795"
@@ -0,0 +1,225 @@
+import os
+import sys
+import threading
+from time import perf_counter_ns
+
+
+
+###################### Profiled Lock ######################
+
+# A drop-in replacement for threading.Lock that keeps track of how long
+# threads wait for it and how long they hold it. All of the counters are only
+# changed by the thread holding the lock, so they don't need a lock of their
+# own.
+class ProfiledLock:
+    def __init__(self, name):
+        """
+        Initializes a ProfiledLock class object
+
+        Args:
+        - name (str): The name to report the lock under.
+
+        """
+        self.name = name
+        self._lock = threading.Lock()
+        self.acquisitions = 0
+        # acquisitions that had to wait because someone else held the lock
+        self.contended = 0
+        self.wait_ns = 0
+        self.max_wait_ns = 0
+        self.hold_ns = 0
+        self.max_hold_ns = 0
+        # number of acquisitions and total hold time by call site
+        self.sites = {}
+        self._acquired_at = 0
+        self._site = None
+
+    def _acquire(self, frame, blocking, timeout):
+        # try without blocking first so uncontended acquisitions don't need
+        # to be timed
+        if self._lock.acquire(False):
+            wait = 0
+        elif not blocking:
+            return False
+        else:
+            start = perf_counter_ns()
+            if not self._lock.acquire(True, timeout):
+                return False
+            wait = perf_counter_ns() - start
+            self.contended += 1
+        # we hold the lock from here on
+        self.acquisitions += 1
+        self.wait_ns += wait
+        if wait > self.max_wait_ns:
+            self.max_wait_ns = wait
+        self._site = (frame.f_code.co_filename, frame.f_lineno,
+                      frame.f_code.co_name)
+        self._acquired_at = perf_counter_ns()
+        return True
+
+    def acquire(self, blocking=True, timeout=-1):
+        """
+        Acquires the lock, like threading.Lock.acquire.
+
+        Returns:
+        - bool: True if the lock was acquired.
+
+        """
+        return self._acquire(sys._getframe(1), blocking, timeout)
+
+    def release(self):
+        """
+        Releases the lock, like threading.Lock.release.
+
+        """
+        held = perf_counter_ns() - self._acquired_at
+        self.hold_ns += held
+        if held > self.max_hold_ns:
+            self.max_hold_ns = held
+        site = self.sites.get(self._site)
+        if site is None:
+            site = self.sites[self._site] = [0, 0]
+        site[0] += 1
+        site[1] += held
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self._acquire(sys._getframe(1), True, -1)
+        return True
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def export(self):
+        """
+        Returns:
+        - dict: The counters as plain data (for another process).
+
+        """
+        return {'acquisitions': self.acquisitions,
+                'contended': self.contended,
+                'wait_ns': self.wait_ns, 'max_wait_ns': self.max_wait_ns,
+                'hold_ns': self.hold_ns, 'max_hold_ns': self.max_hold_ns,
+                'sites': [[*site, count, hold]
+                          for site, (count, hold) in self.sites.items()]}
+
+
+
+
+###################### Lock Profiler ######################
+
+# Hands out the shared locks of the simulation. When profiling is off they
+# are plain threading.Locks so there is no cost at all.
+class LockProfiler:
+    def __init__(self, enabled=False):
+        """
+        Initializes a LockProfiler class object
+
+        Args:
+        - enabled (bool): Whether to hand out ProfiledLocks.
+
+        """
+        self.enabled = enabled
+        self.locks = []
+        # counters of locks from other processes, by lock name
+        self.merged = {}
+
+    def lock(self, name):
+        """
+        Makes a new lock.
+
+        Args:
+        - name (str): The name to report the lock under.
+
+        Returns:
+        - A ProfiledLock if profiling is on, otherwise a threading.Lock.
+
+        """
+        if not self.enabled:
+            return threading.Lock()
+        lock = ProfiledLock(name)
+        self.locks.append(lock)
+        return lock
+
+    def export(self):
+        """
+        Returns:
+        - dict: The counters of every lock (including merged ones) by name.
+
+        """
+        exported = {name: dict(data, sites=list(data['sites']))
+                    for name, data in self.merged.items()}
+        for lock in self.locks:
+            data = lock.export()
+            if lock.name in exported:
+                self._add(exported[lock.name], data)
+            else:
+                exported[lock.name] = data
+        return exported
+
+    def merge(self, exported):
+        """
+        Adds the counters exported by another process to this one.
+
+        Args:
+        - exported (dict): The result of another LockProfiler's export().
+
+        """
+        for name, data in exported.items():
+            if name in self.merged:
+                self._add(self.merged[name], data)
+            else:
+                self.merged[name] = dict(data, sites=list(data['sites']))
+
+    @staticmethod
+    def _add(total, data):
+        for key in ('acquisitions', 'contended', 'wait_ns', 'hold_ns'):
+            total[key] += data[key]
+        for key in ('max_wait_ns', 'max_hold_ns'):
+            total[key] = max(total[key], data[key])
+        total['sites'] = total['sites'] + data['sites']
+
+    def printReport(self, ticks, n_sites=3):
+        """
+        Prints how much each lock was fought over, worst first, along with
+        the places in the code that held it the longest.
+
+        Args:
+        - ticks (int): Number of ticks the simulation ran for.
+        - n_sites (int): Number of call sites to show for each lock.
+
+        """
+        if not self.enabled:
+            return
+        ticks = max(ticks, 1)
+        print("Lock Contention (worst first, times in microseconds):")
+        print(f"  {'lock':<20}{'acquires':>10}{'/tick':>9}{'contended':>11}"
+              f"{'wait ms':>10}{'max wait':>10}{'hold ms':>10}"
+              f"{'max hold':>10}")
+        report = sorted(self.export().items(),
+                        key=lambda item: item[1]['wait_ns'], reverse=True)
+        for name, data in report:
+            acquisitions = data['acquisitions']
+            contended = (data['contended'] / acquisitions
+                         if acquisitions else 0)
+            print(f"  {name:<20}{acquisitions:>10}"
+                  f"{acquisitions / ticks:>9.1f}{contended:>11.1%}"
+                  f"{data['wait_ns'] / 1e6:>10.1f}"
+                  f"{data['max_wait_ns'] / 1e3:>10.1f}"
+                  f"{data['hold_ns'] / 1e6:>10.1f}"
+                  f"{data['max_hold_ns'] / 1e3:>10.1f}")
+            # the same call site can show up once per process
+            sites = {}
+            for filename, line, function, count, hold in data['sites']:
+                site = sites.setdefault((filename, line, function), [0, 0])
+                site[0] += count
+                site[1] += hold
+            top = sorted(sites.items(), key=lambda item: item[1][1],
+                         reverse=True)[:n_sites]
+            for (filename, line, function), (count, hold) in top:
+                where = f"{os.path.basename(filename)}:{line} {function}"
+                print(f"      {where:<40} held {hold / 1e6:.1f} ms over "
+                      f"{count} acquires")
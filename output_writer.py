@@ -0,0 +1,69 @@
+from time import monotonic
+
+
+
+###################### Output Writer ######################
+
+# Streams rows to a CSV file (e.g. the population over time to output.csv)
+# while the simulation runs, so the data is on disk even if the run is killed
+# and the file can be watched (e.g. with tail -f) as it grows. Rows are kept
+# in memory and written out in batches of whole lines, so the file never ends
+# in half a row.
+class OutputWriter:
+    def __init__(self, path, flush_interval=1.0, max_rows=1000):
+        """
+        Initializes an OutputWriter class object and creates (or empties)
+        the file.
+
+        Args:
+        - path (str): The file to write.
+        - flush_interval (float): Most seconds a row waits before it's
+        written to the file (as long as maybeFlush() is called).
+        - max_rows (int): Most rows to keep in memory before writing them.
+
+        """
+        # unbuffered so every flush goes straight to the file in one write
+        self.file = open(path, 'wb', buffering=0)
+        self.flush_interval = flush_interval
+        self.max_rows = max_rows
+        self.rows = []
+        self.last_flush = monotonic()
+
+    def writeRow(self, *values):
+        """
+        Adds a row to the file.
+
+        Args:
+        - values: The values of the row, e.g. the time followed by the
+        number of plants, rabbits and foxes.
+
+        """
+        self.rows.append(",".join(map(str, values)) + "\n")
+        if len(self.rows) >= self.max_rows:
+            self.flush()
+
+    def maybeFlush(self):
+        """
+        Writes the waiting rows if the oldest has waited flush_interval.
+
+        """
+        if self.rows and monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes every waiting row to the file.
+
+        """
+        if self.rows:
+            self.file.write(''.join(self.rows).encode())
+            self.rows = []
+        self.last_flush = monotonic()
+
+    def close(self):
+        """
+        Writes the waiting rows and closes the file.
+
+        """
+        self.flush()
+        self.file.close()
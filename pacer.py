@@ -0,0 +1,146 @@
+import threading
+from time import perf_counter, sleep
+
+
+
+###################### Tick Pacer ######################
+
+# Decides how fast the simulation ticks, separately from how often the window
+# is drawn. Whoever ends a tick (the last creature at the barrier, the
+# scheduler or the vector engine's loop) calls pace() before the next tick
+# starts, which is where the simulation waits to keep to the tick rate, stays
+# paused, or doesn't wait at all while fast-forwarding. The renderer checks
+# rendering to skip drawing while fast-forwarding.
+class TickPacer:
+    def __init__(self, tick_rate=None):
+        """
+        Initializes a TickPacer class object
+
+        Args:
+        - tick_rate (float): Most ticks per second at normal speed, None for
+        as fast as possible.
+
+        """
+        self.tick_rate = tick_rate
+        self.speed = 1.0
+        self.paused = False
+        # ticks still allowed to run while paused
+        self.steps = 0
+        # ticks still to run as fast as possible without drawing
+        self.fast_forward = 0
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.next_tick = perf_counter()
+
+    @property
+    def rendering(self):
+        """
+        Returns:
+        - bool: False while fast-forwarding, when nothing should be drawn.
+
+        """
+        return self.fast_forward == 0
+
+    def pace(self):
+        """
+        Called once at the end of every tick. Waits as long as the next tick
+        has to wait.
+
+        """
+        with self.condition:
+            while (self.paused and self.steps == 0 and
+                   self.fast_forward == 0 and not self.stopped):
+                self.condition.wait()
+            if self.stopped:
+                return
+            if self.fast_forward > 0:
+                self.fast_forward -= 1
+                self.next_tick = perf_counter()
+                return
+            if self.paused:
+                self.steps -= 1
+                self.next_tick = perf_counter()
+                return
+            if self.tick_rate is None:
+                return
+            self.next_tick += 1 / (self.tick_rate * self.speed)
+            delay = self.next_tick - perf_counter()
+            if delay < 0:
+                # we fell behind (or were paused), so start counting from now
+                # rather than rushing to catch up
+                self.next_tick -= delay
+        if delay > 0:
+            sleep(delay)
+
+    def pause(self):
+        """
+        Stops the simulation after the current tick.
+
+        """
+        with self.condition:
+            self.paused = True
+            self.steps = 0
+
+    def resume(self):
+        """
+        Lets a paused simulation carry on.
+
+        """
+        with self.condition:
+            self.paused = False
+            self.next_tick = perf_counter()
+            self.condition.notify_all()
+
+    def step(self, ticks=1):
+        """
+        Runs a number of ticks and pauses again. Pauses first if the
+        simulation is running.
+
+        Args:
+        - ticks (int): The number of ticks to run, more than 0.
+
+        """
+        if ticks <= 0:
+            raise ValueError("the number of ticks has to be more than 0")
+        with self.condition:
+            self.paused = True
+            self.steps += ticks
+            self.condition.notify_all()
+
+    def setSpeed(self, speed):
+        """
+        Changes how fast the simulation ticks compared to the tick rate.
+
+        Args:
+        - speed (float): Multiplier of the tick rate, e.g. 2 for twice as
+        fast. Has no effect if the tick rate isn't capped.
+
+        """
+        with self.condition:
+            self.speed = speed
+            self.next_tick = perf_counter()
+
+    def fastForward(self, ticks):
+        """
+        Runs a number of ticks as fast as possible without drawing them,
+        even if the simulation is paused.
+
+        Args:
+        - ticks (int): The number of ticks to run, more than 0.
+
+        """
+        if ticks <= 0:
+            raise ValueError("the number of ticks has to be more than 0")
+        with self.condition:
+            self.fast_forward += ticks
+            self.condition.notify_all()
+
+    def stop(self):
+        """
+        Stops pacing for good so nothing waits in pace() once the simulation
+        ends.
+
+        """
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
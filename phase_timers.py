@@ -0,0 +1,263 @@
+import json
+import threading
+from time import perf_counter_ns
+
+
+
+###################### Phase Histograms ######################
+
+# bucket i holds times between 2**(i-1) and 2**i nanoseconds, so recording a
+# time is just a bit_length() and a list index
+N_BUCKETS = 64
+
+class PhaseHistogram:
+    def __init__(self):
+        """
+        Initializes an empty PhaseHistogram class object
+
+        """
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * N_BUCKETS
+
+    def add(self, ns):
+        """
+        Records one time.
+
+        Args:
+        - ns (int): The time in nanoseconds.
+
+        """
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.buckets[min(ns.bit_length(), N_BUCKETS - 1)] += 1
+
+    def merge(self, other):
+        """
+        Adds the times recorded by another histogram to this one.
+
+        Args:
+        - other (PhaseHistogram): The other histogram.
+
+        """
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        for i, n in enumerate(other.buckets):
+            self.buckets[i] += n
+
+    def percentile(self, p):
+        """
+        Estimates a percentile of the recorded times.
+
+        Args:
+        - p (float): The percentile, between 0 and 100.
+
+        Returns:
+        - int: The upper edge of the bucket the percentile falls in, in
+        nanoseconds (never more than the slowest time recorded).
+
+        """
+        if self.count == 0:
+            return 0
+        target = p / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= target and n > 0:
+                return min(1 << i, self.max_ns)
+        return self.max_ns
+
+    def export(self):
+        """
+        Returns:
+        - dict: The histogram as plain data (for JSON or another process).
+
+        """
+        return {'count': self.count, 'total_ns': self.total_ns,
+                'max_ns': self.max_ns, 'buckets': list(self.buckets)}
+
+    @classmethod
+    def fromExport(cls, data):
+        """
+        Rebuilds a histogram from the result of export().
+
+        Args:
+        - data (dict): The exported histogram.
+
+        Returns:
+        - PhaseHistogram: The histogram.
+
+        """
+        histogram = cls()
+        histogram.count = data['count']
+        histogram.total_ns = data['total_ns']
+        histogram.max_ns = data['max_ns']
+        histogram.buckets = list(data['buckets'])
+        return histogram
+
+
+
+
+###################### Phase Timers ######################
+
+# Times how long each species spends in each phase of a timestep. Every thread
+# records into its own table of histograms so recording never takes a lock.
+# The tables are only added up when someone asks for the results. Creatures
+# only call lap() when phase timing is turned on (see World.phase_timing)
+# so when it's off the only cost is checking that flag.
+class PhaseTimers:
+    PHASES = ('perception', 'steering', 'eating', 'reproduction', 'barrier')
+
+    def __init__(self, enabled=False, json_path=None):
+        """
+        Initializes a PhaseTimers class object
+
+        Args:
+        - enabled (bool): Whether the creatures record their phase times.
+        - json_path (str): Where to save the timings as JSON at the end of
+        the run, if anywhere.
+
+        """
+        self.enabled = enabled
+        self.json_path = json_path
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        # the table of every thread that is recording, by thread id
+        self.tables = {}
+        # times from threads that finished and from other processes
+        self.finished = {}
+
+    def _table(self):
+        table = getattr(self.local, 'table', None)
+        if table is None:
+            table = {}
+            self.local.table = table
+            with self.lock:
+                self.tables[threading.get_ident()] = table
+        return table
+
+    def lap(self, species, phase, start):
+        """
+        Records the time since start as one run of a phase.
+
+        Args:
+        - species (str): The species the time belongs to.
+        - phase (str): The phase, one of PHASES.
+        - start (int): When the phase started (from perf_counter_ns).
+
+        Returns:
+        - int: The current time, so it can be the start of the next phase.
+
+        """
+        now = perf_counter_ns()
+        table = self._table()
+        histogram = table.get((species, phase))
+        if histogram is None:
+            histogram = table[(species, phase)] = PhaseHistogram()
+        histogram.add(now - start)
+        return now
+
+    def flushThread(self):
+        """
+        Moves the times recorded by the current thread into the finished
+        times. Called by creature threads before they exit so the tables of
+        dead threads don't pile up.
+
+        """
+        table = getattr(self.local, 'table', None)
+        if table is None:
+            return
+        self.local.table = None
+        with self.lock:
+            del self.tables[threading.get_ident()]
+            self._mergeInto(self.finished, table)
+
+    @staticmethod
+    def _mergeInto(total, table):
+        for key, histogram in table.items():
+            if key not in total:
+                total[key] = PhaseHistogram()
+            total[key].merge(histogram)
+
+    def histograms(self):
+        """
+        Adds up the times recorded by every thread so far.
+
+        Returns:
+        - dict: A PhaseHistogram for each (species, phase) pair.
+
+        """
+        total = {}
+        with self.lock:
+            self._mergeInto(total, self.finished)
+            for table in self.tables.values():
+                # copy first since the thread may still be adding to it
+                self._mergeInto(total, dict(table))
+        return total
+
+    def export(self):
+        """
+        Returns:
+        - dict: Every histogram as plain data, by species and then phase.
+
+        """
+        exported = {}
+        for (species, phase), histogram in sorted(self.histograms().items()):
+            exported.setdefault(species, {})[phase] = histogram.export()
+        return exported
+
+    def merge(self, exported):
+        """
+        Adds timings exported by another process to this one.
+
+        Args:
+        - exported (dict): The result of another PhaseTimers' export().
+
+        """
+        with self.lock:
+            for species, phases in exported.items():
+                for phase, data in phases.items():
+                    self._mergeInto(self.finished, {
+                        (species, phase): PhaseHistogram.fromExport(data)})
+
+    def printReport(self):
+        """
+        Prints how much time each species spent in each phase.
+
+        """
+        histograms = self.histograms()
+        if not histograms:
+            return
+        print("Phase Timings (times in microseconds, p50/p99 are rounded up "
+              "to a power of two nanoseconds):")
+        print(f"  {'species':<8}{'phase':<14}{'count':>10}{'total ms':>11}"
+              f"{'mean':>9}{'p50':>9}{'p99':>9}{'max':>10}{'share':>8}")
+        for species in sorted({species for species, _ in histograms}):
+            species_total = max(sum(h.total_ns for (s, _), h
+                                    in histograms.items() if s == species), 1)
+            for phase in self.PHASES:
+                h = histograms.get((species, phase))
+                if h is None:
+                    continue
+                print(f"  {species:<8}{phase:<14}{h.count:>10}"
+                      f"{h.total_ns / 1e6:>11.1f}"
+                      f"{h.total_ns / h.count / 1e3:>9.2f}"
+                      f"{h.percentile(50) / 1e3:>9.2f}"
+                      f"{h.percentile(99) / 1e3:>9.2f}"
+                      f"{h.max_ns / 1e3:>10.1f}"
+                      f"{h.total_ns / species_total:>8.1%}")
+
+    def dump(self, path):
+        """
+        Saves the timings as JSON.
+
+        Args:
+        - path (str): The file to write.
+
+        """
+        with open(path, 'w') as file:
+            json.dump(self.export(), file, indent=2)
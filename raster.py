@@ -0,0 +1,118 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+# Drawing into an array of pixels, shared by the raster renderer and the
+# viewer (which runs in its own process and doesn't import global_stuff).
+# Needs numpy.
+
+###################### Shapes ######################
+
+def shape_offsets(radius, inside):
+    """
+    Lists the pixels of a shape.
+
+    Args:
+    - radius (int): Half the width of the box around the shape.
+    - inside (function): Whether the pixel (dx, dy) from the centre is part
+    of the shape.
+
+    Returns:
+    - numpy.ndarray: The dy and dx of every pixel of the shape (2 rows).
+
+    """
+    return np.array([(dy, dx) for dy in range(-radius, radius + 1)
+                     for dx in range(-radius, radius + 1)
+                     if inside(dx, dy)]).T
+
+def creature_shapes():
+    """
+    Returns:
+    - tuple: The pixels of a plant, a rabbit and a fox (see shape_offsets),
+    the same shapes the canvas renderer draws.
+
+    """
+    return (shape_offsets(5, lambda dx, dy: True),
+            shape_offsets(7, lambda dx, dy: dx * dx + dy * dy <= 49),
+            shape_offsets(10, lambda dx, dy: 2 * abs(dx) <= 10 - dy))
+
+
+
+
+###################### Pixel Buffer ######################
+
+# An RGB image kept in a numpy array. Shapes are stamped for many creatures
+# at once, so drawing a frame costs about the same however many creatures
+# there are.
+class PixelBuffer:
+    def __init__(self, width, height):
+        """
+        Initializes a PixelBuffer class object
+
+        Args:
+        - width (int): Width of the image in pixels.
+        - height (int): Height of the image in pixels.
+
+        """
+        if np is None:
+            raise RuntimeError("drawing into pixels needs numpy installed")
+        self.width = width
+        self.height = height
+        self.pixels = np.empty((height, width, 3), dtype=np.uint8)
+        self.ppm_header = f'P6 {width} {height} 255 '.encode()
+
+    def clear(self, color):
+        """
+        Fills the image with a color.
+
+        """
+        self.pixels[:] = color
+
+    def stamp(self, positions, offsets, colors):
+        """
+        Draws a shape at a number of positions.
+
+        Args:
+        - positions (numpy.ndarray): The x and y of each shape (one row
+        each).
+        - offsets (numpy.ndarray): The pixels of the shape (see
+        shape_offsets).
+        - colors (numpy.ndarray): One color, or one color per position.
+
+        """
+        if len(positions) == 0:
+            return
+        centres = np.rint(positions).astype(np.intp)
+        # every pixel of every shape
+        ys = centres[:, 1, None] + offsets[0]
+        xs = centres[:, 0, None] + offsets[1]
+        inside = (ys >= 0) & (ys < self.height) & (xs >= 0) & (xs < self.width)
+        if colors.ndim == 2:
+            colors = np.broadcast_to(colors[:, None, :],
+                                     ys.shape + (3,))[inside]
+        self.pixels[ys[inside], xs[inside]] = colors
+
+    def ppm(self):
+        """
+        Returns:
+        - bytes: The image as a binary PPM file, which tkinter's PhotoImage
+        can load directly.
+
+        """
+        return self.ppm_header + self.pixels.tobytes()
+
+def tk_color(widget, name):
+    """
+    Args:
+    - widget: Any tkinter widget.
+    - name (str): A tk color name, e.g. "green".
+
+    Returns:
+    - numpy.ndarray: The color as 8-bit red, green and blue.
+
+    """
+    # tk gives 16 bits per channel
+    return np.array([c >> 8 for c in widget.winfo_rgb(name)], dtype=np.uint8)
@@ -0,0 +1,250 @@
+from time import perf_counter
+from global_stuff import *
+
+from raster import PixelBuffer, creature_shapes, tk_color, np
+
+
+
+###################### Shapes ######################
+
+# The canvas coordinates of each species' shape around a position
+def plant_shape(x, y):
+    return (x - 5, y - 5, x + 5, y + 5)
+
+def rabbit_shape(x, y):
+    return (x - 7, y - 7, x + 7, y + 7)
+
+def fox_shape(x, y):
+    return (x - 10, y - 10, x + 10, y - 10, x, y + 10)
+
+
+
+
+###################### Renderer ######################
+
+# Draws the world from the snapshot published at the end of every tick. It
+# runs on the Tk main thread through canvas.after (like update_count) so the
+# creature threads never touch the canvas and no lock is needed. Each frame
+# shows the latest snapshot however many ticks ran since the last frame.
+# Subclasses do the actual drawing in draw().
+class Renderer:
+    def __init__(self, world, fps=60):
+        """
+        Initializes a Renderer class object
+
+        Args:
+        - world (World): The world to draw, on its canvas.
+        - fps (float): How many frames to draw per second.
+
+        """
+        self.world = world
+        self.canvas = world.canvas
+        self.frame_time = 1 / fps
+        self.after_id = None
+        self.frames = 0
+
+    def start(self):
+        """
+        Draws the first frame and keeps drawing until stop() is called or the
+        simulation ends.
+
+        """
+        self.drawFrame()
+
+    def stop(self):
+        """
+        Stops drawing frames.
+
+        """
+        if self.after_id is not None:
+            self.canvas.after_cancel(self.after_id)
+            self.after_id = None
+
+    def drawFrame(self):
+        """
+        Draws the latest snapshot and schedules the next frame.
+
+        """
+        start = perf_counter()
+        world = self.world
+        # nothing is drawn while fast-forwarding
+        if world.tick_pacer.rendering or world.sim_done_event.is_set():
+            self.draw(world.world_view.current)
+            self.frames += 1
+
+        # draw the last state once more after the simulation ends, then stop
+        if world.sim_done_event.is_set():
+            self.after_id = None
+            return
+        elapsed = perf_counter() - start
+        delay = max(int((self.frame_time - elapsed) * 1000), 1)
+        self.after_id = self.canvas.after(delay, self.drawFrame)
+
+    def draw(self, view):
+        """
+        Draws a snapshot.
+
+        Args:
+        - view (WorldSnapshot): The snapshot to draw.
+
+        """
+        raise NotImplementedError
+
+
+
+
+###################### Canvas Renderer ######################
+
+# Keeps a canvas item per creature. Each frame creates items for creatures
+# that showed up, moves the ones that moved and deletes the ones that are
+# gone, all in one go.
+class CanvasRenderer(Renderer):
+    def __init__(self, world, fps=60):
+        """
+        Initializes a CanvasRenderer class object
+
+        Args:
+        - world (World): The world to draw, on its canvas.
+        - fps (float): How many frames to draw per second.
+
+        """
+        Renderer.__init__(self, world, fps)
+        # the canvas item and last drawn position of every creature we drew,
+        # per species
+        self.items = {'plants': {}, 'rabbits': {}, 'foxes': {}}
+
+    def draw(self, view):
+        """
+        Brings the canvas items up to date with a snapshot.
+
+        Args:
+        - view (WorldSnapshot): The snapshot to draw.
+
+        """
+        self._drawSpecies(self.items['plants'], view.plants, plant_shape,
+                          self._createPlant)
+        self._drawSpecies(self.items['rabbits'], view.rabbits, rabbit_shape,
+                          self._createRabbit)
+        self._drawSpecies(self.items['foxes'], view.foxes, fox_shape,
+                          self._createFox)
+
+    def _createPlant(self, creature, x, y):
+        return self.canvas.create_rectangle(*plant_shape(x, y), fill="green",
+                                            outline="")
+
+    def _createRabbit(self, creature, x, y):
+        # rabbits are colored by their genes
+        return self.canvas.create_oval(*rabbit_shape(x, y),
+                                       fill=rgb_to_hex(creature.genes.color),
+                                       outline="")
+
+    def _createFox(self, creature, x, y):
+        return self.canvas.create_polygon(*fox_shape(x, y), fill="red",
+                                          outline="")
+
+    def _drawSpecies(self, items, species, shape, create):
+        """
+        Draws one species of a snapshot.
+
+        Args:
+        - items (dict): The canvas item and drawn position of each creature
+        of the species drawn last frame. Updated in place.
+        - species (SpeciesView): The species in the snapshot.
+        - shape (function): Gives the coordinates of the shape at a position.
+        - create (function): Creates the canvas item of a creature at a
+        position.
+
+        """
+        canvas = self.canvas
+        gone = dict(items)
+        for creature, seen in species.seen.items():
+            drawn = gone.pop(creature, None)
+            if drawn is None:
+                items[creature] = (create(creature, *seen.position),
+                                   seen.position)
+            elif drawn[1] != seen.position:
+                canvas.coords(drawn[0], *shape(*seen.position))
+                items[creature] = (drawn[0], seen.position)
+        for creature, (item, _) in gone.items():
+            canvas.delete(item)
+            del items[creature]
+
+
+
+
+###################### Raster Renderer ######################
+
+# Draws every frame into an array of pixels and shows it as a single image on
+# the canvas, so there are no canvas items per creature to create, move and
+# delete. Needs numpy.
+class RasterRenderer(Renderer):
+    def __init__(self, world, fps=60):
+        """
+        Initializes a RasterRenderer class object and puts its image on the
+        canvas, under the stat boxes.
+
+        Args:
+        - world (World): The world to draw, on its canvas.
+        - fps (float): How many frames to draw per second.
+
+        """
+        # imported here so tkinter is only needed when there is a window
+        import tkinter as tk
+        Renderer.__init__(self, world, fps)
+        canvas = self.canvas
+        self.buffer = PixelBuffer(world.canvas_width, world.canvas_height)
+        self.photo = tk.PhotoImage(master=canvas, width=world.canvas_width,
+                                   height=world.canvas_height)
+        self.image = canvas.create_image(0, 0, anchor='nw', image=self.photo)
+        canvas.tag_lower(self.image)
+        # the same shapes and colors the canvas renderer draws
+        self.plant_pixels, self.rabbit_pixels, self.fox_pixels = \
+            creature_shapes()
+        self.background = tk_color(canvas, "white")
+        self.plant_color = tk_color(canvas, "green")
+        self.fox_color = tk_color(canvas, "red")
+        # rabbits keep their color for life so remember it
+        self.rabbit_colors = {}
+
+    def draw(self, view):
+        """
+        Draws a snapshot into the pixels and shows them.
+
+        Args:
+        - view (WorldSnapshot): The snapshot to draw.
+
+        """
+        buffer = self.buffer
+        buffer.clear(self.background)
+        buffer.stamp(positions(view.plants), self.plant_pixels,
+                     self.plant_color)
+        colors = self.rabbit_colors
+        rabbit_colors = []
+        for creature in view.rabbits.seen:
+            color = colors.get(creature)
+            if color is None:
+                # the same color rgb_to_hex gives the canvas renderer
+                color = colors[creature] = tuple(
+                    int(c) for c in creature.genes.color)
+            rabbit_colors.append(color)
+        buffer.stamp(positions(view.rabbits), self.rabbit_pixels,
+                     np.array(rabbit_colors, dtype=np.uint8).reshape(-1, 3))
+        buffer.stamp(positions(view.foxes), self.fox_pixels, self.fox_color)
+        # forget the colors of rabbits that are gone
+        if len(colors) > 2 * len(rabbit_colors) + 100:
+            self.rabbit_colors = {creature: colors[creature]
+                                  for creature in view.rabbits.seen}
+        self.photo.configure(data=buffer.ppm(), format='PPM')
+
+
+def positions(species):
+    """
+    Args:
+    - species (SpeciesView): A species in a snapshot.
+
+    Returns:
+    - numpy.ndarray: The x and y of every creature of the species.
+
+    """
+    return np.array([seen.position for seen in species.seen.values()],
+                    dtype=float).reshape(-1, 2)
@@ -0,0 +1,336 @@
+import argparse
+import json
+import struct
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+# A run file holds everything output.csv does, plus the genes of every animal
+# born and the parameters the simulation ran with, in a binary layout numpy
+# can map straight into arrays (no parsing at all). Everything is little
+# endian:
+#
+#   preamble    PREAMBLE (48 bytes): MAGIC, VERSION, header length,
+#               population offset, population count, births offset and
+#               births count
+#   header      JSON with the simulation parameters and the record layouts,
+#               padded with spaces to a multiple of 8 bytes
+#   population  one POPULATION record per event, like a row of output.csv
+#   births      one BIRTH record per animal born with genes (rabbits)
+#
+# Both record sections start at a multiple of 8 bytes. For example:
+#
+#   header, population, births = read_run_file('output.run')
+#   population['rabbits'].max()
+
+###################### Layout ######################
+
+MAGIC = b'FRPRUN\r\n'
+VERSION = 1
+PREAMBLE = struct.Struct('<8sIIQQQQ')
+
+# (name, struct code, numpy type) of each field of a record
+POPULATION_FIELDS = (('time', 'd', '<f8'), ('plants', 'i', '<i4'),
+                     ('rabbits', 'i', '<i4'), ('foxes', 'i', '<i4'))
+BIRTH_FIELDS = (('time', 'd', '<f8'), ('speed', 'd', '<f8'),
+                ('metabolism', 'd', '<f8'), ('fearFactor', 'd', '<f8'),
+                ('hungerFactor', 'd', '<f8'), ('generation', 'i', '<i4'),
+                ('species', 'I', '<u4'))
+
+POPULATION = struct.Struct('<' + ''.join(code for _, code, _ in
+                                         POPULATION_FIELDS))
+BIRTH = struct.Struct('<' + ''.join(code for _, code, _ in BIRTH_FIELDS))
+
+
+def _align(n):
+    # round up to a multiple of 8 bytes
+    return (n + 7) // 8 * 8
+
+def dtype(fields):
+    """
+    Args:
+    - fields (tuple): POPULATION_FIELDS or BIRTH_FIELDS.
+
+    Returns:
+    - numpy.dtype: The type of one record, for np.memmap or np.frombuffer.
+
+    """
+    if np is None:
+        raise RuntimeError("reading run files as arrays needs numpy installed")
+    return np.dtype([(name, np_type) for name, _, np_type in fields])
+
+
+
+
+###################### Gene Log ######################
+
+# The genes of every animal born, kept as parallel arrays like the EventLog
+# until they are written to the run file. With a cap only the newest births
+# are kept. Not thread safe on its own; StatsCollector only uses it while
+# holding its lock.
+class GeneLog:
+    def __init__(self, cap=None):
+        """
+        Initializes an empty GeneLog class object
+
+        Args:
+        - cap (int): The most births to keep, None keeps every birth.
+
+        """
+        self.cap = cap
+        if cap is None:
+            self.columns = [array(code) for _, code, _ in BIRTH_FIELDS]
+        else:
+            self.columns = [array(code, [0]) * cap
+                            for _, code, _ in BIRTH_FIELDS]
+        self.next = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, time, genes, species):
+        """
+        Adds a birth to the log.
+
+        Args:
+        - time (float): When the animal was born (seconds or tick number).
+        - genes (Gene): The genes of the animal.
+        - species (int): The index of its species in event_log.SPECIES.
+
+        """
+        self._add((time, genes.speed, genes.metabolism, genes.fearFactor,
+                   genes.hungerFactor, genes.generation, species))
+
+    def _add(self, record):
+        if self.cap is None:
+            for column, value in zip(self.columns, record):
+                column.append(value)
+            self.size += 1
+            return
+        for column, value in zip(self.columns, record):
+            column[self.next] = value
+        self.next = (self.next + 1) % self.cap
+        self.size = min(self.size + 1, self.cap)
+
+    def records(self):
+        """
+        Returns:
+        - generator: The fields of each birth (see BIRTH_FIELDS), oldest
+        first.
+
+        """
+        start = self.next if self.size == self.cap else 0
+        length = len(self.columns[0])
+        for i in range(self.size):
+            j = (start + i) % length
+            yield tuple(column[j] for column in self.columns)
+
+    def arrays(self):
+        """
+        Copies the columns without going through the births one by one.
+
+        Returns:
+        - dict: A copy of each column as an array by field name, oldest
+        birth first.
+
+        """
+        arrays = {}
+        for (name, _, _), column in zip(BIRTH_FIELDS, self.columns):
+            if self.cap is not None and self.size == self.cap:
+                arrays[name] = column[self.next:] + column[:self.next]
+            else:
+                arrays[name] = column[:self.size]
+        return arrays
+
+    def load(self, arrays):
+        """
+        Replaces the births with the ones from another log's arrays() (e.g.
+        saved in a checkpoint). If there are more than the cap, only the
+        newest are kept.
+
+        Args:
+        - arrays (dict): An array per field, oldest birth first.
+
+        """
+        self.__init__(self.cap)
+        n = len(arrays['time'])
+        extra = 0 if self.cap is None else max(n - self.cap, 0)
+        self.columns = []
+        for name, code, _ in BIRTH_FIELDS:
+            column = arrays[name][extra:]
+            if self.cap is not None:
+                column += array(code, [0]) * (self.cap - len(column))
+            self.columns.append(column)
+        self.size = n - extra
+        if self.cap is not None:
+            self.next = self.size % self.cap
+
+    def export(self):
+        """
+        Returns:
+        - list: The births as plain arrays, oldest first (for another
+        process).
+
+        """
+        exported = [array(code) for _, code, _ in BIRTH_FIELDS]
+        for record in self.records():
+            for column, value in zip(exported, record):
+                column.append(value)
+        return exported
+
+    def merge(self, other):
+        """
+        Adds the births exported by another log to this one, keeping them in
+        time order.
+
+        Args:
+        - other (list): The result of another log's export().
+
+        """
+        records = list(self.records())
+        records.extend(zip(*other))
+        records.sort(key=lambda record: record[0])
+        self.__init__(self.cap)
+        for record in records:
+            self._add(record)
+
+
+
+
+###################### Writing and Reading ######################
+
+def write_run_file(path, parameters, tick_timestamps, population, n_rows,
+                   births):
+    """
+    Writes a run file.
+
+    Args:
+    - path (str): The file to write.
+    - parameters (dict): The parameters the simulation ran with.
+    - tick_timestamps (bool): Whether the times are tick numbers rather than
+    seconds since the start.
+    - population (iterable): (time, plants, rabbits, foxes) for each event.
+    - n_rows (int): How many rows population has.
+    - births (GeneLog): The genes of the animals born.
+
+    """
+    header = json.dumps({
+        'parameters': parameters,
+        'time': 'tick' if tick_timestamps else 'seconds',
+        'population': [[name, np_type] for name, _, np_type in
+                       POPULATION_FIELDS],
+        'births': [[name, np_type] for name, _, np_type in BIRTH_FIELDS],
+    }).encode()
+    header += b' ' * (_align(len(header)) - len(header))
+    population_offset = PREAMBLE.size + len(header)
+    births_offset = _align(population_offset + n_rows * POPULATION.size)
+    with open(path, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(header),
+                                 population_offset, n_rows, births_offset,
+                                 len(births)))
+        file.write(header)
+        # pack the rows a chunk at a time so big runs don't need the whole
+        # section in memory at once
+        chunk = bytearray()
+        for row in population:
+            chunk += POPULATION.pack(*row)
+            if len(chunk) >= 1 << 20:
+                file.write(chunk)
+                chunk = bytearray()
+        file.write(chunk)
+        file.write(b'\0' * (births_offset - file.tell()))
+        chunk = bytearray()
+        for record in births.records():
+            chunk += BIRTH.pack(*record)
+            if len(chunk) >= 1 << 20:
+                file.write(chunk)
+                chunk = bytearray()
+        file.write(chunk)
+
+def read_preamble(file):
+    """
+    Reads the start of a run file.
+
+    Args:
+    - file: The run file, opened in binary mode.
+
+    Returns:
+    - tuple: The header (dict), and the offset and number of records of the
+    population and births sections.
+
+    """
+    (magic, version, header_length, population_offset, n_rows, births_offset,
+     n_births) = PREAMBLE.unpack(file.read(PREAMBLE.size))
+    if magic != MAGIC:
+        raise ValueError("not a run file")
+    if version != VERSION:
+        raise ValueError("unsupported run file version %d" % version)
+    header = json.loads(file.read(header_length))
+    return header, population_offset, n_rows, births_offset, n_births
+
+def read_run_file(path):
+    """
+    Maps a run file into numpy arrays without reading it all in.
+
+    Args:
+    - path (str): The run file.
+
+    Returns:
+    - tuple: The header (dict), then the population and births as
+    structured numpy arrays (np.memmap) with a field per column.
+
+    """
+    with open(path, 'rb') as file:
+        (header, population_offset, n_rows, births_offset,
+         n_births) = read_preamble(file)
+    population = np.memmap(path, dtype(POPULATION_FIELDS), 'r',
+                           population_offset, (n_rows,))
+    births = np.memmap(path, dtype(BIRTH_FIELDS), 'r', births_offset,
+                       (n_births,))
+    return header, population, births
+
+def convert_to_csv(path, csv_path='output.csv'):
+    """
+    Writes the population of a run file as CSV, in the same layout as
+    output.csv. Doesn't need numpy.
+
+    Args:
+    - path (str): The run file.
+    - csv_path (str): The CSV file to write.
+
+    """
+    with open(path, 'rb') as file:
+        header, population_offset, n_rows, _, _ = read_preamble(file)
+        ticks = header['time'] == 'tick'
+        file.seek(population_offset)
+        with open(csv_path, 'w') as csv:
+            left = n_rows
+            while left:
+                n = min(left, 1 << 16)
+                left -= n
+                data = file.read(n * POPULATION.size)
+                for time, plants, rabbits, foxes in POPULATION.iter_unpack(
+                        data):
+                    if ticks:
+                        time = int(time)
+                    csv.write(f"{time},{plants},{rabbits},{foxes}\n")
+
+
+
+
+###################### Main ######################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=
+                        "Convert a run file to the layout of output.csv.")
+    parser.add_argument('run_file', help="The run file to read")
+    parser.add_argument('csv_file', nargs='?', default='output.csv',
+                        help="The CSV file to write")
+    args = parser.parse_args()
+    convert_to_csv(args.run_file, args.csv_file)
@@ -0,0 +1,165 @@
+from output_writer import OutputWriter
+
+
+
+###################### Intervals ######################
+
+# The min, max and mean of each population over one interval
+class Interval:
+    __slots__ = ('index', 'count', 'mins', 'maxs', 'sums')
+
+    def __init__(self, index):
+        """
+        Initializes an empty Interval class object
+
+        Args:
+        - index (int): Which interval this is (its start divided by its
+        width).
+
+        """
+        self.index = index
+        self.count = 0
+        self.mins = None
+        self.maxs = None
+        self.sums = [0, 0, 0]
+
+    def add(self, population):
+        """
+        Adds one observation of the plant, rabbit and fox populations.
+
+        """
+        if self.count == 0:
+            self.mins = list(population)
+            self.maxs = list(population)
+        else:
+            self.mins = [min(a, b) for a, b in zip(self.mins, population)]
+            self.maxs = [max(a, b) for a, b in zip(self.maxs, population)]
+        self.sums = [a + b for a, b in zip(self.sums, population)]
+        self.count += 1
+
+    def addInterval(self, other):
+        """
+        Adds a shorter interval that lies inside this one.
+
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.mins = list(other.mins)
+            self.maxs = list(other.maxs)
+        else:
+            self.mins = [min(a, b) for a, b in zip(self.mins, other.mins)]
+            self.maxs = [max(a, b) for a, b in zip(self.maxs, other.maxs)]
+        self.sums = [a + b for a, b in zip(self.sums, other.sums)]
+        self.count += other.count
+
+
+
+
+###################### Rollup Sampler ######################
+
+# Boils the population over time down to one row per fixed interval (of ticks
+# or seconds) with the min, max and mean of each population, plus coarser
+# "rollup" levels that are a fixed multiple of that interval long. Only the
+# interval currently being filled is kept for each level and finished rows go
+# straight to a CSV file, so memory stays the same however long the run is.
+class RollupSampler:
+    HEADER = ('start', 'end', 'samples',
+              'plants_min', 'plants_max', 'plants_mean',
+              'rabbits_min', 'rabbits_max', 'rabbits_mean',
+              'foxes_min', 'foxes_max', 'foxes_mean')
+
+    def __init__(self, interval, unit, factors=(10, 100), prefix='output'):
+        """
+        Initializes a RollupSampler class object
+
+        Args:
+        - interval (float): Width of the finest intervals.
+        - unit (str): 's' if the intervals are in seconds, 'ticks' if they
+        are in ticks.
+        - factors (tuple): How many times wider each rollup level is than
+        the finest intervals.
+        - prefix (str): Each level is written to <prefix>_<width><unit>.csv.
+
+        """
+        self.unit = unit
+        self.widths = [interval] + [interval * f for f in factors]
+        self.paths = [f'{prefix}_{width:g}{unit}.csv'
+                      for width in self.widths]
+        # the files are only created once the first row is ready. With the
+        # sharded engine that means only the process that does the sampling
+        # opens them
+        self.writers = [None] * len(self.widths)
+        self.current = [None] * len(self.widths)
+
+    def observe(self, when, population):
+        """
+        Adds an observation of the populations.
+
+        Args:
+        - when (float): When the observation was made, in the sampler's
+        unit. Must not go backwards.
+        - population (list): The number of plants, rabbits and foxes.
+
+        """
+        index = int(when // self.widths[0])
+        current = self.current[0]
+        if current is not None and current.index != index:
+            self._finish(0)
+            current = None
+        if current is None:
+            current = self.current[0] = Interval(index)
+        current.add(population)
+
+    def _finish(self, level):
+        # write out the interval of this level and add it to the next one
+        interval = self.current[level]
+        self.current[level] = None
+        self._write(level, interval)
+        if level + 1 == len(self.widths):
+            return
+        start = interval.index * self.widths[level]
+        index = int(start // self.widths[level + 1])
+        parent = self.current[level + 1]
+        if parent is not None and parent.index != index:
+            self._finish(level + 1)
+            parent = None
+        if parent is None:
+            parent = self.current[level + 1] = Interval(index)
+        parent.addInterval(interval)
+
+    def _write(self, level, interval):
+        writer = self.writers[level]
+        if writer is None:
+            writer = self.writers[level] = OutputWriter(self.paths[level])
+            writer.writeRow(*self.HEADER)
+        width = self.widths[level]
+        row = [f'{interval.index * width:g}',
+               f'{(interval.index + 1) * width:g}', interval.count]
+        for low, high, total in zip(interval.mins, interval.maxs,
+                                    interval.sums):
+            row += [low, high, f'{total / interval.count:.3f}']
+        writer.writeRow(*row)
+
+    def maybeFlush(self):
+        """
+        Writes out finished rows that have waited long enough (see
+        OutputWriter.maybeFlush).
+
+        """
+        for writer in self.writers:
+            if writer is not None:
+                writer.maybeFlush()
+
+    def close(self):
+        """
+        Writes out the unfinished intervals and closes the files.
+
+        """
+        for level in range(len(self.widths)):
+            if self.current[level] is not None:
+                self._finish(level)
+        for writer in self.writers:
+            if writer is not None:
+                writer.close()
+        self.writers = [None] * len(self.widths)
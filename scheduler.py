@@ -0,0 +1,126 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+
+###################### Tick Scheduler ######################
+
+# The scheduler replaces the thread-per-creature design. Creatures are plain
+# objects and every tick the scheduler splits them into chunks and runs
+# creature.step() for each of them on a fixed pool of worker threads. The end
+# of a tick is simply the point where every chunk is finished, so there is no
+# barrier for the creatures to wait at.
+class TickScheduler:
+    def __init__(self, world, n_workers, chunk_size=64):
+        """
+        Initializes a TickScheduler class object
+
+        Args:
+        - world (World): The world whose creatures are stepped.
+        - n_workers (int): Number of worker threads to step creatures on.
+        - chunk_size (int): Number of creatures a worker steps at a time.
+
+        """
+        self.world = world
+        self.n_workers = n_workers
+        self.chunk_size = chunk_size
+        # the creatures stepped every tick
+        self.creatures = []
+        # creatures born (or started) during a tick. they join next tick
+        self.new_creatures = []
+        self.new_lock = threading.Lock()
+        self.pool = None
+        if n_workers > 1:
+            self.pool = ThreadPoolExecutor(max_workers=n_workers)
+
+    def add(self, creature):
+        """
+        Adds a creature to the scheduler. It is stepped from the next tick on.
+
+        Args:
+        - creature: The creature to add.
+
+        """
+        with self.new_lock:
+            self.new_creatures.append(creature)
+
+    def discard(self, creatures):
+        """
+        Stops stepping some creatures without them dying, e.g. when they are
+        handed to another process. Only called between ticks.
+
+        Args:
+        - creatures (set): The creatures to drop.
+
+        """
+        self.creatures = [c for c in self.creatures if c not in creatures]
+        with self.new_lock:
+            self.new_creatures = [c for c in self.new_creatures
+                                  if c not in creatures]
+
+    def _stepChunk(self, chunk):
+        """
+        Steps every creature in a chunk and removes the ones that died.
+
+        Args:
+        - chunk (list): The creatures to step.
+
+        Returns:
+        - list: The creatures that are still alive.
+
+        """
+        alive = []
+        for creature in chunk:
+            # like in the threaded version, a creature notices it died at the
+            # start of its next timestep
+            if creature.isAlive():
+                creature.step()
+                alive.append(creature)
+            else:
+                creature.die()
+        return alive
+
+    def runTick(self):
+        """
+        Runs one timestep for every creature.
+
+        """
+        with self.new_lock:
+            self.creatures.extend(self.new_creatures)
+            self.new_creatures = []
+
+        creatures = self.creatures
+        chunks = [creatures[i:i + self.chunk_size]
+                  for i in range(0, len(creatures), self.chunk_size)]
+        if self.pool is None:
+            results = map(self._stepChunk, chunks)
+        else:
+            results = self.pool.map(self._stepChunk, chunks)
+        self.creatures = [c for alive in results for c in alive]
+
+    def run(self):
+        """
+        Runs ticks until the simulation is done.
+
+        In headless mode the simulation also ends when the animals go
+        extinct. Between ticks the tick pacer decides how long to wait.
+
+        """
+        world = self.world
+        stats = world.stats_collector
+        while not world.sim_done_event.is_set():
+            self.runTick()
+            stats.record_tick()
+            world.publish_snapshot()
+            # the creatures born this tick are stepped after the rest
+            world.checkpoint_tick(self.creatures + self.new_creatures)
+            if (world.tick_budget is not None and
+                    stats.ticks >= world.tick_budget):
+                world.sim_done_event.set()
+            elif (world.headless and
+                    len(world.rabbits) + len(world.foxes) == 0):
+                world.sim_done_event.set()
+            else:
+                world.tick_pacer.pace()
+        if self.pool is not None:
+            self.pool.shutdown()
@@ -0,0 +1,342 @@
+import math
+import multiprocessing
+import queue
+import random
+from global_stuff import *
+from creature import *
+from gene import *
+from scheduler import TickScheduler
+from world import World
+
+
+
+###################### Tile Layout ######################
+
+# The sharded engine splits the canvas into a grid of tiles and gives each tile
+# its own process. Each process only steps the creatures inside its tile.
+# Creatures near the edge of a tile are copied to the neighbouring tiles as
+# "ghosts" every tick so creatures on the other side can still see them, and
+# creatures that walk (or are born) across an edge are handed to the tile they
+# ended up in.
+class TileLayout:
+    def __init__(self, world, n_tiles, ghost_width):
+        """
+        Initializes a TileLayout class object
+
+        Args:
+        - world (World): The world whose canvas is split.
+        - n_tiles (int): Number of tiles to split the canvas into.
+        - ghost_width (float): How far from its tile a creature is still
+        copied to a neighbouring tile.
+
+        """
+        width = world.canvas_width
+        height = world.canvas_height - world.stat_bottom
+        # pick the split into cols x rows whose tiles are the most square
+        self.cols, self.rows = min(
+            ((c, n_tiles // c) for c in range(1, n_tiles + 1)
+             if n_tiles % c == 0),
+            key=lambda cr: abs(math.log((width / cr[0]) /
+                                        (height / cr[1]))))
+        self.n_tiles = n_tiles
+        self.top = world.stat_bottom
+        self.tile_width = width / self.cols
+        self.tile_height = height / self.rows
+        self.ghost_width = ghost_width
+
+    def tileOf(self, x, y):
+        """
+        Finds the tile a point belongs to.
+
+        Args:
+        - x (float): The x-coordinate of the point.
+        - y (float): The y-coordinate of the point.
+
+        Returns:
+        - int: The index of the tile.
+
+        """
+        col = int(clamp(x // self.tile_width, 0, self.cols - 1))
+        row = int(clamp((y - self.top) // self.tile_height,
+                        0, self.rows - 1))
+        return row * self.cols + col
+
+    def ghostTilesOf(self, x, y, own):
+        """
+        Finds the other tiles that should see a creature as a ghost.
+
+        Args:
+        - x (float): The x-coordinate of the creature.
+        - y (float): The y-coordinate of the creature.
+        - own (int): The tile the creature belongs to.
+
+        Returns:
+        - set: Indices of the tiles within ghost_width of the point.
+
+        """
+        w = self.ghost_width
+        tiles = {self.tileOf(x + dx, y + dy)
+                 for dx in (-w, 0, w) for dy in (-w, 0, w)}
+        tiles.discard(own)
+        return tiles
+
+
+
+
+###################### Packing Creatures ######################
+
+# Ghosts only need to be seen, not stepped, so they just have the attributes a
+# snapshot reads
+class Ghost:
+    __slots__ = ('position', 'health')
+
+    def __init__(self, x, y, health):
+        self.position = [x, y]
+        self.health = health
+
+def pack(creature):
+    """
+    Turns a creature into plain data that can be sent to another process.
+
+    Args:
+    - creature: The creature to pack.
+
+    Returns:
+    - tuple: The species followed by what's needed to rebuild the creature.
+    The last item seeds the creature's random numbers in its new process.
+
+    """
+    x, y = creature.position
+    seed = creature.rng.getrandbits(64)
+    if isinstance(creature, Plant):
+        return ('plant', x, y, creature.foodValue, creature.reproduceRate,
+                seed)
+    elif isinstance(creature, Rabbit):
+        return ('rabbit', x, y, creature.health, creature.genes.genome(),
+                seed)
+    else:
+        return ('fox', x, y, creature.health, seed)
+
+def adopt(world, data):
+    """
+    Rebuilds a packed creature in this process, adds it to the simulation
+    and starts it.
+
+    Args:
+    - world (World): The world to add the creature to.
+    - data (tuple): The result of pack().
+
+    """
+    species, x, y = data[:3]
+    rng = random.Random(data[-1])
+    if species == 'plant':
+        creature = Plant(world, [x, y], data[3], data[4], rng)
+        with world.plant_lock:
+            world.plants.append(creature)
+    elif species == 'rabbit':
+        creature = Rabbit(world, [x, y], Gene(data[4]), rng)
+        creature.health = data[3]
+        with world.rabbit_lock:
+            world.rabbits.append(creature)
+    else:
+        creature = Fox(world, [x, y], data[3], rng)
+        with world.fox_lock:
+            world.foxes.append(creature)
+    creature.start()
+
+
+
+
+###################### Tile Process ######################
+
+def run_tile(args, parameters, random_state, index, layout, initial, inboxes,
+             counts, sync, stop, decision, results):
+    """
+    Main function of a tile process. Runs ticks for the creatures in one tile
+    in lockstep with the other tiles until they all agree to stop.
+
+    Args:
+    - args (argparse.Namespace): The options of the run.
+    - parameters (dict): The simulation parameters of the run.
+    - random_state (tuple): The state of the world's sim_random when the
+    tiles started, so seeded runs repeat.
+    - index (int): The index of this tile.
+    - layout (TileLayout): How the canvas is split into tiles.
+    - initial (list): The packed creatures this tile starts with.
+    - inboxes (list): One multiprocessing.Queue per tile for messages to it.
+    - counts (multiprocessing.Array): Number of plants, rabbits and foxes
+    in each tile.
+    - sync (multiprocessing.Barrier): Barrier shared by every tile.
+    - stop (multiprocessing.Value): Set by the main process to stop early.
+    - decision (multiprocessing.Value): Set by tile 0 when every tile
+    should stop.
+    - results (multiprocessing.Queue): Where the tile sends its stats.
+
+    """
+    # every tile has a world of its own, holding only the creatures of the
+    # tile. Only plain data is handed to the process so it works whether the
+    # process is forked or spawned
+    world = World(args, parameters)
+    world.sim_random.setstate(random_state)
+    plants, rabbits, foxes = world.plants, world.rabbits, world.foxes
+    stats_collector = world.stats_collector
+    stats_collector.start_clock()
+    scheduler = TickScheduler(world, 1)
+    world.scheduler = scheduler
+    for data in initial:
+        adopt(world, data)
+
+    def owns(x, y):
+        return layout.tileOf(x, y) == index
+    world.publish_snapshot(plant_owns=owns)
+
+    others = [i for i in range(layout.n_tiles) if i != index]
+    while True:
+        scheduler.runTick()
+        stats_collector.record_tick(sample=False)
+
+        # creatures that left our tile are handed to the tile they are in and
+        # creatures near the edge are sent to the tiles next to it as ghosts.
+        # Plants seed much further than a tile can see, so spots for seeds
+        # that landed in another tile are sent to that tile to check
+        outgoing = {i: ([], [], [], [], []) for i in others}
+        for x, y in world.world_view.current.plants.remote_claims:
+            outgoing[layout.tileOf(x, y)][4].append((x, y))
+        leaving = set()
+        for species, creatures, lock in ((1, plants, world.plant_lock),
+                                         (2, rabbits, world.rabbit_lock),
+                                         (3, foxes, world.fox_lock)):
+            with lock:
+                for creature in creatures:
+                    if not creature.isAlive():
+                        continue
+                    x, y = creature.position
+                    tile = layout.tileOf(x, y)
+                    if tile != index:
+                        outgoing[tile][0].append(pack(creature))
+                        leaving.add(creature)
+                        continue
+                    for ghost_tile in layout.ghostTilesOf(x, y, index):
+                        outgoing[ghost_tile][species].append(
+                            (x, y, getattr(creature, 'health', 0)))
+                creatures[:] = [c for c in creatures if c not in leaving]
+        if leaving:
+            scheduler.discard(leaving)
+        for i in others:
+            inboxes[i].put((index, outgoing[i]))
+
+        # every other tile sends us exactly one message per tick. They are
+        # handled in tile order, not arrival order, so seeded runs repeat
+        messages = sorted(inboxes[index].get() for _ in others)
+        ghost_plants, ghost_rabbits, ghost_foxes = [], [], []
+        seeds = []
+        for _, message in messages:
+            arrivals, g_plants, g_rabbits, g_foxes, g_seeds = message
+            for data in arrivals:
+                adopt(world, data)
+            ghost_plants.extend(Ghost(*g) for g in g_plants)
+            ghost_rabbits.extend(Ghost(*g) for g in g_rabbits)
+            ghost_foxes.extend(Ghost(*g) for g in g_foxes)
+            seeds.extend(g_seeds)
+        world.publish_snapshot(ghost_plants, ghost_rabbits, ghost_foxes, owns)
+
+        # check the seeds against our plants like Plant.reproduce does
+        for x, y in seeds:
+            if (len(plants) + world.remote_population['plants'] <
+                    world.maxPlants and
+                    world.world_view.current.plants.claimSpot(
+                        x, y, world.minPlantDistance)):
+                Plant.sprout(world, x, y)
+
+        # agree on whether to keep going. tile 0 decides once everyone has
+        # written their population, then everyone reads the decision
+        counts[3 * index:3 * index + 3] = [len(plants), len(rabbits),
+                                           len(foxes)]
+        if sync.wait() == 0:
+            animals = sum(counts[1::3]) + sum(counts[2::3])
+            done = (stop.value or animals == 0 or
+                    (world.tick_budget is not None and
+                     stats_collector.ticks >= world.tick_budget))
+            decision.value = 1 if done else 0
+        # tile 0 samples the population of the whole world. Nobody changes
+        # counts until everyone is past the next wait
+        if index == 0:
+            stats_collector.sample([sum(counts[offset::3])
+                                    for offset in range(3)])
+        sync.wait()
+        if decision.value:
+            break
+        # the population caps are for the whole world so remember how many
+        # creatures the other tiles have
+        for offset, name in enumerate(('plants', 'rabbits', 'foxes')):
+            world.remote_population[name] = (sum(counts[offset::3]) -
+                                             counts[3 * index + offset])
+
+    if index == 0:
+        stats_collector.close_output()
+    results.put((index, stats_collector.ticks, stats_collector.export()))
+
+
+
+
+###################### Coordinator ######################
+
+def run_shards(world, n_tiles, started=None):
+    """
+    Splits a world into tiles, runs a process per tile until the simulation
+    ends and merges the stats of every tile into the world's stats_collector.
+
+    Args:
+    - world (World): The world to split.
+    - n_tiles (int): Number of tiles (and processes).
+    - started (function): Called once every tile process is running.
+
+    """
+    # creatures further apart than this can't see each other across a tile
+    # edge. rabbitRadius is as far as rabbits care about each other
+    layout = TileLayout(world, n_tiles, world.rabbitRadius)
+    initial = [[] for _ in range(n_tiles)]
+    for creature in world.plants + world.rabbits + world.foxes:
+        initial[layout.tileOf(*creature.position)].append(pack(creature))
+
+    inboxes = [multiprocessing.Queue() for _ in range(n_tiles)]
+    counts = multiprocessing.Array('i', 3 * n_tiles)
+    sync = multiprocessing.Barrier(n_tiles)
+    stop = multiprocessing.Value('b', 0)
+    decision = multiprocessing.Value('b', 0)
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=run_tile,
+                                         args=(world.args, world.parameters,
+                                               world.sim_random.getstate(),
+                                               i, layout, initial[i],
+                                               inboxes, counts, sync, stop,
+                                               decision, results),
+                                         daemon=True)
+                 for i in range(n_tiles)]
+
+    stats_collector = world.stats_collector
+    stats_collector.start_clock()
+    for process in processes:
+        process.start()
+    if started is not None:
+        started()
+
+    # wait for every tile to report back, passing on a 'q' from the user
+    finished = []
+    while len(finished) < n_tiles:
+        if world.sim_done_event.is_set():
+            stop.value = 1
+        try:
+            finished.append(results.get(timeout=0.05))
+        except queue.Empty:
+            if not any(p.is_alive() for p in processes):
+                raise RuntimeError("a tile process exited unexpectedly")
+    for process in processes:
+        process.join()
+    # merge in tile order so events in the same tick always come out in the
+    # same order
+    finished.sort(key=lambda result: result[0])
+
+    stats_collector.record_ticks(max(ticks for _, ticks, _ in finished))
+    for _, _, stats in finished:
+        stats_collector.merge(stats)
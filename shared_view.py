@@ -0,0 +1,267 @@
+import struct
+import sys
+import threading
+from multiprocessing import shared_memory
+from time import monotonic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+# Lets a viewer in another process (see viewer.py) watch a running
+# simulation. At the end of a tick the simulation copies every creature's
+# position and color into a block of shared memory, and the viewer maps the
+# same block and draws it. Nothing is copied while no viewer is attached, so a
+# viewer can come and go at any time without slowing the simulation down.
+#
+# The block holds HEADER followed by two frames ("double buffering"). Each
+# frame is FRAME followed by capacity records (see record_dtype). Frame k is
+# written into slot k % 2 with 'writing' set to k while it's written and
+# 'published' set to k once it's done, so the viewer can copy the newest frame
+# while the next one is being written into the other slot. Everything is
+# little endian.
+
+###################### Layout ######################
+
+MAGIC = b'FRPVIEW\n'
+VERSION = 1
+# magic, version, capacity, width, height, finished, writing, published, and
+# the time the viewer last looked (time.monotonic(), 0 if never)
+HEADER = struct.Struct('<8sIIIII4xqqd')
+# where the fields that change during a run are in the header
+FINISHED_AT = 24
+WRITING_AT = 32
+PUBLISHED_AT = 40
+HEARTBEAT_AT = 48
+# tick, and the number of plants, rabbits and foxes
+FRAME = struct.Struct('<qiii4x')
+SPECIES = ('plant', 'rabbit', 'fox')
+
+# a viewer that hasn't looked for this many seconds is gone
+VIEWER_TIMEOUT = 1.0
+
+
+def record_dtype():
+    """
+    Returns:
+    - numpy.dtype: The type of one creature in a frame: its position, its
+    species (an index into SPECIES) and its color (only used for rabbits).
+
+    """
+    return np.dtype([('x', '<f4'), ('y', '<f4'), ('species', 'u1'),
+                     ('r', 'u1'), ('g', 'u1'), ('b', 'u1')])
+
+def _frame_size(capacity):
+    return FRAME.size + capacity * record_dtype().itemsize
+
+def _frame_offset(capacity, slot):
+    return HEADER.size + slot * _frame_size(capacity)
+
+
+
+
+###################### Writer ######################
+
+# Used by the simulation to publish frames.
+class SharedViewWriter:
+    def __init__(self, name, capacity, width, height, max_rate=100):
+        """
+        Initializes a SharedViewWriter class object and creates the shared
+        memory block.
+
+        Args:
+        - name (str): The name of the block the viewer attaches to.
+        - capacity (int): The most creatures a frame can hold. Creatures past
+        that aren't shown.
+        - width (int): Width of the canvas.
+        - height (int): Height of the canvas.
+        - max_rate (float): Most frames to publish per second.
+
+        """
+        if np is None:
+            raise RuntimeError("sharing the view needs numpy installed")
+        self.capacity = capacity
+        self.min_interval = 1 / max_rate
+        self.last_publish = 0
+        self.frames = 0
+        # publish() runs on whichever thread ends a tick, so make sure it
+        # can't run while close() takes the memory away
+        self.lock = threading.Lock()
+        size = HEADER.size + 2 * _frame_size(capacity)
+        try:
+            self.memory = shared_memory.SharedMemory(name, create=True,
+                                                     size=size)
+        except FileExistsError:
+            # left over from a simulation that didn't shut down properly
+            stale = shared_memory.SharedMemory(name)
+            stale.close()
+            stale.unlink()
+            self.memory = shared_memory.SharedMemory(name, create=True,
+                                                     size=size)
+        HEADER.pack_into(self.memory.buf, 0, MAGIC, VERSION, capacity, width,
+                         height, 0, 0, 0, 0.0)
+        self.records = [np.ndarray((capacity,), record_dtype(),
+                                   self.memory.buf,
+                                   _frame_offset(capacity, slot) + FRAME.size)
+                        for slot in range(2)]
+
+    def attached(self):
+        """
+        Returns:
+        - bool: Whether a viewer has looked at the frames lately.
+
+        """
+        heartbeat = HEADER.unpack_from(self.memory.buf, 0)[-1]
+        return heartbeat > 0 and monotonic() - heartbeat < VIEWER_TIMEOUT
+
+    def publish(self, tick, view):
+        """
+        Copies a snapshot into the shared memory, if a viewer is watching
+        and the last frame wasn't too long ago.
+
+        Args:
+        - tick (int): The tick the snapshot was taken at.
+        - view (WorldSnapshot): The snapshot.
+
+        """
+        with self.lock:
+            now = monotonic()
+            if (self.records is None or
+                    now - self.last_publish < self.min_interval or
+                    not self.attached()):
+                return
+            self.last_publish = now
+            self._write(tick, view)
+
+    def _write(self, tick, view):
+        # copy the snapshot into the next slot
+        self.frames += 1
+        frame = self.frames
+        slot = frame % 2
+        buf = self.memory.buf
+        struct.pack_into('<q', buf, WRITING_AT, frame)
+        records = self.records[slot]
+        n = 0
+        counts = []
+        for species, creatures in enumerate((view.plants, view.rabbits,
+                                             view.foxes)):
+            counts.append(len(creatures))
+            seen = list(creatures.seen.values())[:self.capacity - n]
+            if not seen:
+                continue
+            chunk = records[n:n + len(seen)]
+            positions = np.array([s.position for s in seen], dtype=float)
+            chunk['x'] = positions[:, 0]
+            chunk['y'] = positions[:, 1]
+            chunk['species'] = species
+            if species == 1:
+                colors = np.array([s.creature.genes.color for s in seen],
+                                  dtype=float).astype(np.uint8)
+                chunk['r'] = colors[:, 0]
+                chunk['g'] = colors[:, 1]
+                chunk['b'] = colors[:, 2]
+            n += len(seen)
+        # the viewer works out how many records there are from the counts
+        FRAME.pack_into(buf, _frame_offset(self.capacity, slot), tick,
+                        *counts)
+        struct.pack_into('<q', buf, PUBLISHED_AT, frame)
+
+    def close(self):
+        """
+        Tells the viewer the simulation is over and removes the shared
+        memory block. An attached viewer keeps showing the last frame.
+
+        """
+        with self.lock:
+            if self.records is None:
+                return
+            struct.pack_into('<I', self.memory.buf, FINISHED_AT, 1)
+            self.records = None
+            self.memory.close()
+            self.memory.unlink()
+
+
+
+
+###################### Reader ######################
+
+# Used by the viewer to read frames.
+class SharedViewReader:
+    def __init__(self, name):
+        """
+        Initializes a SharedViewReader class object and attaches to the
+        shared memory block of a running simulation.
+
+        Args:
+        - name (str): The name of the block.
+
+        Raises:
+        - FileNotFoundError: If no simulation is sharing under that name.
+
+        """
+        if np is None:
+            raise RuntimeError("viewing needs numpy installed")
+        # the resource tracker would remove the block when the viewer exits,
+        # but it belongs to the simulation. Since python 3.13 we can tell
+        # SharedMemory not to track it (and it does by default), before that
+        # we have to take it off the tracker's list ourselves
+        if sys.version_info >= (3, 13):
+            self.memory = shared_memory.SharedMemory(name, track=False)
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(self.memory._name, 'shared_memory')
+        magic, version, self.capacity, self.width, self.height = \
+            HEADER.unpack_from(self.memory.buf, 0)[:5]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s isn't a simulation view" % name)
+        self.records = [np.ndarray((self.capacity,), record_dtype(),
+                                   self.memory.buf,
+                                   _frame_offset(self.capacity, slot) +
+                                   FRAME.size)
+                        for slot in range(2)]
+
+    def finished(self):
+        """
+        Returns:
+        - bool: Whether the simulation has ended.
+
+        """
+        return HEADER.unpack_from(self.memory.buf, 0)[5] == 1
+
+    def read(self):
+        """
+        Copies the newest frame and tells the simulation we're watching.
+
+        Returns:
+        - tuple: The tick, the number of plants, rabbits and foxes, and a
+        copy of the records of the creatures (see record_dtype). None if
+        there is no frame yet.
+
+        """
+        buf = self.memory.buf
+        struct.pack_into('<d', buf, HEARTBEAT_AT, monotonic())
+        while True:
+            frame = struct.unpack_from('<q', buf, PUBLISHED_AT)[0]
+            if frame == 0:
+                return None
+            slot = frame % 2
+            tick, *counts = FRAME.unpack_from(
+                buf, _frame_offset(self.capacity, slot))
+            n = min(sum(counts), self.capacity)
+            records = self.records[slot][:n].copy()
+            # if the simulation started writing into this slot again while
+            # we copied it, the copy might be torn so try again
+            if struct.unpack_from('<q', buf, WRITING_AT)[0] < frame + 2:
+                return tick, counts, records
+
+    def close(self):
+        """
+        Detaches from the shared memory. The simulation carries on.
+
+        """
+        self.records = None
+        self.memory.close()
@@ -1,4 +1,3 @@
-import tkinter as tk
 import threading
 from time import sleep
 import random
@@ -6,17 +5,22 @@ import math
 from global_stuff import *
 from creature import *
 from gene import *
+from world import World
+from scheduler import TickScheduler
+from renderer import CanvasRenderer, RasterRenderer
+from checkpoint import SPECIES_FIELDS, read_checkpoint, rng_state
 import sys
 
 
 
 ###################### Stat Display ######################
 
-def draw_count(creature_name):
+def draw_count(world, creature_name):
     """
     Draws a stats box on the canvas.
 
     Args:
+    - world (World): The world whose canvas to draw on.
     - creature_name (str): name of species stat box to draw on canvas
 
     Returns:
@@ -25,32 +29,33 @@ def draw_count(creature_name):
     """
     if (creature_name == "plant") :
         string = "PLANTS\n" \
-                    + "population: " + str(len(plants))
+                    + "population: " + str(len(world.plants))
         # calculate the portion of the screen
         frac_of_screen_x1 = 0
         frac_of_screen_x2 = 1 / 3
         color = plant_color
     elif (creature_name == "rabbit") :
         string = "RABBITS\n" \
-                        + "population: " + str(len(rabbits)) \
-                        + "\n avg speed: " + str(rabbitSpeed) \
-                        + "\n avg health: " + str(get_avg_rabbit_health())
+                        + "population: " + str(len(world.rabbits)) \
+                        + "\n avg speed: " + str(world.rabbitSpeed) \
+                        + "\n avg health: " + str(get_avg_rabbit_health(world))
         # calculate the portion of the screen
         frac_of_screen_x1 = 1 / 3
         frac_of_screen_x2 = 2 / 3
         color = rabbit_color
     else : 
         string = "FOXES\n" \
-                + "population: " + str(len(foxes))
+                + "population: " + str(len(world.foxes))
         # calculate the portion of the screen
         frac_of_screen_x1 = 2 / 3
         frac_of_screen_x2 = 1
         color = fox_color
     
-    x1 = canvas_width * frac_of_screen_x1
-    x2 = canvas_width * frac_of_screen_x2
+    canvas = world.canvas
+    x1 = world.canvas_width * frac_of_screen_x1
+    x2 = world.canvas_width * frac_of_screen_x2
     y1 = 0
-    y2 = stat_height
+    y2 = world.stat_height
     # create outline
     square = canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="")
     # add text
@@ -58,28 +63,32 @@ def draw_count(creature_name):
                               (y1 + y2) / 2,
                               text=str(string),
                               fill="black",
-                              font=("Arial", int(stat_height/6)))
+                              font=("Arial", int(world.stat_height/6)))
     return square, text
 
 
-def get_avg_rabbit_health():
+def get_avg_rabbit_health(world):
     """
     Calculates average health for rabbits.
 
     If there are rabbits present, calculates the average health
     of all rabbits. Otherwise, returns 0 as default average health.
 
+    Args:
+    - world (World): The world the rabbits live in.
+
     Returns:
     - An int representing the average health of rabbits. If there are no 
         rabbits, returns 0.
 
     """
+    rabbits = world.rabbits
     if (len(rabbits) > 0):
         health = [getattr(rabbit, 'health', None) for rabbit in rabbits]
         return sum(health) // len(health)   
     return 0
 
-def update_count(plant_cnt, rabbit_cnt, fox_cnt): 
+def update_count(world, plant_cnt, rabbit_cnt, fox_cnt): 
     """
     Updates the count display for plants, rabbits, and foxes on the canvas.
 
@@ -88,14 +97,16 @@ def update_count(plant_cnt, rabbit_cnt, fox_cnt):
     updates the count labels on the canvas, and schedules the next update.
 
     """
+    canvas = world.canvas
     plant_stats = "PLANTS\n" \
-                    + "population: " + str(len(plants))
+                    + "population: " + str(len(world.plants))
     rabbit_stats = "RABBITS\n" \
-                + "population: " + str(len(rabbits)) \
-                + "\n avg speed: " + str(stats_collector.average_rabbit_speed) \
-                + "\n avg health: " + str(get_avg_rabbit_health())
+                + "population: " + str(len(world.rabbits)) \
+                + "\n avg speed: " \
+                + str(world.stats_collector.average_rabbit_speed) \
+                + "\n avg health: " + str(get_avg_rabbit_health(world))
     fox_stats = "FOXES\n" \
-                + "population: " + str(len(foxes))
+                + "population: " + str(len(world.foxes))
 
     canvas.itemconfig(plant_cnt, text=plant_stats)
     canvas.itemconfig(rabbit_cnt, text=rabbit_stats)
@@ -104,10 +115,11 @@ def update_count(plant_cnt, rabbit_cnt, fox_cnt):
     # we have to use .after() here because directly manipulating the cavas
     # while not in the main thread can cause issues
     global after_id
-    after_id = canvas.after(1000, update_count, plant_cnt, rabbit_cnt, fox_cnt)
+    after_id = canvas.after(1000, update_count, world, plant_cnt, rabbit_cnt,
+                            fox_cnt)
 
     # if the simulation ends don't update the numbers
-    if sim_done:
+    if world.sim_done:
         canvas.after_cancel(after_id)
 
 
@@ -115,101 +127,442 @@ def update_count(plant_cnt, rabbit_cnt, fox_cnt):
 
 ###################### Listener Thread ######################
 
-def listen_to_user_input():
+def listen_to_user_input(world):
     """
     Listens to user input from the command line.
 
-    If the user enters 'q', the function sets the global variable 'sim_done' to True,
-    signals the 'sim_done_event', releases all semaphores in 'semList', and terminates.
+    If the user enters 'q', the function sets the world's 'sim_done' to True,
+    signals the 'sim_done_event', releases every thread waiting at the barrier,
+    and terminates. The other commands control how fast the simulation runs
+    (see print_commands).
+
+    Args:
+    - world (World): The world the commands are for.
 
     """
-    global stats_collector
-    global sim_done
-    global semList
+    stats_collector = world.stats_collector
+    tick_pacer = world.tick_pacer
     while True:
         # Apparently tkinter and the input() function don't work together
         # when multi-threading so we used readline()
-        user_input = sys.stdin.readline().strip()
-        # With more time, we can add more user options here
+        line = sys.stdin.readline()
+        # readline() returns an empty string once stdin is closed (e.g. when
+        # running headless in a batch job) so there's nothing left to listen to
+        if not line:
+            break
+        command = line.split()
+        user_input = command[0] if command else ""
         if user_input == "q":
             print("killing creatures")
             # signal done to all threads
-            sim_done = True
-            sim_done_event.set()
-
-            # flush the barrier
-            with semListLock:
-                for sem in semList:
-                    sem.release()
-                semList = []
-
-            # print the stats from the simulation
-            stats_collector.print_stats()
-            stats_collector.output_run_data()
+            world.sim_done = True
+            world.sim_done_event.set()
+
+            # flush the barrier and wake up the simulation if it's paused
+            world.tick_barrier.abort()
+            tick_pacer.stop()
+
+            # print the stats from the simulation. In headless mode the main
+            # thread does this once it sees the simulation is done
+            if not world.headless:
+                stats_collector.print_stats()
+                stats_collector.output_run_data()
             break
+        try:
+            if user_input == "p":
+                if tick_pacer.paused:
+                    tick_pacer.resume()
+                    print("resumed")
+                else:
+                    tick_pacer.pause()
+                    print("paused at tick", stats_collector.ticks)
+            elif user_input == "s":
+                ticks = int(command[1]) if len(command) > 1 else 1
+                if ticks <= 0:
+                    raise ValueError("the number of ticks has to be more "
+                                     "than 0")
+                tick_pacer.step(ticks)
+            elif user_input == "x":
+                speed = float(command[1])
+                if speed <= 0:
+                    raise ValueError("the speed has to be more than 0")
+                tick_pacer.setSpeed(speed)
+                print("speed", tick_pacer.speed)
+            elif user_input == "f":
+                ticks = int(command[1])
+                if ticks <= 0:
+                    raise ValueError("the number of ticks has to be more "
+                                     "than 0")
+                tick_pacer.fastForward(ticks)
+                print("fast-forwarding", ticks, "ticks")
+            elif user_input:
+                print_commands()
+        except (IndexError, ValueError):
+            print_commands()
+
+def print_commands():
+    """
+    Prints the commands listen_to_user_input understands.
+
+    """
+    print("commands: q (quit), p (pause/resume), s [N] (run N ticks and "
+          "pause, 1 by default), x SPEED (tick rate multiplier), "
+          "f N (run N ticks as fast as possible without drawing)")
 
 
 
 
 ###################### Main/Window Thread ######################
 
-def main():
+def populate_world(world):
     """
-    Main function for running the simulation.
+    Creates the starting population of foxes, rabbits and plants at random,
+    non-overlapping positions and adds them to the world's creature lists.
 
-    Initializes starting positions for creatures (foxes, rabbits, plants), 
-    draw stats boxes for each population, updates count information, 
-    starts input listener thread, starts threads for each creature type,
-    runs the simulation, prints statistics, and outputs run data.
+    Args:
+    - world (World): The world to populate.
+
+    Returns:
+    - list: Every creature, in the order to step them in.
 
     """
     all_initial_pos = set()
+    sim_random = world.sim_random
+    canvas_width = world.canvas_width
+    canvas_height = world.canvas_height
+    stat_bottom = world.stat_bottom
             
     def initialize_start_positions(creatures, n_creatures, creature_class):
             for _ in range(n_creatures): 
-                initial_pos = [random.randint(0, canvas_width-1), 
-                                random.randint(stat_bottom, canvas_height-1)]
+                initial_pos = [sim_random.randint(0, canvas_width-1), 
+                        sim_random.randint(stat_bottom, canvas_height-1)]
                 while tuple(initial_pos) in all_initial_pos:
-                    initial_pos = [random.randint(0, canvas_width-1), 
-                                random.randint(stat_bottom, canvas_height-1)]
+                    initial_pos = [sim_random.randint(0, canvas_width-1), 
+                        sim_random.randint(stat_bottom, canvas_height-1)]
                 all_initial_pos.add(tuple(initial_pos))
 
                 if creature_class == Plant:
-                    creature = creature_class(initial_pos, foodValue, plantRate)
+                    creature = creature_class(world, initial_pos,
+                                              world.foodValue, world.plantRate)
                 elif creature_class == Rabbit:
-                    creature = creature_class(initial_pos, Gene(rabbitStartingGenes))
+                    creature = creature_class(world, initial_pos,
+                                        Gene(world.rabbitStartingGenes))
                 else:
-                    creature = creature_class(initial_pos, health)
+                    creature = creature_class(world, initial_pos, world.health)
                 creatures.append(creature)
 
-    initialize_start_positions(foxes, n_foxes, Fox)
-    initialize_start_positions(rabbits, n_rabbits, Rabbit)
-    initialize_start_positions(plants, n_plants, Plant)
+    initialize_start_positions(world.foxes, world.n_foxes, Fox)
+    initialize_start_positions(world.rabbits, world.n_rabbits, Rabbit)
+    initialize_start_positions(world.plants, world.n_plants, Plant)
 
-    ## draw stat boxes
-    plant_square, plant_cnt = draw_count("plant")
-    rabbit_square, rabbit_cnt = draw_count("rabbit")
-    fox_square, fox_cnt = draw_count("fox")
-    update_count(plant_cnt, rabbit_cnt, fox_cnt)
+    # the creatures see this world during their first tick
+    world.publish_snapshot()
 
-    ## start threads
-    input_thread = threading.Thread(target=listen_to_user_input, daemon=True)
+    return world.plants + world.rabbits + world.foxes
+
+
+def restore_world(world, path):
+    """
+    Rebuilds the world and the stats saved in a checkpoint (see
+    checkpoint.py) so the run can carry on from there.
+
+    Args:
+    - world (World): The world to rebuild, made with the checkpoint's
+    parameters.
+    - path (str): The checkpoint.
+
+    Returns:
+    - list: Every creature, in the order they were stepped in.
+
+    """
+    header, sections = read_checkpoint(path)
+    world.sim_random.setstate((3, tuple(header['random']), None))
+    plants, rabbits, foxes = world.plants, world.rabbits, world.foxes
+
+    def columns(species):
+        fields = SPECIES_FIELDS[species][0]
+        return zip(*(sections[f'{species}.{field}'] for field in fields))
+
+    def rng(species, i):
+        creature_rng = random.Random()
+        creature_rng.setstate(rng_state(sections, species, i))
+        return creature_rng
+
+    for i, (x, y, food, rate) in enumerate(columns('plant')):
+        plant = Plant(world, [x, y], food, rate, rng('plant', i))
+        plants.append(plant)
+    for i, (x, y, rabbit_health, *genome) in enumerate(columns('rabbit')):
+        genome[9:12] = [tuple(genome[9:12])]
+        genome[-1] = int(genome[-1])
+        rabbit = Rabbit(world, [x, y], Gene(genome), rng('rabbit', i))
+        rabbit.health = rabbit_health
+        rabbits.append(rabbit)
+    for i, (x, y, fox_health) in enumerate(columns('fox')):
+        foxes.append(Fox(world, [x, y], fox_health, rng('fox', i)))
+
+    births = {name[len('births.'):]: column
+              for name, column in sections.items()
+              if name.startswith('births.')}
+    world.stats_collector.restore_state(
+        header['stats'],
+        {name[len('events.'):]: column for name, column in sections.items()
+         if name.startswith('events.')},
+        births or None)
+
+    # the creatures see the world as it was when the checkpoint was taken
+    world.publish_snapshot()
+
+    species = (plants, rabbits, foxes)
+    return [species[code][i] for code, i in zip(sections['order.species'],
+                                                sections['order.index'])]
+
+
+def start_creatures(world, creatures):
+    """
+    Starts every creature in the world. With the pool engine this only hands
+    them to the scheduler, which has to be run afterwards.
+
+    Args:
+    - world (World): The world the creatures live in.
+    - creatures (list): Every creature, in the order to step them in.
+
+    """
+    world.stats_collector.start_clock()
+
+    # hold a place in the barrier while starting the threads so the first
+    # creatures can't finish a tick before the rest of them have joined
+    world.tick_barrier.join()
+
+    for creature in creatures:
+        creature.start()
+
+    world.tick_barrier.leave()
+
+
+def start_world(world):
+    """
+    Populates the world, or rebuilds it from the checkpoint given to
+    --resume.
+
+    Args:
+    - world (World): The world to start.
+
+    Returns:
+    - list: Every creature, in the order to step them in.
+
+    """
+    if world.args.resume is not None:
+        return restore_world(world, world.args.resume)
+    return populate_world(world)
+
+
+def report_run(world):
+    """
+    Prints the stats of a finished headless run and writes its run data.
+
+    Args:
+    - world (World): The world that ran.
+
+    """
+    world.stats_collector.print_stats()
+    world.stats_collector.output_run_data()
+
+    print("Simulation Completed.")
+
+
+def start_listening(world):
+    """
+    Starts the thread that listens for commands on the command line.
+
+    Args:
+    - world (World): The world the commands are for.
+
+    """
+    input_thread = threading.Thread(target=listen_to_user_input,
+                                    args=(world,), daemon=True)
     input_thread.start()
 
-    for plant in plants:
-        plant.start()
 
-    for rabbit in rabbits:
-        rabbit.start()
+def run_vector(world, report=True):
+    """
+    Runs the simulation headless with the numpy vector engine.
+
+    The world is populated the same way as for the threaded simulation and
+    then copied into a VectorWorld which moves every creature at once each
+    tick.
+
+    Args:
+    - world (World): The world to run.
+    - report (bool): Whether to print the stats and write the run data at
+    the end (the benchmarks turn this off).
+
+    """
+    # imported here so numpy is only needed when this engine is used
+    from vector_engine import VectorWorld
+
+    populate_world(world)
+    vector_world = VectorWorld.from_creatures(world)
+
+    start_listening(world)
+
+    stats_collector = world.stats_collector
+    stats_collector.start_clock()
+    while not world.sim_done_event.is_set():
+        vector_world.step()
+        stats_collector.record_tick()
+        n_plants_left, n_rabbits_left, n_foxes_left = vector_world.counts()
+        if (world.tick_budget is not None and
+                stats_collector.ticks >= world.tick_budget):
+            world.sim_done_event.set()
+        elif n_rabbits_left + n_foxes_left == 0:
+            world.sim_done_event.set()
+        else:
+            world.tick_pacer.pace()
+    stats_collector.rabbit_gene_means = vector_world.gene_stats()
+
+    if report:
+        report_run(world)
+
+
+def run_sharded(world, report=True):
+    """
+    Runs the simulation headless with the sharded engine, one process per
+    tile of the canvas.
+
+    Args:
+    - world (World): The world to run.
+    - report (bool): See run_vector.
+
+    """
+    from sharded_engine import run_shards
+
+    populate_world(world)
+
+    # a new process closes its copy of stdin, which waits forever if another
+    # thread was reading stdin when the process forked. So we only start
+    # listening once the tiles are running
+    run_shards(world, world.n_tiles, started=lambda: start_listening(world))
+
+    if report:
+        report_run(world)
+
+
+def run_headless(world, report=True):
+    """
+    Runs the simulation without a window.
+
+    The simulation runs until the tick budget (--ticks) is used up, the
+    animals go extinct or the user types 'q'. Afterwards the stats and run
+    data are reported the same way as in the windowed simulation.
+
+    Args:
+    - world (World): The world to run.
+    - report (bool): See run_vector.
+
+    """
+    creatures = start_world(world)
+
+    start_listening(world)
+
+    start_creatures(world, creatures)
+
+    if world.scheduler is not None:
+        # the scheduler checks the tick budget and extinction itself
+        world.scheduler.run()
+
+    # the tick budget is checked at the barrier, but if every creature dies
+    # there is nobody left to reach the barrier so we check for extinction here
+    while not world.sim_done_event.wait(0.05):
+        with world.rabbit_lock:
+            with world.fox_lock:
+                extinct = len(world.rabbits) + len(world.foxes) == 0
+        if extinct:
+            world.sim_done_event.set()
+
+    if world.shared_view is not None:
+        world.shared_view.close()
+    if world.checkpointer is not None:
+        world.checkpointer.wait()
+
+    if report:
+        report_run(world)
 
-    for fox in foxes:
-        fox.start()
+
+def main(report=True, world=None):
+    """
+    Main function for running the simulation.
+
+    Initializes starting positions for creatures (foxes, rabbits, plants), 
+    draw stats boxes for each population, updates count information, 
+    starts input listener thread, starts threads for each creature type,
+    runs the simulation, prints statistics, and outputs run data.
+
+    Args:
+    - report (bool): Whether headless runs print their stats and write
+    their run data at the end.
+    - world (World): The world to run. By default one is made from the
+    command line.
+
+    Returns:
+    - World: The world that ran.
+
+    """
+    if world is None:
+        world = World(parse_args())
+
+    # stream the population to output.csv while the simulation runs. The
+    # sharded engine's processes only share their events at the end so it
+    # writes the file all at once instead
+    if report and world.engine != 'sharded':
+        world.stats_collector.open_output()
+
+    if world.engine == 'vector':
+        run_vector(world, report)
+        return world
+    if world.engine == 'sharded':
+        run_sharded(world, report)
+        return world
+    if world.engine == 'pool':
+        world.scheduler = TickScheduler(world, world.n_workers)
+    if world.headless:
+        run_headless(world, report)
+        return world
+
+    world.open_window()
+    creatures = start_world(world)
+
+    ## draw stat boxes
+    plant_square, plant_cnt = draw_count(world, "plant")
+    rabbit_square, rabbit_cnt = draw_count(world, "rabbit")
+    fox_square, fox_cnt = draw_count(world, "fox")
+    update_count(world, plant_cnt, rabbit_cnt, fox_cnt)
+
+    ## draw the creatures from the main thread
+    if world.renderer_type == 'raster':
+        renderer = RasterRenderer(world, world.fps)
+    else:
+        renderer = CanvasRenderer(world, world.fps)
+    renderer.start()
+
+    ## start threads
+    start_listening(world)
+
+    start_creatures(world, creatures)
+    if world.scheduler is not None:
+        threading.Thread(target=world.scheduler.run, daemon=True).start()
 
     # this runs as long as the window is open and ends when the user clicks the
     # 'x' button.
-    window.mainloop()
+    world.window.mainloop()
+
+    # the window was closed without typing q. Everything up to now is already
+    # in output.csv, it just needs the last rows written out
+    world.stats_collector.close_output()
+    if world.checkpointer is not None:
+        world.checkpointer.wait()
 
     print("Simulation Completed.")
+    return world
 
 
 
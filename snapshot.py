@@ -0,0 +1,155 @@
+import math
+import threading
+from collections import namedtuple
+from spatial_grid import SpatialGrid
+
+
+
+###################### World Snapshot ######################
+
+# What a creature sees of another creature. position is a tuple so it can't be
+# changed after the snapshot is taken.
+Seen = namedtuple('Seen', ['creature', 'position', 'health'])
+
+# Creatures sense the world through a snapshot taken at the end of the previous
+# tick and act on their own live position. The snapshot never changes while a
+# tick is running so reading it doesn't need any locks, and what a creature
+# sees no longer depends on which creatures happened to move before it.
+class SpeciesView:
+    def __init__(self, creatures, cell_size, owns=None):
+        """
+        Initializes a SpeciesView class object, a frozen copy of the positions
+        and health of one species with a spatial grid over them.
+
+        Args:
+        - creatures (list): The creatures of the species.
+        - cell_size (float): Cell size of the spatial grid.
+        - owns (function): Used by the sharded engine. Returns False for
+        spots that belong to another process, which has to check them itself.
+
+        """
+        self.grid = SpatialGrid(cell_size)
+        self.seen = {}
+        for creature in creatures:
+            seen = Seen(creature, tuple(creature.position),
+                        getattr(creature, 'health', None))
+            self.seen[creature] = seen
+            self.grid.insert(seen)
+        # spots given to creatures born this tick. They aren't in the
+        # snapshot yet but children still shouldn't be born on top of them
+        self.birth_spots = []
+        self.birth_lock = threading.Lock()
+        self.owns = owns
+        # spots that belong to another process and have to be sent to it
+        self.remote_claims = []
+
+    def __len__(self):
+        return len(self.seen)
+
+    def nearest(self, x, y, exclude=None, max_dist=math.inf):
+        """
+        Finds the creature closest to a point as of the start of the tick.
+
+        Args:
+        - x (float): The x-coordinate of the point.
+        - y (float): The y-coordinate of the point.
+        - exclude: A creature to ignore (usually the one searching).
+        - max_dist (float): Ignore creatures further away than this.
+
+        Returns:
+        - tuple: The Seen entry of the closest creature and its distance, or
+        (None, math.inf) if there isn't one.
+
+        """
+        return self.grid.nearest(x, y, exclude=self.seen.get(exclude),
+                                 max_dist=max_dist)
+
+    def distanceToNearest(self, x, y):
+        """
+        Finds the distance from a point to the closest creature, including
+        the ones born this tick.
+
+        Args:
+        - x (float): The x-coordinate of the point.
+        - y (float): The y-coordinate of the point.
+
+        Returns:
+        - float: The distance (infinity if there are no creatures).
+
+        """
+        dist = self.grid.nearest(x, y)[1]
+        with self.birth_lock:
+            for bx, by in self.birth_spots:
+                dist = min(dist, math.sqrt((x - bx) ** 2 + (y - by) ** 2))
+        return dist
+
+    def claimSpot(self, x, y, minDist):
+        """
+        Reserves a spot for a child if nothing of this species is within
+        minDist of it. Checking and reserving happen together so two parents
+        can't claim spots on top of each other in the same tick.
+
+        Args:
+        - x (float): The x-coordinate of the spot.
+        - y (float): The y-coordinate of the spot.
+        - minDist (float): The minimum distance to any other creature.
+
+        Returns:
+        - bool: True if the spot was free and is now reserved, or None if it
+        belongs to another process and was passed on to it.
+
+        """
+        if self.owns is not None and not self.owns(x, y):
+            with self.birth_lock:
+                self.remote_claims.append((x, y))
+            return None
+        if self.grid.nearest(x, y, max_dist=minDist)[0] is not None:
+            return False
+        with self.birth_lock:
+            for bx, by in self.birth_spots:
+                if math.sqrt((x - bx) ** 2 + (y - by) ** 2) <= minDist:
+                    return False
+            self.birth_spots.append((x, y))
+        return True
+
+
+class WorldSnapshot:
+    def __init__(self, plants, rabbits, foxes, plant_cell, animal_cell,
+                 plant_owns=None):
+        """
+        Initializes a WorldSnapshot class object. Must be taken while no
+        creature is moving (at the end of a tick).
+
+        Args:
+        - plants (list): List of plants.
+        - rabbits (list): List of rabbits.
+        - foxes (list): List of foxes.
+        - plant_cell (float): Grid cell size for plants.
+        - animal_cell (float): Grid cell size for rabbits and foxes.
+        - plant_owns (function): See SpeciesView. Only plants need it since
+        they can seed much further away than another process can see.
+
+        """
+        self.plants = SpeciesView(plants, plant_cell, plant_owns)
+        self.rabbits = SpeciesView(rabbits, animal_cell)
+        self.foxes = SpeciesView(foxes, animal_cell)
+
+
+class SnapshotBuffer:
+    def __init__(self):
+        """
+        Initializes a SnapshotBuffer class object. Holds the snapshot the
+        creatures read from while they write the next tick's positions.
+
+        """
+        self.current = WorldSnapshot([], [], [], 1, 1)
+
+    def publish(self, snapshot):
+        """
+        Replaces the current snapshot. Only called between ticks.
+
+        Args:
+        - snapshot (WorldSnapshot): The new snapshot.
+
+        """
+        self.current = snapshot
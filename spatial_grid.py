@@ -0,0 +1,141 @@
+import math
+
+
+
+###################### Spatial Grid ######################
+
+# The grid splits the canvas into square cells and remembers which creatures
+# are in each cell. Looking for the closest creature only has to look at the
+# cells around a point instead of every creature in the simulation, which is
+# what made each timestep O(n^2) before. Every snapshot builds a grid per
+# species once (see snapshot.py) and it's only read while a tick runs, so it
+# never has to follow creatures around or be locked.
+class SpatialGrid:
+    def __init__(self, cell_size):
+        """
+        Initializes a SpatialGrid class object
+
+        Args:
+        - cell_size (float): The width and height of each cell in pixels.
+
+        """
+        self.cell_size = cell_size
+        # maps (col, row) to the creatures in that cell. we use dicts as
+        # ordered sets so that the order we visit creatures in doesn't depend
+        # on their hashes
+        self.cells = {}
+        # maps each creature to the cell it's stored in
+        self.creature_cells = {}
+        # the range of cells that have ever held a creature. searches never
+        # need to go further than this
+        self.min_col = self.max_col = 0
+        self.min_row = self.max_row = 0
+
+    def __len__(self):
+        return len(self.creature_cells)
+
+    def __contains__(self, creature):
+        return creature in self.creature_cells
+
+    def cellOf(self, x, y):
+        """
+        Finds the cell a point falls in.
+
+        Args:
+        - x (float): The x-coordinate of the point.
+        - y (float): The y-coordinate of the point.
+
+        Returns:
+        - tuple: The (col, row) of the cell.
+
+        """
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, creature):
+        """
+        Adds a creature to the grid at its current position.
+
+        Args:
+        - creature: The creature to add.
+
+        """
+        cell = self.cellOf(creature.position[0], creature.position[1])
+        if not self.creature_cells:
+            self.min_col = self.max_col = cell[0]
+            self.min_row = self.max_row = cell[1]
+        else:
+            self.min_col = min(self.min_col, cell[0])
+            self.max_col = max(self.max_col, cell[0])
+            self.min_row = min(self.min_row, cell[1])
+            self.max_row = max(self.max_row, cell[1])
+        self.cells.setdefault(cell, {})[creature] = None
+        self.creature_cells[creature] = cell
+
+    def _ringCells(self, col, row, ring):
+        """
+        Yields the creatures in the square ring of cells that is exactly ring
+        cells away from (col, row).
+
+        """
+        if ring == 0:
+            yield from self.cells.get((col, row), ())
+            return
+        cells = self.cells
+        # top and bottom rows of the ring
+        for c in range(col - ring, col + ring + 1):
+            yield from cells.get((c, row - ring), ())
+            yield from cells.get((c, row + ring), ())
+        # left and right columns without the corners
+        for r in range(row - ring + 1, row + ring):
+            yield from cells.get((col - ring, r), ())
+            yield from cells.get((col + ring, r), ())
+
+    def _maxRing(self, col, row):
+        """
+        Returns the furthest ring from (col, row) that can hold a creature.
+
+        """
+        return max(abs(col - self.min_col), abs(col - self.max_col),
+                   abs(row - self.min_row), abs(row - self.max_row))
+
+    def nearest(self, x, y, exclude=None, max_dist=math.inf):
+        """
+        Finds the creature closest to a point by searching rings of cells
+        outwards from the point and stopping as soon as no unsearched cell
+        can hold anything closer.
+
+        Args:
+        - x (float): The x-coordinate of the point.
+        - y (float): The y-coordinate of the point.
+        - exclude: A creature to ignore (usually the one searching).
+        - max_dist (float): Ignore creatures further away than this.
+
+        Returns:
+        - tuple: The closest creature and its distance, or (None, math.inf)
+        if there isn't one.
+
+        """
+        best = None
+        best_dist = math.inf
+        if not self.creature_cells:
+            return best, best_dist
+        col, row = self.cellOf(x, y)
+        last_ring = self._maxRing(col, row)
+        ring = 0
+        while ring <= last_ring:
+            for creature in self._ringCells(col, row, ring):
+                if creature is exclude:
+                    continue
+                dist = math.sqrt((x - creature.position[0]) ** 2 +
+                                 (y - creature.position[1]) ** 2)
+                if dist < best_dist:
+                    best = creature
+                    best_dist = dist
+            # everything in the next ring is at least this far away
+            reach = ring * self.cell_size
+            if best_dist <= reach or reach >= max_dist:
+                break
+            ring += 1
+        if best_dist > max_dist:
+            return None, math.inf
+        return best, best_dist
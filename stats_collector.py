@@ -1,6 +1,32 @@
+import heapq
 import threading
-from global_stuff import *
-from datetime import datetime, time
+from array import array
+from operator import itemgetter
+from time import perf_counter, monotonic_ns
+from event_log import EventLog, EVENT_TYPES, EVENT_CODES, EVENT_SPECIES
+from output_writer import OutputWriter
+from run_file import GeneLog, write_run_file
+
+# how each kind of event changes the plant, rabbit and fox populations
+POPULATION_CHANGE = {'New plant born': (1, 0, 0), 'plant eaten': (-1, 0, 0),
+                     'New rabbit born': (0, 1, 0),
+                     'Rabbit passed away': (0, -1, 0),
+                     'Rabbit was eaten': (0, 0, 0), 'New fox born': (0, 0, 1),
+                     'Fox passed away': (0, 0, -1)}
+# the same by event type code
+CODE_POPULATION_CHANGE = [POPULATION_CHANGE[event_type]
+                          for event_type in EVENT_TYPES]
+# the totals saved in a checkpoint and put back when resuming
+CHECKPOINT_TOTALS = ('total_foxes_born', 'total_foxes_died',
+                     'total_rabbits_born', 'total_rabbits_died',
+                     'total_rabbits_eaten', 'total_rabbit_generations',
+                     'initial_num_rabbit', 'initial_num_plants',
+                     'initial_num_foxes', 'total_rabbit_speed',
+                     'initial_rabbit_speed', 'average_rabbit_speed',
+                     'total_rabbit_fear', 'total_rabbit_hunger',
+                     'average_fox_speed', 'ticks', 'barrier_ticks',
+                     'total_barrier_wait', 'total_straggler_wait',
+                     'max_straggler_wait')
 
 class StatsCollector:
     """
@@ -8,10 +34,15 @@ class StatsCollector:
 
     """
     def __init__(self, n_rabbits, n_plants, n_foxes,
-                 rabbitSpeed, fearFactor, hungerFactor):
+                 rabbitSpeed, fearFactor, hungerFactor, tick_timestamps=False,
+                 phase_timers=None, lock=None, lock_profiler=None,
+                 event_cap=None, sampler=None, run_file=None,
+                 run_parameters=None):
         # the stat collector needs to know about all of these starting stats
-        self.events = []
-        self.lock = threading.Lock()
+        # events are kept in a compact columnar log. With event_cap only the
+        # newest event_cap events are kept
+        self.events = EventLog(event_cap)
+        self.lock = lock if lock is not None else threading.Lock()
         self.total_foxes_born = 0
         self.total_foxes_died = 0
         self.total_rabbits_born = 0
@@ -22,31 +53,254 @@ class StatsCollector:
         self.initial_num_plants = n_plants
         self.initial_num_foxes = n_foxes
         self.total_rabbit_speed = n_rabbits * rabbitSpeed
+        self.initial_rabbit_speed = self.total_rabbit_speed
         self.average_rabbit_speed = 0
         self.total_rabbit_fear = n_rabbits * fearFactor
         self.total_rabbit_hunger = n_rabbits * hungerFactor
         self.average_fox_speed = 0
-        self.startTime = datetime.now().time()
+        # event timestamps are monotonic nanoseconds so they can't jump
+        # around if the system clock changes (or it passes midnight)
+        self.start_ns = monotonic_ns()
+        # the current plant, rabbit and fox populations, kept up to date from
+        # the events so they can be streamed to output.csv
+        self.population = [n_plants, n_rabbits, n_foxes]
+        # where the population is streamed to once open_output() is called
+        self.output = None
+        # tick counting for the ticks/sec figure. start_counter is reset by
+        # start_clock() once the creatures actually start running
+        self.ticks = 0
+        self.start_counter = perf_counter()
+        self.last_tick_counter = self.start_counter
+        # seconds the run had already been going for when it was resumed
+        # from a checkpoint
+        self.clock_offset = 0
+        # time creatures spent waiting at the barrier. the straggler wait is
+        # how long the first creature to finish a tick waited for the last
+        self.barrier_ticks = 0
+        self.total_barrier_wait = 0
+        self.total_straggler_wait = 0
+        self.max_straggler_wait = 0
+        # seeded runs stamp events with the tick they happened in instead of
+        # the wall clock so two runs with the same seed write the same file
+        self.tick_timestamps = tick_timestamps
+        # per-phase timings of the creatures, reported along with the stats
+        self.phase_timers = phase_timers
+        # reports how much the shared locks were fought over (--lock-profile)
+        self.lock_profiler = lock_profiler
+        # the mean of each gene over the rabbits alive at the end, printed
+        # with the stats. Only the vector engine sets it as it keeps every
+        # rabbit's genes in one table (see VectorWorld.gene_stats)
+        self.rabbit_gene_means = None
+        # writes the population at fixed intervals if it's a RollupSampler
+        self.sampler = sampler
+        # with run_file the populations and the genes of every rabbit born
+        # are also written to that file (see run_file.py) along with
+        # run_parameters
+        self.run_file = run_file
+        self.run_parameters = run_parameters or {}
+        self.births = GeneLog(event_cap) if run_file is not None else None
+        # every thread logs its events into a buffer of its own without
+        # taking the lock. Once a tick, whoever records the tick (the last
+        # creature at the barrier, the scheduler or the engine) moves them
+        # into the totals and the event log (see flush_events)
+        self.local = threading.local()
+        self.buffers = []
                 
-    def log_event(self, event_type, details, creature):
+    def log_event(self, event_type, creature, genes=None):
         """
-        Logs an event occurred during the simulation.
+        Logs an event occurred during the simulation. The event is recorded
+        at the creature's current position; a description of it is only
+        built if someone asks the event log for it. The event only goes into
+        a buffer of the calling thread, so no lock is needed; the totals and
+        the event log catch up the next time flush_events() is called.
 
         Args:
         - event_type (str): Type of the event.
-        - details (str): Details of the event.
         - creature: The creature involved in the event.
+        - genes (Gene): For births, the genes of the animal born (the
+        creature is its parent).
 
         """
+        x, y = creature.position
+        if self.tick_timestamps:
+            timestamp = self.ticks
+        else:
+            timestamp = monotonic_ns()
+        try:
+            buffer = self.local.events
+        except AttributeError:
+            buffer = self._new_buffer()
+        buffer.append((timestamp, event_type, x, y, creature, genes))
+
+    def _new_buffer(self):
+        # the first event of a thread makes its buffer
+        buffer = self.local.events = []
         with self.lock:
-            event_info = {
-                'timestamp': datetime.now().time(),
-                'event_type': event_type,
-                'details': details
-            }
-            self.collect_stats(event_type, creature)
-            self.events.append(event_info)
+            self.buffers.append((threading.current_thread(), buffer))
+        return buffer
+
+    def flush_events(self):
+        """
+        Moves the events waiting in every thread's buffer into the totals,
+        the event log and the streamed output, in time order. Threads can
+        keep logging while this runs; their new events wait for the next
+        flush.
+
+        """
+        with self.lock:
+            pending = []
+            buffers = []
+            for thread, buffer in self.buffers:
+                # the thread only ever appends, so taking everything up to n
+                # can't lose an event it logs in the meantime
+                n = len(buffer)
+                if n:
+                    pending.append(buffer[:n])
+                    del buffer[:n]
+                # dead threads won't log anything else
+                if thread.is_alive():
+                    buffers.append((thread, buffer))
+            self.buffers = buffers
+            # each buffer is already in time order. Ties keep the order of
+            # the buffers so seeded runs come out the same every time
+            for (timestamp, event_type, x, y, creature,
+                    genes) in heapq.merge(*pending, key=itemgetter(0)):
+                self.collect_stats(event_type, creature)
+                self.events.append(timestamp, event_type, x, y)
+                d_plant, d_rabbit, d_fox = POPULATION_CHANGE[event_type]
+                population = self.population
+                population[0] += d_plant
+                population[1] += d_rabbit
+                population[2] += d_fox
+                if self.output is not None:
+                    self.output.writeRow(self._when(timestamp), *population)
+                if genes is not None and self.births is not None:
+                    self.births.append(self._when(timestamp), genes,
+                                       EVENT_SPECIES[EVENT_CODES[event_type]])
+
+    def _when(self, timestamp):
+        # the first column of output.csv
+        if self.tick_timestamps:
+            return timestamp
+        return (timestamp - self.start_ns) / 1e9
+
+    def open_output(self, file_path='output.csv'):
+        """
+        Starts streaming the population to a CSV file. Every event adds a
+        row, and rows are written out at least about once a second.
+
+        Args:
+        - file_path (str): The file to write.
+
+        """
+        with self.lock:
+            self.output = OutputWriter(file_path)
+
+    def close_output(self):
+        """
+        Writes out the last rows and closes the file opened by open_output(),
+        along with the sampler's files.
+
+        """
+        self.flush_events()
+        with self.lock:
+            if self.output is not None:
+                self.output.close()
+                self.output = None
+            if self.sampler is not None:
+                self.sampler.close()
+
+    def sample(self, population=None):
+        """
+        Hands the current population to the sampler, if there is one.
+
+        Args:
+        - population (list): The number of plants, rabbits and foxes. By
+        default the population counted from this collector's events.
+
+        """
+        if self.sampler is None:
+            return
+        if self.sampler.unit == 'ticks':
+            # the tick that just finished
+            when = self.ticks - 1
+        else:
+            when = perf_counter() - self.start_counter
+        with self.lock:
+            if population is None:
+                population = self.population
+            self.sampler.observe(when, population)
+            self.sampler.maybeFlush()
     
+    def start_clock(self):
+        """
+        Marks the moment the simulation starts ticking. A resumed run
+        carries on counting from where it was.
+
+        """
+        now = perf_counter()
+        self.start_counter = now - self.clock_offset
+        self.last_tick_counter = now
+
+    def record_tick(self, barrier_wait=None, straggler_wait=None,
+                    sample=True):
+        """
+        Records that every creature finished a timestep. Only called by the
+        last creature to reach the barrier (or the scheduler) so the tick
+        counters don't need the lock. Also moves the events of the tick into
+        the totals, writes out the streamed rows if they have waited long
+        enough and samples the population.
+
+        Args:
+        - barrier_wait (float): Total seconds creatures waited at the barrier
+        this tick, if a barrier was used.
+        - straggler_wait (float): Seconds the first creature to arrive waited
+        for the last one.
+        - sample (bool): Whether to sample the population (the sharded
+        engine samples the population of the whole world itself).
+
+        """
+        self.flush_events()
+        self.ticks += 1
+        self.last_tick_counter = perf_counter()
+        if self.output is not None:
+            with self.lock:
+                if self.output is not None:
+                    self.output.maybeFlush()
+        if sample:
+            self.sample()
+        if barrier_wait is not None:
+            self.barrier_ticks += 1
+            self.total_barrier_wait += barrier_wait
+            self.total_straggler_wait += straggler_wait
+            self.max_straggler_wait = max(self.max_straggler_wait,
+                                          straggler_wait)
+
+    def record_ticks(self, ticks):
+        """
+        Records that a number of timesteps finished somewhere else (e.g. in
+        the tile processes of the sharded engine).
+
+        Args:
+        - ticks (int): The number of timesteps.
+
+        """
+        self.ticks += ticks
+        self.last_tick_counter = perf_counter()
+
+    def ticks_per_second(self):
+        """
+        Calculates the average tick rate of the simulation so far.
+
+        Returns:
+        - float: Ticks per second, or 0 if no time has passed.
+
+        """
+        elapsed = self.last_tick_counter - self.start_counter
+        if elapsed <= 0:
+            return 0
+        return self.ticks / elapsed
+
     def collect_stats(self, event_type, creature):
         """
         Aggregates statistics based on the type of event occurred.
@@ -77,67 +331,213 @@ class StatsCollector:
         elif event_type == 'Rabbit was eaten':
             self.total_rabbits_eaten += 1
     
-    def time_difference_in_seconds(self, start_time, end_time):
+    def export(self):
         """
-        Calculates the difference in seconds between two time objects.
+        Packs up the events and totals collected so far so they can be sent
+        to another process and merged there.
+
+        Returns:
+        - dict: The events and totals.
+
+        """
+        self.flush_events()
+        with self.lock:
+            return {
+                'events': self.events.export(),
+                'total_foxes_born': self.total_foxes_born,
+                'total_foxes_died': self.total_foxes_died,
+                'total_rabbits_born': self.total_rabbits_born,
+                'total_rabbits_died': self.total_rabbits_died,
+                'total_rabbits_eaten': self.total_rabbits_eaten,
+                'total_rabbit_generations': self.total_rabbit_generations,
+                'born_rabbit_speed': (self.total_rabbit_speed -
+                                      self.initial_rabbit_speed),
+                'average_fox_speed': self.average_fox_speed,
+                'phase_timers': (self.phase_timers.export()
+                                 if self.phase_timers is not None else {}),
+                'locks': (self.lock_profiler.export()
+                          if self.lock_profiler is not None else {}),
+                'births': (self.births.export()
+                           if self.births is not None else None),
+            }
+
+    def merge(self, other):
+        """
+        Adds the events and totals exported by another stats collector to
+        this one. Only the starting population of this collector counts.
 
         Args:
-        - start_time (datetime.time): Start time.
-        - end_time (datetime.time): End time.
+        - other (dict): The result of another collector's export().
+
+        """
+        self.flush_events()
+        with self.lock:
+            self.events.merge(other['events'])
+            self.total_foxes_born += other['total_foxes_born']
+            self.total_foxes_died += other['total_foxes_died']
+            self.total_rabbits_born += other['total_rabbits_born']
+            self.total_rabbits_died += other['total_rabbits_died']
+            self.total_rabbits_eaten += other['total_rabbits_eaten']
+            self.total_rabbit_generations = max(
+                self.total_rabbit_generations,
+                other['total_rabbit_generations'])
+            self.total_rabbit_speed += other['born_rabbit_speed']
+            self.average_rabbit_speed = self.total_rabbit_speed / (
+                self.initial_num_rabbit + self.total_rabbits_born)
+            self.average_fox_speed += other['average_fox_speed']
+            if self.phase_timers is not None:
+                self.phase_timers.merge(other['phase_timers'])
+            if self.lock_profiler is not None:
+                self.lock_profiler.merge(other['locks'])
+            if self.births is not None and other['births'] is not None:
+                self.births.merge(other['births'])
+
+    def checkpoint_state(self):
+        """
+        Copies what a checkpoint needs to carry on the stats later. Must only
+        be called between ticks, once the tick is recorded.
 
         Returns:
-        - float: Difference in seconds.
+        - tuple: The totals (a dict that can be saved as JSON), the event
+        log's columns and the births' columns (None without a run file).
 
         """
-        # Convert time objects to datetime objects for calculation
-        start_datetime = datetime.combine(datetime.today(), start_time)
-        end_datetime = datetime.combine(datetime.today(), end_time)
+        self.flush_events()
+        with self.lock:
+            state = {name: getattr(self, name) for name in CHECKPOINT_TOTALS}
+            state['population'] = list(self.population)
+            state['dropped'] = list(self.events.dropped)
+            state['tick_timestamps'] = self.tick_timestamps
+            state['seconds'] = self.last_tick_counter - self.start_counter
+            state['start_ns'] = self.start_ns
+            state['elapsed_ns'] = monotonic_ns() - self.start_ns
+            births = self.births.arrays() if self.births is not None else None
+            return state, self.events.arrays(), births
 
-        # Calculate the difference
-        time_difference = end_datetime - start_datetime
+    def restore_state(self, state, events, births=None):
+        """
+        Carries on the stats saved by checkpoint_state(). If the population
+        is being streamed (open_output()), the rows of the saved events are
+        written first.
 
-        # Extract the difference in seconds
-        difference_seconds = time_difference.total_seconds()
-        
-        return difference_seconds
+        Args:
+        - state (dict): The totals.
+        - events (dict): The event log's columns.
+        - births (dict): The births' columns, if they were saved.
 
+        """
+        with self.lock:
+            for name in CHECKPOINT_TOTALS:
+                setattr(self, name, state[name])
+            self.population = list(state['population'])
+            self.clock_offset = state['seconds']
+            # pretend the run started elapsed_ns ago so event times carry on
+            # from the checkpoint, and move the saved events to match
+            self.start_ns = monotonic_ns() - state['elapsed_ns']
+            shift = self.start_ns - state['start_ns']
+            if not state['tick_timestamps'] and shift:
+                events = dict(events, timestamp=array(
+                    'q', [timestamp + shift
+                          for timestamp in events['timestamp']]))
+            self.events.load(events, state['dropped'])
+            if self.births is not None and births is not None:
+                self.births.load(births)
+            if self.output is not None:
+                for row in self._population_rows():
+                    self.output.writeRow(*row)
 
     # this function changed a number of times to collect various kinds of data
     # it is currently setup to record population metrics over time.
     def output_run_data(self):
         """
-        Outputs the run data to a CSV file.
+        Outputs the run data to a CSV file. If the data was streamed with
+        open_output() this only finishes the file, otherwise the whole file
+        is written from the event log (e.g. after merging the stats of the
+        sharded engine's processes). Also writes the run file, if there is
+        one.
 
         """
+        self.flush_events()
+        if self.output is not None:
+            self.close_output()
+        else:
+            self._write_run_data()
+            if self.sampler is not None:
+                self.sampler.close()
+        if self.run_file is not None:
+            with self.lock:
+                write_run_file(self.run_file, self.run_parameters,
+                               self.tick_timestamps, self._population_rows(),
+                               len(self.events), self.births)
+        if (self.phase_timers is not None and
+                self.phase_timers.json_path is not None):
+            self.phase_timers.dump(self.phase_timers.json_path)
+
+    def _population_rows(self):
+        # the time and the plant, rabbit and fox populations after each event
+        # in the event log
         plant_pop = self.initial_num_plants
         rabbit_pop = self.initial_num_rabbit
         fox_pop =self.initial_num_foxes
+        # if the event log is capped, start from the populations after the
+        # events that were dropped from it
+        for code, n in enumerate(self.events.dropped):
+            d_plant, d_rabbit, d_fox = CODE_POPULATION_CHANGE[code]
+            plant_pop += n * d_plant
+            rabbit_pop += n * d_rabbit
+            fox_pop += n * d_fox
+        for timestamp, code, _, _, _ in self.events.records():
+            d_plant, d_rabbit, d_fox = CODE_POPULATION_CHANGE[code]
+            plant_pop += d_plant
+            rabbit_pop += d_rabbit
+            fox_pop += d_fox
+            yield self._when(timestamp), plant_pop, rabbit_pop, fox_pop
+
+    def _write_run_data(self):
         file_path = 'output.csv'
         with open(file_path, 'w') as file:
-            for event in self.events:
-                if event['event_type'] == 'New rabbit born':
-                    rabbit_pop += 1
-                elif event['event_type'] == 'Rabbit passed away':
-                    rabbit_pop -= 1
-                elif event['event_type'] == 'New plant born':
-                    plant_pop += 1
-                elif event['event_type'] == 'plant eaten':
-                    plant_pop -= 1
-                elif event['event_type'] == 'New fox born':
-                    fox_pop += 1
-                elif event['event_type'] == 'Fox passed away':
-                    fox_pop -= 1
-                file.write(str(self.time_difference_in_seconds(
-                            self.startTime, event['timestamp'])) +
-                            "," + str(plant_pop) + "," + str(rabbit_pop) +
-                            "," + str(fox_pop) + "\n")
+            for when, plant_pop, rabbit_pop, fox_pop in \
+                    self._population_rows():
+                file.write(str(when) + "," + str(plant_pop) + "," +
+                           str(rabbit_pop) + "," + str(fox_pop) + "\n")
         
     
+    def summary(self):
+        """
+        Gathers the final stats print_stats() prints, along with the
+        populations at the end.
+
+        Returns:
+        - dict: The stats by name. average_fox_speed is None if no fox died.
+
+        """
+        self.flush_events()
+        with self.lock:
+            plant_pop, rabbit_pop, fox_pop = self.population
+            return {
+                'plants': plant_pop,
+                'rabbits': rabbit_pop,
+                'foxes': fox_pop,
+                'total_foxes_born': self.total_foxes_born,
+                'total_foxes_died': self.total_foxes_died,
+                'total_rabbits_born': self.total_rabbits_born,
+                'total_rabbits_eaten': self.total_rabbits_eaten,
+                'total_rabbits_died': self.total_rabbits_died,
+                'average_rabbit_speed': self.average_rabbit_speed,
+                'average_fox_speed': (
+                    self.average_fox_speed / self.total_foxes_died
+                    if self.total_foxes_died > 0 else None),
+                'rabbit_generations': self.total_rabbit_generations,
+                'ticks': self.ticks,
+                'ticks_per_second': self.ticks_per_second(),
+            }
+
     def print_stats(self):
         """
         Prints the final statistics for the simulation.
 
         """
+        self.flush_events()
         print("FINAL STATS FOR THIS SIMULATION: ")
         print("Total Foxes Born: ", self.total_foxes_born)
         print("Total Foxes Died: ", self.total_foxes_died)
@@ -150,4 +550,20 @@ class StatsCollector:
         if (self.total_foxes_died > 0):
             avg_fox_speed = self.average_fox_speed / self.total_foxes_died
             print("Average Fox speed: ", avg_fox_speed)
-        print("Total Rabbit Generations: ", self.total_rabbit_generations)
\ No newline at end of file
+        print("Total Rabbit Generations: ", self.total_rabbit_generations)
+        if self.rabbit_gene_means:
+            print("Mean Genes Of Living Rabbits: ")
+            for name, mean in self.rabbit_gene_means.items():
+                print("  " + name + ": ", mean)
+        print("Ticks Completed: ", self.ticks)
+        print("Ticks Per Second: ", self.ticks_per_second())
+        if self.barrier_ticks > 0:
+            print("Average Barrier Wait Per Tick (s): ",
+                  self.total_barrier_wait / self.barrier_ticks)
+            print("Average Straggler Delay Per Tick (s): ",
+                  self.total_straggler_wait / self.barrier_ticks)
+            print("Worst Straggler Delay (s): ", self.max_straggler_wait)
+        if self.phase_timers is not None and self.phase_timers.enabled:
+            self.phase_timers.printReport()
+        if self.lock_profiler is not None:
+            self.lock_profiler.printReport(self.ticks)
\ No newline at end of file
@@ -0,0 +1,359 @@
+import argparse
+import ast
+import csv
+import hashlib
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from time import perf_counter
+
+
+
+# Runs the simulation headless over and over with different parameters (see
+# --set and SIM_PARAMETERS in global_stuff.py) and collects the final stats of
+# every run in one CSV. Like in benchmark.py, every run happens in its own
+# python process, in a directory of its own (so its output.csv doesn't clash
+# with the others), and --jobs of them run at once.
+#
+#   $ python3 sweep.py --grid plantRate=0.1,0.13,0.2
+#         --random foxRate=0.0005:0.002 --samples 5 --replicates 3
+#         --ticks 5000 -- --foxes 10
+#
+# writes sweep/results.csv with a row per run and sweep/runs/<run>/output.csv
+# with each run's population over time. Running the same command again only
+# runs what isn't in results.csv yet.
+
+# what each row of results.csv has after the run, the seed and the parameters
+SUMMARY_COLUMNS = ('ticks', 'extinction_tick', 'plants', 'rabbits', 'foxes',
+                   'total_rabbits_born', 'total_rabbits_eaten',
+                   'total_rabbits_died', 'total_foxes_born',
+                   'total_foxes_died', 'rabbit_generations',
+                   'average_rabbit_speed', 'average_fox_speed',
+                   'ticks_per_second', 'wall_time_s', 'output')
+
+
+
+
+###################### Sweep Points ######################
+
+def parse_grid(spec):
+    """
+    Args:
+    - spec (str): NAME=V1,V2,... where every value is a python literal.
+
+    Returns:
+    - tuple: The name and the list of values.
+
+    Raises:
+    - argparse.ArgumentTypeError: If spec can't be read.
+
+    """
+    name, _, values = spec.partition('=')
+    try:
+        values = ast.literal_eval('[' + values + ']')
+    except (ValueError, SyntaxError):
+        values = None
+    if not name or not values:
+        raise argparse.ArgumentTypeError(
+            "%s doesn't look like NAME=V1,V2,..." % spec)
+    return name, values
+
+def parse_range(spec):
+    """
+    Args:
+    - spec (str): NAME=LOW:HIGH. If both are integers, only integers are
+    drawn.
+
+    Returns:
+    - tuple: The name, low and high.
+
+    Raises:
+    - argparse.ArgumentTypeError: If spec can't be read.
+
+    """
+    name, _, bounds = spec.partition('=')
+    try:
+        low, high = (ast.literal_eval(bound) for bound in bounds.split(':'))
+    except (ValueError, SyntaxError):
+        name = None
+    if (not name or not all(isinstance(bound, (int, float))
+                            for bound in (low, high)) or low > high):
+        raise argparse.ArgumentTypeError(
+            "%s doesn't look like NAME=LOW:HIGH" % spec)
+    return name, low, high
+
+def sweep_points(grid, ranges, samples, rng):
+    """
+    Lists every combination of parameters to run.
+
+    Args:
+    - grid (list): (name, values) for each parameter on the grid.
+    - ranges (list): (name, low, high) for each parameter drawn at random.
+    - samples (int): How many random draws to make for every grid point.
+    - rng (random.Random): Where the random draws come from.
+
+    Returns:
+    - list: A dict of parameter values for each point.
+
+    """
+    points = [dict(zip([name for name, _ in grid], values))
+              for values in itertools.product(*[v for _, v in grid])]
+    if not ranges:
+        return points
+    sampled = []
+    for point in points:
+        for _ in range(samples):
+            drawn = dict(point)
+            for name, low, high in ranges:
+                if isinstance(low, int) and isinstance(high, int):
+                    drawn[name] = rng.randint(low, high)
+                else:
+                    drawn[name] = rng.uniform(low, high)
+            sampled.append(drawn)
+    return sampled
+
+def run_id(spec):
+    """
+    Args:
+    - spec (dict): Everything that decides what a run does.
+
+    Returns:
+    - str: A short name for the run that's the same every time the sweep is
+    started.
+
+    """
+    key = json.dumps(spec, sort_keys=True).encode()
+    return hashlib.sha1(key).hexdigest()[:12]
+
+
+
+
+###################### Runs ######################
+
+def run_one(spec):
+    """
+    Runs one simulation in this process, in the current directory, and
+    prints its summary as JSON.
+
+    Args:
+    - spec (dict): The command line of the run ('argv').
+
+    """
+    import simulation
+    from global_stuff import parse_args
+    from world import World
+
+    world = World(parse_args(spec['argv']))
+    start = perf_counter()
+    simulation.main(world=world)
+    summary = world.stats_collector.summary()
+    summary['wall_time_s'] = perf_counter() - start
+    print(json.dumps(summary))
+
+def run_child(spec, run_dir):
+    """
+    Runs this file again in a new process, in run_dir, for one run of the
+    sweep.
+
+    Args:
+    - spec (dict): See run_one.
+    - run_dir (str): Where the run writes its files.
+
+    Returns:
+    - dict: The summary printed by the new process.
+
+    """
+    os.makedirs(run_dir, exist_ok=True)
+    result = subprocess.run([sys.executable, os.path.abspath(__file__),
+                             '--run-one', json.dumps(spec)],
+                            cwd=run_dir, stdin=subprocess.DEVNULL,
+                            capture_output=True, text=True)
+    # keep what the simulation printed (its final stats) next to its output
+    with open(os.path.join(run_dir, 'stats.txt'), 'w') as file:
+        file.write(result.stdout)
+        file.write(result.stderr)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1]
+                           if result.stderr.strip() else
+                           "exited with status %d" % result.returncode)
+    # the summary is the last thing printed
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+
+
+###################### Results ######################
+
+def read_done(path, columns):
+    """
+    Finds the runs an earlier start of the sweep already finished.
+
+    Args:
+    - path (str): The results CSV.
+    - columns (list): The columns the CSV should have.
+
+    Returns:
+    - set: The names of the finished runs.
+
+    Raises:
+    - ValueError: If the CSV was written by a different sweep.
+
+    """
+    if not os.path.exists(path):
+        return set()
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames != columns:
+            raise ValueError("%s was written by a sweep over different "
+                             "parameters" % path)
+        return {row['run'] for row in reader}
+
+def result_row(name, replicate, seed, point, summary, output):
+    """
+    Builds the results row of a finished run.
+
+    Returns:
+    - dict: The row, by column.
+
+    """
+    row = {'run': name, 'replicate': replicate, 'seed': seed}
+    row.update(point)
+    row.update({column: summary.get(column) for column in SUMMARY_COLUMNS})
+    # the animals died out before the ticks ran out
+    if summary['rabbits'] + summary['foxes'] == 0:
+        row['extinction_tick'] = summary['ticks']
+    row['output'] = output
+    return row
+
+
+
+
+###################### Main ######################
+
+def main():
+    parser = argparse.ArgumentParser(description=
+                    "Run the simulation headless over a grid or a random "
+                    "sample of its parameters.")
+    parser.add_argument('--grid', metavar='NAME=V1,V2,...', action='append',
+                        type=parse_grid, default=[],
+                        help="""Run every one of these values of a parameter
+                                (in every combination with the other --grid
+                                parameters); Can be given more than once""")
+    parser.add_argument('--random', metavar='NAME=LOW:HIGH', action='append',
+                        type=parse_range, default=[],
+                        help="""Draw a parameter uniformly between LOW and
+                                HIGH, --samples times for every grid point;
+                                Can be given more than once""")
+    parser.add_argument('--samples', type=int, default=10,
+                        help="Random draws per grid point")
+    parser.add_argument('--replicates', type=int, default=3,
+                        help="""Runs of every point, each with its own seed
+                                (--seed, --seed + 1, ...)""")
+    parser.add_argument('--ticks', type=int, default=5000,
+                        help="""Ticks to run for unless the animals die out
+                                first""")
+    parser.add_argument('--engine', default='pool',
+                        choices=['threads', 'pool', 'vector', 'sharded'],
+                        help="""Engine to run with; the pool engine runs on a
+                                single worker so seeded runs repeat exactly""")
+    parser.add_argument('--seed', type=int, default=1,
+                        help="Seed of the first replicate and random draws")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1,
+                        help="Runs at once; Defaults to the number of CPUs")
+    parser.add_argument('--out', default='sweep',
+                        help="Directory to write the results to")
+    parser.add_argument('sim_args', nargs=argparse.REMAINDER,
+                        help="""Arguments after -- are given to every run,
+                                e.g. -- --foxes 10 --width 800""")
+    # used when this file runs itself for a single run
+    parser.add_argument('--run-one', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_one:
+        run_one(json.loads(args.run_one))
+        return
+
+    sim_args = args.sim_args
+    if sim_args[:1] == ['--']:
+        sim_args = sim_args[1:]
+    names = []
+    for name in ([name for name, _ in args.grid] +
+                 [name for name, _, _ in args.random]):
+        if name in names:
+            parser.error("%s is swept more than once" % name)
+        names.append(name)
+    if not names:
+        parser.error("nothing to sweep; give --grid or --random")
+
+    points = sweep_points(args.grid, args.random, args.samples,
+                          random.Random(args.seed))
+    columns = ['run', 'replicate', 'seed'] + names + list(SUMMARY_COLUMNS)
+    results_path = os.path.join(args.out, 'results.csv')
+    try:
+        done = read_done(results_path, columns)
+    except ValueError as e:
+        parser.error("%s; use another --out" % e)
+
+    runs = []
+    for point in points:
+        for replicate in range(args.replicates):
+            seed = args.seed + replicate
+            argv = ['--headless', '--engine', args.engine,
+                    '--ticks', str(args.ticks), '--seed', str(seed)]
+            if args.engine == 'pool':
+                argv += ['--workers', '1']
+            for name, value in point.items():
+                argv += ['--set', f'{name}={value!r}']
+            spec = {'argv': argv + sim_args}
+            name = run_id(spec)
+            if name not in done:
+                runs.append((name, replicate, seed, point, spec))
+    print("%d runs, %d already done" % (len(points) * args.replicates,
+                                        len(points) * args.replicates -
+                                        len(runs)), file=sys.stderr)
+
+    os.makedirs(args.out, exist_ok=True)
+    failed = 0
+    with open(results_path, 'a', newline='') as file, \
+            ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        writer = csv.DictWriter(file, columns)
+        if file.tell() == 0:
+            writer.writeheader()
+        # every worker thread just waits on its own simulation process
+        futures = {pool.submit(run_child, spec,
+                               os.path.join(args.out, 'runs', name)):
+                   (name, replicate, seed, point)
+                   for name, replicate, seed, point, spec in runs}
+        for finished, future in enumerate(as_completed(futures), 1):
+            name, replicate, seed, point = futures[future]
+            try:
+                summary = future.result()
+            except RuntimeError as e:
+                failed += 1
+                print(f"[{finished}/{len(runs)}] {name} failed: {e}",
+                      file=sys.stderr)
+                continue
+            row = result_row(name, replicate, seed, point, summary,
+                             os.path.join('runs', name, 'output.csv'))
+            writer.writerow(row)
+            file.flush()
+            if row['extinction_tick'] is not None:
+                outcome = "died out at tick %d" % row['extinction_tick']
+            else:
+                outcome = "survived %d ticks" % row['ticks']
+            print(f"[{finished}/{len(runs)}] {name} {point} seed {seed}: "
+                  f"{outcome}", file=sys.stderr)
+
+    if failed:
+        print("%d runs failed; run the sweep again to retry them" % failed,
+              file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,719 @@
+import math
+import random
+from types import SimpleNamespace
+from global_stuff import *
+from gene import *
+from genome import GeneView, gene_means, genome_table, mutate_genomes
+
+# numpy is only needed for the vector engine so the threaded simulation still
+# runs without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+
+###################### Batched Kernels ######################
+
+# how many rows of a distance matrix we build at once. This keeps memory
+# bounded when there are thousands of creatures on each side
+CHUNK_SIZE = 1024
+
+# past this many (point, other) pairs checking every pair is slower than
+# sorting the others into a grid first
+GRID_PAIRS = 4096
+
+# how many others a grid cell holds on average. Every point checks the 9
+# cells around it so this keeps the pairs checked per point around 40
+GRID_CELL_LOAD = 4
+
+def _brute_nearest(points, others, own, rows, indices, distances):
+    """
+    Finds the closest point in others for the given points by checking every
+    pair, CHUNK_SIZE points at a time.
+
+    Args:
+    - points (np.ndarray): (n, 2) array of positions to search from.
+    - others (np.ndarray): (m, 2) array of positions to search.
+    - own (np.ndarray): The index of each point in others, or None if
+    points and others aren't the same array.
+    - rows (np.ndarray): The indices of the points to search from.
+    - indices (np.ndarray): Where the closest indices are written.
+    - distances (np.ndarray): Where the distances are written.
+
+    """
+    for start in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[start:start + CHUNK_SIZE]
+        diff = points[chunk, None, :] - others[None, :, :]
+        dist = np.sqrt((diff ** 2).sum(axis=2))
+        span = np.arange(len(chunk))
+        if own is not None:
+            dist[span, own[chunk]] = np.inf
+        best = dist.argmin(axis=1)
+        best_dist = dist[span, best]
+        indices[chunk] = np.where(np.isfinite(best_dist), best, -1)
+        distances[chunk] = best_dist
+
+def _grid_nearest(points, others, own, indices, distances):
+    """
+    Finds the closest point in others for every point in points by sorting
+    others into a grid and only checking the 3x3 cells around each point.
+    Anything outside those cells is at least a cell away, so a point whose
+    closest find is nearer than that has its answer. Ties go to the lowest
+    index, like argmin.
+
+    Args:
+    - points (np.ndarray): (n, 2) array of positions to search from.
+    - others (np.ndarray): (m, 2) array of positions to search.
+    - own (np.ndarray): The index of each point in others, or None if
+    points and others aren't the same array.
+    - indices (np.ndarray): Where the closest indices are written.
+    - distances (np.ndarray): Where the distances are written.
+
+    Returns:
+    - np.ndarray: The indices of the points that weren't settled, which
+    have to be searched the slow way.
+
+    """
+    m = len(others)
+    low = others.min(axis=0)
+    span = others.max(axis=0) - low
+    # the cell size is kept big enough that there are never more than a few
+    # cells per point, even when the others are all in a line
+    cell = max(math.sqrt(span[0] * span[1] * GRID_CELL_LOAD / m),
+               span.max() / m, 1.0)
+    cols = int(span[0] // cell) + 1
+    rows = int(span[1] // cell) + 1
+    keys = ((others[:, 1] - low[1]) // cell).astype(np.int64) * cols + \
+        ((others[:, 0] - low[0]) // cell).astype(np.int64)
+    order = np.argsort(keys, kind='stable')
+    counts = np.bincount(keys, minlength=cols * rows)
+    starts = np.cumsum(counts) - counts
+
+    point_col = ((points[:, 0] - low[0]) // cell).astype(np.int64)
+    point_row = ((points[:, 1] - low[1]) // cell).astype(np.int64)
+    unsettled = []
+    for start in range(0, len(points), CHUNK_SIZE * 8):
+        stop = min(start + CHUNK_SIZE * 8, len(points))
+        # the first other and number of others in each of the 9 cells
+        # around every point, as (points, 9) arrays
+        col = point_col[start:stop, None] + (-1, 0, 1, -1, 0, 1, -1, 0, 1)
+        row = point_row[start:stop, None] + (-1, -1, -1, 0, 0, 0, 1, 1, 1)
+        inside = (col >= 0) & (col < cols) & (row >= 0) & (row < rows)
+        key = np.where(inside, row * cols + col, 0)
+        first = starts[key].ravel()
+        count = np.where(inside, counts[key], 0).ravel()
+
+        # every (point, other) pair to check, grouped by point
+        total = count.sum()
+        point_count = count.reshape(-1, 9).sum(axis=1)
+        pair_point = np.repeat(np.arange(start, stop), point_count)
+        offset = np.arange(total) - np.repeat(np.cumsum(count) - count,
+                                              count)
+        pair_other = order[np.repeat(first, count) + offset]
+        diff = points[pair_point] - others[pair_other]
+        dist = np.sqrt((diff ** 2).sum(axis=1))
+        if own is not None:
+            dist[own[pair_point] == pair_other] = np.inf
+
+        # the closest distance of each point and the lowest index at it
+        found = point_count > 0
+        group = (np.cumsum(point_count) - point_count)[found]
+        best_dist = np.full(stop - start, np.inf)
+        best = np.full(stop - start, m)
+        if total:
+            best_dist[found] = np.minimum.reduceat(dist, group)
+            at_best = dist == np.repeat(best_dist, point_count)
+            best[found] = np.minimum.reduceat(
+                np.where(at_best, pair_other, m), group)
+        # leave a little room for rounding at the cell edges
+        settled = best_dist < cell * 0.999
+        indices[start:stop][settled] = best[settled]
+        distances[start:stop][settled] = best_dist[settled]
+        unsettled.append(np.flatnonzero(~settled) + start)
+    return np.concatenate(unsettled)
+
+def nearest_indices(points, others, exclude_self=False):
+    """
+    Finds the closest point in others for every point in points.
+
+    Args:
+    - points (np.ndarray): (n, 2) array of positions to search from.
+    - others (np.ndarray): (m, 2) array of positions to search.
+    - exclude_self (bool): True when points and others are the same array
+    so a point doesn't find itself.
+
+    Returns:
+    - tuple: (indices, distances). indices is -1 and distances is infinity
+    for points that have nothing to find.
+
+    """
+    n = len(points)
+    indices = np.full(n, -1, dtype=np.int64)
+    distances = np.full(n, np.inf)
+    if n == 0 or len(others) == 0:
+        return indices, distances
+    own = np.arange(n) if exclude_self else None
+    if n * len(others) > GRID_PAIRS:
+        rows = _grid_nearest(points, others, own, indices, distances)
+    else:
+        rows = np.arange(n)
+    _brute_nearest(points, others, own, rows, indices, distances)
+    return indices, distances
+
+def rabbit_movement_vectors(positions, speed, hunger, fear, avoid,
+                            plant_pos, fox_pos, rabbit_radius):
+    """
+    Computes the movement of every rabbit in one pass. This is the batched
+    version of Rabbit.generatePriorityList followed by
+    Creature.findMovementVector.
+
+    Args:
+    - positions (np.ndarray): (n, 2) rabbit positions.
+    - speed (np.ndarray): rabbit speeds (size_step).
+    - hunger (np.ndarray): rabbit hunger factors.
+    - fear (np.ndarray): rabbit fear factors.
+    - avoid (np.ndarray): rabbit avoid others factors.
+    - plant_pos (np.ndarray): (m, 2) plant positions.
+    - fox_pos (np.ndarray): (k, 2) fox positions.
+    - rabbit_radius (float): how far away rabbits avoid each other.
+
+    Returns:
+    - tuple: (dx, dy, food) where food is the index of each rabbit's closest
+    plant (-1 if there are no plants).
+
+    """
+    n = len(positions)
+    total = np.zeros((n, 2))
+    food, _ = nearest_indices(positions, plant_pos)
+    predator, _ = nearest_indices(positions, fox_pos)
+    other, other_dist = nearest_indices(positions, positions,
+                                        exclude_self=True)
+
+    def attract(mask, targets, scale):
+        # add scale / distance in the direction of each target, the same
+        # weighting findMovementVector uses. The sums are done in the same
+        # order as there too so both round the same way
+        d = targets - positions[mask]
+        mag = np.sqrt((d ** 2).sum(axis=1))
+        moving = mag > 0
+        contrib = np.zeros_like(d)
+        contrib[moving] = (d[moving] / mag[moving, None]
+                           * scale[mask][moving, None] / mag[moving, None])
+        total[mask] += contrib
+
+    has_food = food >= 0
+    if has_food.any():
+        attract(has_food, plant_pos[food[has_food]], hunger)
+    has_predator = predator >= 0
+    if has_predator.any():
+        attract(has_predator, fox_pos[predator[has_predator]], -fear)
+    crowded = (other >= 0) & (other_dist < rabbit_radius)
+    if crowded.any():
+        attract(crowded, positions[other[crowded]], -avoid)
+
+    # normalize the total and move one step in that direction
+    mag = np.sqrt((total ** 2).sum(axis=1))
+    moving = mag > 0
+    dx = np.zeros(n)
+    dy = np.zeros(n)
+    dx[moving] = total[moving, 0] / mag[moving] * speed[moving]
+    dy[moving] = total[moving, 1] / mag[moving] * speed[moving]
+    return dx, dy, food
+
+def fox_pursuit_vectors(positions, speed, rabbit_pos, avoid_others):
+    """
+    Computes the movement of every fox in one pass. This is the batched
+    version of Fox.moveForSurvival.
+
+    Args:
+    - positions (np.ndarray): (n, 2) fox positions.
+    - speed (np.ndarray): fox speeds (size_step).
+    - rabbit_pos (np.ndarray): (m, 2) rabbit positions.
+    - avoid_others (float): how strongly foxes avoid each other.
+
+    Returns:
+    - tuple: (dx, dy, food, wander). food is the index of the rabbit each fox
+    is chasing (-1 if it isn't chasing one) and wander is True for foxes
+    with nothing of interest that should move randomly.
+
+    """
+    n = len(positions)
+    food, food_dist = nearest_indices(positions, rabbit_pos)
+    predator, predator_dist = nearest_indices(positions, positions,
+                                              exclude_self=True)
+    wander = (food < 0) & (predator < 0)
+    chase = (food >= 0) & (food_dist * avoid_others <
+                           predator_dist * (1 - avoid_others))
+    flee = ~chase & (predator >= 0)
+
+    d = np.zeros((n, 2))
+    d[chase] = rabbit_pos[food[chase]] - positions[chase]
+    d[flee] = positions[flee] - positions[predator[flee]]
+    # don't move further than we can in one step
+    distance = np.sqrt((d ** 2).sum(axis=1))
+    too_far = distance > speed
+    d[too_far] = (d[too_far] / distance[too_far, None]
+                  * speed[too_far, None])
+    return d[:, 0], d[:, 1], np.where(chase, food, -1), wander
+
+class SpacingGrid:
+    def __init__(self, positions, spacing):
+        """
+        Initializes a SpacingGrid class object, which sorts the positions of
+        one species into cells spacing wide so checking whether a spot is
+        too close to any of them only looks at the 3x3 cells around it.
+
+        Args:
+        - positions (np.ndarray): (n, 2) positions of the species.
+        - spacing (float): The minimum distance between two creatures.
+
+        """
+        self.spacing = spacing
+        self.cell_size = max(spacing, 1)
+        self.cells = {}
+        for x, y in positions.tolist():
+            self.add(x, y)
+
+    def add(self, x, y):
+        """
+        Adds a position to the grid.
+
+        """
+        cell = (int(x // self.cell_size), int(y // self.cell_size))
+        self.cells.setdefault(cell, []).append((x, y))
+
+    def remove(self, x, y):
+        """
+        Removes a position from the grid.
+
+        """
+        cell = (int(x // self.cell_size), int(y // self.cell_size))
+        spots = self.cells[cell]
+        spots.remove((x, y))
+        if not spots:
+            del self.cells[cell]
+
+    def crowded(self, x, y):
+        """
+        Args:
+        - x (float): The x-coordinate of the spot.
+        - y (float): The y-coordinate of the spot.
+
+        Returns:
+        - bool: True if anything in the grid is within spacing of the spot.
+
+        """
+        col = int(x // self.cell_size)
+        row = int(y // self.cell_size)
+        cells = self.cells
+        for c in (col - 1, col, col + 1):
+            for r in (row - 1, row, row + 1):
+                for tx, ty in cells.get((c, r), ()):
+                    dx = tx - x
+                    dy = ty - y
+                    if math.sqrt(dx * dx + dy * dy) <= self.spacing:
+                        return True
+        return False
+
+
+
+
+###################### Vector World ######################
+
+# The vector world keeps the whole simulation in numpy arrays, one set of
+# arrays per species (a "structure of arrays"), instead of one thread per
+# creature. Every tick, all the rabbits and all the foxes are moved at once
+# with the kernels above. Births and deaths are rare compared to moves so
+# they are still handled one at a time. Like the creature objects looking at
+# their snapshot, every creature acts on the world as it was at the start of
+# the tick: newborns only show up the tick after they're born, and the dead
+# the tick after they die.
+class VectorWorld:
+    def __init__(self, world):
+        """
+        Initializes an empty VectorWorld class object
+
+        Args:
+        - world (World): The world whose parameters, stats collector and
+        random numbers are used.
+
+        """
+        if np is None:
+            raise RuntimeError("the vector engine needs numpy installed")
+        self.world = world
+        self.plant_pos = np.zeros((0, 2))
+        self.plant_food = np.zeros(0, dtype=np.int64)
+        self.plant_rate = np.zeros(0)
+        # the plants as a SpacingGrid for checking where seeds can land.
+        # Rabbits and foxes are sorted into a new one every tick they breed
+        # in because they move, but there are too many plants for that so
+        # this one is kept up to date as plants come and go
+        self.plant_spacing = None
+
+        self.rabbit_pos = np.zeros((0, 2))
+        self.rabbit_health = np.zeros(0)
+        # the genes of every rabbit, one row each (see genome.py)
+        self.rabbit_genome = genome_table([])
+
+        self.fox_pos = np.zeros((0, 2))
+        self.fox_health = np.zeros(0)
+        self.fox_speed = np.zeros(0)
+
+        # the vector engine steps every creature together so it has one
+        # random stream for the whole world instead of one per creature.
+        # Both are seeded from sim_random so seeded runs repeat exactly
+        self.rng = random.Random(world.sim_random.getrandbits(64))
+        self.np_rng = np.random.default_rng(world.sim_random.getrandbits(64))
+
+    @classmethod
+    def from_creatures(cls, world):
+        """
+        Builds a VectorWorld from the creature objects the threaded
+        simulation uses, so both engines can start from the same world.
+
+        Args:
+        - world (World): The world holding the creatures.
+
+        Returns:
+        - VectorWorld: The new world.
+
+        """
+        plants, rabbits, foxes = world.plants, world.rabbits, world.foxes
+        vector = cls(world)
+        vector.plant_pos = np.array([p.position for p in plants],
+                                    dtype=float).reshape(-1, 2)
+        vector.plant_food = np.array([p.foodValue for p in plants],
+                                     dtype=np.int64)
+        vector.plant_rate = np.array([p.reproduceRate for p in plants],
+                                     dtype=float)
+
+        vector.rabbit_pos = np.array([r.position for r in rabbits],
+                                     dtype=float).reshape(-1, 2)
+        vector.rabbit_health = np.array([r.health for r in rabbits],
+                                        dtype=float)
+        vector.rabbit_genome = genome_table([r.genes for r in rabbits])
+
+        vector.fox_pos = np.array([f.position for f in foxes],
+                                  dtype=float).reshape(-1, 2)
+        vector.fox_health = np.array([f.health for f in foxes], dtype=float)
+        vector.fox_speed = np.array([f.size_step for f in foxes], dtype=float)
+        return vector
+
+    def counts(self):
+        """
+        Returns:
+        - tuple: The number of plants, rabbits and foxes.
+
+        """
+        return len(self.plant_pos), len(self.rabbit_pos), len(self.fox_pos)
+
+    def gene_stats(self):
+        """
+        Returns:
+        - dict: The mean of each of the living rabbits' genes, from one
+        reduction over the genome table per gene.
+
+        """
+        return gene_means(self.rabbit_genome[self.rabbit_health > 0])
+
+    def _genNewPosition(self, x, y, minDist, maxDist, taken):
+        """
+        Vector engine version of Creature.genNewPosition.
+
+        Args:
+        - x (float): The x-coordinate of the parent.
+        - y (float): The y-coordinate of the parent.
+        - minDist (float): Minimum distance from the parent and from any
+        other creature of the same species.
+        - maxDist (float): Maximum distance from the parent.
+        - taken (SpacingGrid): The positions of the species, minDist apart.
+
+        Returns:
+        - tuple: The new x and y coordinates or (None, None).
+
+        """
+        angle = self.rng.uniform(0, 2 * math.pi)
+        distance = self.rng.uniform(minDist, maxDist)
+        x = int(x + distance * math.cos(angle))
+        y = int(y + distance * math.sin(angle))
+        if not self.world.check_bounds(x, y):
+            return None, None
+        if taken.crowded(x, y):
+            return None, None
+        return x, y
+
+    @staticmethod
+    def _subject(x, y, genes=None, size_step=0):
+        # log_event only needs a few attributes of the creature involved
+        return SimpleNamespace(position=[x, y], genes=genes,
+                               size_step=size_step)
+
+    def _stepPlants(self):
+        """
+        Lets every plant try to reproduce.
+
+        """
+        world = self.world
+        rolls = self.np_rng.random(len(self.plant_pos))
+        new_pos = []
+        if self.plant_spacing is None:
+            self.plant_spacing = SpacingGrid(self.plant_pos,
+                                             world.minPlantDistance)
+        taken = self.plant_spacing
+        for i in np.flatnonzero(rolls < self.plant_rate):
+            if len(self.plant_pos) + len(new_pos) >= world.maxPlants:
+                break
+            x, y = self._genNewPosition(self.plant_pos[i, 0],
+                                        self.plant_pos[i, 1],
+                                        world.minPlantDistance,
+                                        world.maxPlantDistance, taken)
+            if x and y:
+                world.stats_collector.log_event('New plant born',
+                                                self._subject(x, y))
+                new_pos.append((x, y))
+                taken.add(x, y)
+        if new_pos:
+            self.plant_pos = np.vstack([self.plant_pos, new_pos])
+            self.plant_food = np.concatenate(
+                [self.plant_food, np.full(len(new_pos), world.foodValue)])
+            self.plant_rate = np.concatenate(
+                [self.plant_rate, np.full(len(new_pos), world.plantRate)])
+
+    def _stepRabbits(self, seen_plants):
+        """
+        Removes the rabbits that died last tick, then moves every other
+        rabbit and lets them eat and reproduce.
+
+        Args:
+        - seen_plants (int): How many plants there were at the start of the
+        tick. Plants born this tick come after them and can't be seen yet.
+
+        Returns:
+        - np.ndarray: The row each rabbit of the start of the tick is in now,
+        or -1 if it was removed.
+
+        """
+        world = self.world
+        dx, dy, food = rabbit_movement_vectors(
+            self.rabbit_pos, self.rabbit_genome['speed'],
+            self.rabbit_genome['hungerFactor'],
+            self.rabbit_genome['fearFactor'],
+            self.rabbit_genome['avoidOthersFactor'],
+            self.plant_pos[:seen_plants], self.fox_pos, world.rabbitRadius)
+        # like the creature objects, a rabbit that died last tick is only
+        # removed on its next step, so the others still saw it this tick
+        rows = np.arange(len(self.rabbit_pos))
+        keep = self._removeDeadRabbits()
+        if keep is not None:
+            dx, dy, food = dx[keep], dy[keep], food[keep]
+            rows = np.where(keep, np.cumsum(keep) - 1, -1)
+        genome = self.rabbit_genome
+        pos = self.rabbit_pos
+        pos[:, 0] = np.clip(pos[:, 0] + dx, 0, world.canvas_width)
+        pos[:, 1] = np.clip(pos[:, 1] + dy, world.stat_bottom,
+                            world.canvas_height)
+
+        # eat a plant if it's close enough. if two rabbits reach the same
+        # plant in the same tick the first one gets it
+        has_food = food >= 0
+        close = np.zeros(len(pos), dtype=bool)
+        close[has_food] = np.sqrt(
+            ((pos[has_food] - self.plant_pos[food[has_food]]) ** 2)
+            .sum(axis=1)) < 5
+        for i in np.flatnonzero(close):
+            plant = food[i]
+            if self.plant_food[plant] > 0:
+                self.plant_food[plant] -= 1
+                if self.plant_food[plant] == 0:
+                    world.stats_collector.log_event(
+                        'plant eaten', self._subject(*self.plant_pos[plant]))
+                self.rabbit_health[i] = max(self.rabbit_health[i] +
+                                            world.rabbitMetabolism,
+                                            world.rabbitStomachSize)
+        eaten = self.plant_food <= 0
+        if eaten.any():
+            if self.plant_spacing is not None:
+                for x, y in self.plant_pos[eaten].tolist():
+                    self.plant_spacing.remove(x, y)
+            keep = ~eaten
+            self.plant_pos = self.plant_pos[keep]
+            self.plant_food = self.plant_food[keep]
+            self.plant_rate = self.plant_rate[keep]
+
+        # do reproduction
+        rolls = self.np_rng.random(len(pos))
+        breeders = np.flatnonzero((self.rabbit_health >
+                                   world.rabbitReproductionCutoff) &
+                                  (rolls < world.rabbitRate))
+        new_pos = []
+        parents = []
+        if len(breeders):
+            taken = SpacingGrid(pos, world.minRabbitDistance)
+        for i in breeders:
+            if len(pos) + len(new_pos) >= world.maxRabbits:
+                break
+            x, y = self._genNewPosition(pos[i, 0], pos[i, 1],
+                                        world.minRabbitDistance,
+                                        world.maxRabbitDistance, taken)
+            if x and y:
+                new_pos.append((x, y))
+                taken.add(x, y)
+                parents.append(i)
+
+        # mutate the genes of every child born this tick at once
+        children = mutate_genomes(genome[parents], self.np_rng)
+        for i, child in zip(parents, children):
+            # like the threaded rabbits, the parent is the creature reported
+            # for the birth
+            world.stats_collector.log_event(
+                'New rabbit born',
+                self._subject(pos[i, 0], pos[i, 1], GeneView(genome[i]),
+                              genome['speed'][i]),
+                GeneView(child))
+        # lose half the health we give to child
+        self.rabbit_health[parents] -= children['startingHealth'] / 2
+
+        # decriment our health each timestep to represent starvation
+        self.rabbit_health -= 1
+
+        if new_pos:
+            self.rabbit_pos = np.vstack([self.rabbit_pos, new_pos])
+            self.rabbit_health = np.concatenate(
+                [self.rabbit_health, children['startingHealth']])
+            self.rabbit_genome = np.concatenate([self.rabbit_genome,
+                                                 children])
+        return rows
+
+    def _removeDeadRabbits(self):
+        """
+        Removes every rabbit with no health left.
+
+        Returns:
+        - np.ndarray: Which rows were kept, or None if none were removed.
+
+        """
+        dead = self.rabbit_health <= 0
+        if not dead.any():
+            return None
+        for i in np.flatnonzero(dead):
+            self.world.stats_collector.log_event(
+                'Rabbit passed away', self._subject(*self.rabbit_pos[i]))
+        keep = ~dead
+        self.rabbit_pos = self.rabbit_pos[keep]
+        self.rabbit_health = self.rabbit_health[keep]
+        self.rabbit_genome = self.rabbit_genome[keep]
+        return keep
+
+    def _wander(self, indices):
+        """
+        Moves the given foxes one step in a random direction, like
+        Creature.generate_position.
+
+        """
+        world = self.world
+        for i in indices:
+            step = self.fox_speed[i]
+            while True:
+                direction = self.rng.randint(1, 4)
+                dx, dy = ((0, -step), (step, 0),
+                          (-step, 0), (0, step))[direction - 1]
+                x = self.fox_pos[i, 0] + dx
+                y = self.fox_pos[i, 1] + dy
+                if world.check_bounds(x, y):
+                    break
+            self.fox_pos[i] = (clamp(x, 0, world.canvas_width),
+                               clamp(y, world.stat_bottom,
+                                     world.canvas_height))
+
+    def _stepFoxes(self, seen_rabbits, rows):
+        """
+        Removes the foxes that died last tick, then moves every other fox
+        and lets them eat and reproduce.
+
+        Args:
+        - seen_rabbits (np.ndarray): Where the rabbits were at the start of
+        the tick, which is where the foxes see them.
+        - rows (np.ndarray): The row each of those rabbits is in now, or -1
+        if it was removed (see _stepRabbits).
+
+        """
+        world = self.world
+        dx, dy, food, wander = fox_pursuit_vectors(
+            self.fox_pos, self.fox_speed, seen_rabbits, world.avoidOthers)
+        # foxes that died last tick were still seen, like dead rabbits
+        dead = self.fox_health <= 0
+        if dead.any():
+            for i in np.flatnonzero(dead):
+                world.stats_collector.log_event(
+                    'Fox passed away',
+                    self._subject(*self.fox_pos[i],
+                                  size_step=self.fox_speed[i]))
+            keep = ~dead
+            dx, dy, food, wander = dx[keep], dy[keep], food[keep], wander[keep]
+            self.fox_pos = self.fox_pos[keep]
+            self.fox_health = self.fox_health[keep]
+            self.fox_speed = self.fox_speed[keep]
+        pos = self.fox_pos
+        pos[:, 0] = np.clip(pos[:, 0] + dx, 0, world.canvas_width)
+        pos[:, 1] = np.clip(pos[:, 1] + dy, world.stat_bottom,
+                            world.canvas_height)
+        self._wander(np.flatnonzero(wander))
+
+        # eat the rabbit we're chasing if we caught up with where we saw it,
+        # it's still alive and another fox didn't get it first
+        for i in np.flatnonzero(food >= 0):
+            rabbit = rows[food[i]]
+            if (math.dist(pos[i], seen_rabbits[food[i]]) < 1 and
+                    rabbit >= 0 and self.rabbit_health[rabbit] > 0):
+                self.rabbit_health[rabbit] = 0
+                world.stats_collector.log_event('Rabbit was eaten',
+                                                self._subject(*pos[i]))
+                self.fox_health[i] = max(self.fox_health[i] +
+                                         world.foxMetabolism,
+                                         world.foxStomachSize)
+
+        # do reproduction
+        rolls = self.np_rng.random(len(pos))
+        breeders = np.flatnonzero((self.fox_health >
+                                   world.foxReproductionCutoff) &
+                                  (rolls < world.foxRate))
+        new_pos = []
+        if len(breeders):
+            taken = SpacingGrid(pos, world.minFoxDistance)
+        for i in breeders:
+            world.stats_collector.log_event(
+                'New fox born', self._subject(*pos[i],
+                                              size_step=world.foxSpeed))
+            if len(pos) + len(new_pos) >= world.maxFoxes:
+                continue
+            x, y = self._genNewPosition(pos[i, 0], pos[i, 1],
+                                        world.minFoxDistance,
+                                        world.maxFoxDistance, taken)
+            if x and y:
+                new_pos.append((x, y))
+                taken.add(x, y)
+
+        self.fox_health -= 1
+
+        if new_pos:
+            self.fox_pos = np.vstack([self.fox_pos, new_pos])
+            self.fox_health = np.concatenate(
+                [self.fox_health, np.full(len(new_pos), world.health)])
+            self.fox_speed = np.concatenate(
+                [self.fox_speed, np.full(len(new_pos), world.foxSpeed)])
+
+    def step(self):
+        """
+        Runs one timestep for every creature in the world.
+
+        """
+        # like the snapshot the creature objects look at, plants born this
+        # tick only show up next tick. They are added after the others
+        seen_plants = len(self.plant_pos)
+        # and the foxes chase the rabbits where they were when it started
+        seen_rabbits = self.rabbit_pos.copy()
+        self._stepPlants()
+        rows = self._stepRabbits(seen_plants)
+        self._stepFoxes(seen_rabbits, rows)
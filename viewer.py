@@ -0,0 +1,153 @@
+import argparse
+import tkinter as tk
+from raster import PixelBuffer, creature_shapes, tk_color, np
+from shared_view import SharedViewReader
+
+
+
+# Shows a simulation running in another process that was started with
+# --share (see shared_view.py). It doesn't import global_stuff, so it never
+# touches the simulation itself; closing the window just detaches. It can be
+# started before the simulation, while it runs, or more than once.
+
+# the same stat box colors as the simulation's window
+STAT_COLORS = ("#91c795", "#7c9feb", "#ff8585")
+STAT_NAMES = ("PLANTS", "RABBITS", "FOXES")
+
+###################### Viewer ######################
+
+class Viewer:
+    def __init__(self, window, name, fps=60):
+        """
+        Initializes a Viewer class object
+
+        Args:
+        - window (tk.Tk): The window to draw in.
+        - name (str): The name the simulation shares its view under.
+        - fps (float): How many frames to draw per second.
+
+        """
+        self.window = window
+        self.name = name
+        self.frame_ms = max(int(1000 / fps), 1)
+        self.reader = None
+        self.canvas = None
+        self.last_tick = None
+        window.title("Foxes, Rabbits, & Plants Viewer")
+
+    def start(self):
+        """
+        Starts looking for the simulation and drawing its frames.
+
+        """
+        self.poll()
+
+    def attach(self):
+        """
+        Attaches to the simulation and sets up the canvas at its size.
+
+        Returns:
+        - bool: False if there's no simulation to attach to yet.
+
+        """
+        try:
+            self.reader = SharedViewReader(self.name)
+        except FileNotFoundError:
+            return False
+        width, height = self.reader.width, self.reader.height
+        if self.canvas is not None:
+            self.canvas.destroy()
+        self.canvas = tk.Canvas(self.window, width=width, height=height,
+                                bg="white")
+        self.canvas.pack()
+        self.buffer = PixelBuffer(width, height)
+        self.photo = tk.PhotoImage(master=self.canvas, width=width,
+                                   height=height)
+        self.canvas.create_image(0, 0, anchor='nw', image=self.photo)
+        self.plant_pixels, self.rabbit_pixels, self.fox_pixels = \
+            creature_shapes()
+        self.background = tk_color(self.window, "white")
+        self.plant_color = tk_color(self.window, "green")
+        self.fox_color = tk_color(self.window, "red")
+        # the stat boxes, laid out like the simulation's
+        stat_height = int(height * .1)
+        self.stat_text = []
+        for i, color in enumerate(STAT_COLORS):
+            x1 = width * i / 3
+            x2 = width * (i + 1) / 3
+            self.canvas.create_rectangle(x1, 0, x2, stat_height, fill=color,
+                                         outline="")
+            self.stat_text.append(self.canvas.create_text(
+                (x1 + x2) / 2, stat_height / 2, fill="black",
+                font=("Arial", max(int(stat_height / 6), 1))))
+        return True
+
+    def poll(self):
+        """
+        Draws the newest frame if there is one and schedules the next poll.
+
+        """
+        if self.reader is None and not self.attach():
+            self.window.title("Waiting for a simulation shared as %s" %
+                              self.name)
+            self.window.after(1000, self.poll)
+            return
+        frame = self.reader.read()
+        if frame is not None and frame[0] != self.last_tick:
+            self.draw(*frame)
+        if self.reader.finished():
+            self.window.title("Simulation ended (tick %s)" % self.last_tick)
+            self.reader.close()
+            return
+        self.window.after(self.frame_ms, self.poll)
+
+    def draw(self, tick, counts, records):
+        """
+        Draws a frame.
+
+        Args:
+        - tick (int): The tick of the frame.
+        - counts (list): The number of plants, rabbits and foxes.
+        - records (numpy.ndarray): The creatures (see
+        shared_view.record_dtype).
+
+        """
+        self.last_tick = tick
+        self.window.title("Foxes, Rabbits, & Plants Viewer - tick %d" % tick)
+        buffer = self.buffer
+        buffer.clear(self.background)
+        positions = np.stack([records['x'], records['y']], axis=1)
+        species = records['species']
+        plants = species == 0
+        rabbits = species == 1
+        foxes = species == 2
+        buffer.stamp(positions[plants], self.plant_pixels, self.plant_color)
+        colors = np.stack([records['r'], records['g'], records['b']],
+                          axis=1)[rabbits]
+        buffer.stamp(positions[rabbits], self.rabbit_pixels, colors)
+        buffer.stamp(positions[foxes], self.fox_pixels, self.fox_color)
+        self.photo.configure(data=buffer.ppm(), format='PPM')
+        for text, name, count in zip(self.stat_text, STAT_NAMES, counts):
+            self.canvas.itemconfig(text, text="%s\npopulation: %d" %
+                                   (name, count))
+
+
+
+
+###################### Main ######################
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=
+                        "Watch a simulation started with --share.")
+    parser.add_argument('--name', default='foxes-rabbits-plants',
+                        help="The name given to --share")
+    parser.add_argument('--fps', type=float, default=60,
+                        help="Frames drawn per second")
+    args = parser.parse_args()
+
+    window = tk.Tk()
+    viewer = Viewer(window, args.name, args.fps)
+    viewer.start()
+    window.mainloop()
+    if viewer.reader is not None:
+        viewer.reader.close()
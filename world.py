@@ -0,0 +1,299 @@
+import random
+import threading
+from global_stuff import *
+from stats_collector import StatsCollector
+from snapshot import SnapshotBuffer, WorldSnapshot
+from barrier import TickBarrier
+from phase_timers import PhaseTimers
+from lock_profiler import LockProfiler
+from sampler import RollupSampler
+from pacer import TickPacer
+from shared_view import SharedViewWriter
+from checkpoint import Checkpointer
+
+
+
+# A World is one simulation: its options and parameters, the creatures in it
+# and everything they share (the locks, the snapshot they look at, the stats
+# collector, the barrier and so on). Creatures are given the world they live
+# in, so any number of worlds can be built and run in the same process:
+#
+#   >>> from global_stuff import parse_args
+#   >>> from world import World
+#   >>> import simulation
+#   >>> world = World(parse_args(['--headless', '--ticks', '500']),
+#   ...               {'plantRate': 0.2})
+#   >>> simulation.main(report=False, world=world)
+#   >>> world.stats_collector.summary()
+#
+# Every simulation parameter (see SIM_PARAMETERS in global_stuff.py) is an
+# attribute of the world, e.g. world.maxRabbits.
+
+###################### World ######################
+
+class World:
+    def __init__(self, args=None, parameters=None):
+        """
+        Initializes a World class object
+
+        Args:
+        - args (argparse.Namespace): The options of the run, from
+        parse_args(). Defaults to the default options.
+        - parameters (dict): Simulation parameters to change on top of
+        args.set, e.g. {'plantRate': 0.2}.
+
+        """
+        if args is None:
+            args = parse_args([])
+        self.args = args
+        self.n_plants = args.plants
+        self.n_rabbits = args.rabbits
+        self.n_foxes = args.foxes
+        self.headless = args.headless
+        self.tick_budget = args.ticks
+        self.engine = args.engine
+        self.n_workers = args.workers
+        self.n_tiles = args.tiles
+        self.seed = args.seed
+        self.fps = args.fps
+        self.renderer_type = args.renderer
+        if args.tick_rate is None:
+            self.tick_rate = None if self.headless else 100
+        else:
+            self.tick_rate = args.tick_rate or None
+        self.phase_timing = args.phase_timing or args.phase_json is not None
+
+        # the simulation parameters become attributes of the world
+        self.parameters = sim_parameters(args.set or ())
+        self.parameters.update(parameters or {})
+        for name, value in self.parameters.items():
+            setattr(self, name, value)
+
+        # create a genome for the starting population
+        self.rabbitStartingGenes = [self.rabbitMutationRate,
+                                    self.rabbitMetabolism,
+                                    self.rabbitStomachSize, self.rabbitSpeed,
+                                    self.rabbitRate,
+                                    self.rabbitReproductionCutoff,
+                                    self.fearFactor, self.hungerFactor,
+                                    self.avoidOthersFactor, self.rabbitColor,
+                                    self.rabbitHealth, self.generation]
+
+        self.canvas_height = args.height
+        self.canvas_width = args.width
+        self.stat_height = int(self.canvas_height * .1)
+        # y-coord of bottom count boxes
+        self.stat_bottom = int(self.stat_height + 10)
+
+        # the window is only opened by open_window() so headless worlds never
+        # touch tkinter
+        self.window = None
+        self.canvas = None
+
+        # hands out the shared locks below. With --lock-profile they keep
+        # track of how much they are fought over, otherwise they are plain
+        # threading.Locks
+        self.lock_profiler = LockProfiler(args.lock_profile)
+
+        # every creature draws its random numbers from its own random.Random.
+        # The starting creatures get theirs from this one and children get
+        # theirs from their parent, so given a seed every creature always sees
+        # the same numbers no matter which thread steps it. Without a seed the
+        # OS picks one
+        self.sim_random = random.Random(self.seed)
+
+        # these lists are super important. Creatures have acess to these lists
+        # and use them to locate other creatures among a number of other
+        # useful things
+        self.rabbits = []
+        self.plants = []
+        self.foxes = []
+
+        # how many creatures of each species live in other processes (only
+        # used by the sharded engine). The population caps count these too
+        self.remote_population = {'plants': 0, 'rabbits': 0, 'foxes': 0}
+
+        # protect the above lists
+        self.rabbit_lock = self.lock_profiler.lock('rabbit_lock')
+        self.plant_lock = self.lock_profiler.lock('plant_lock')
+        self.fox_lock = self.lock_profiler.lock('fox_lock')
+
+        # signal the end of the simulation
+        self.sim_done = False
+        self.sim_done_event = threading.Event()
+
+        # the TickScheduler that runs every creature when using the pool
+        # engine. When this is None every creature runs in its own thread
+        self.scheduler = None
+
+        # the snapshot of the world creatures look at while deciding what to
+        # do. It is replaced at the end of every tick (see publish_snapshot)
+        self.world_view = SnapshotBuffer()
+
+        # how long creatures spend in each phase of a timestep. Creatures
+        # check phase_timing before touching it so it costs nothing when it's
+        # off
+        self.phase_timers = PhaseTimers(self.phase_timing, args.phase_json)
+
+        # boils the population down to fixed intervals (--sample-ticks or
+        # --sample-seconds), otherwise None
+        if args.sample_ticks is not None:
+            self.sampler = RollupSampler(args.sample_ticks, 'ticks')
+        elif args.sample_seconds is not None:
+            self.sampler = RollupSampler(args.sample_seconds, 's')
+        else:
+            self.sampler = None
+
+        # the parameters of this run, saved in the header of the run file and
+        # of checkpoints
+        self.run_parameters = dict(vars(args), **self.parameters,
+                                   canvas_height=self.canvas_height,
+                                   canvas_width=self.canvas_width,
+                                   stat_bottom=self.stat_bottom)
+        self.run_parameters.pop('resume_header', None)
+
+        self.stats_collector = StatsCollector(
+            self.n_rabbits, self.n_plants, self.n_foxes, self.rabbitSpeed,
+            self.fearFactor, self.hungerFactor,
+            tick_timestamps=self.seed is not None,
+            phase_timers=self.phase_timers,
+            lock=self.lock_profiler.lock('stats_lock'),
+            lock_profiler=self.lock_profiler,
+            event_cap=args.event_cap,
+            sampler=self.sampler,
+            run_file=args.run_file,
+            run_parameters=self.run_parameters)
+
+        # saves the world every --checkpoint-every ticks (--checkpoint),
+        # otherwise None
+        if args.checkpoint is not None:
+            self.checkpointer = Checkpointer(args.checkpoint,
+                                             args.checkpoint_every,
+                                             self.run_parameters)
+        else:
+            self.checkpointer = None
+
+        # where the world is shared for viewer.py (--share), otherwise None
+        if args.share is not None:
+            self.shared_view = SharedViewWriter(
+                args.share, self.maxPlants + self.maxRabbits + self.maxFoxes,
+                self.canvas_width, self.canvas_height)
+        else:
+            self.shared_view = None
+
+        # keeps the simulation to --tick-rate and handles pausing, stepping
+        # and fast-forwarding (see listen_to_user_input)
+        self.tick_pacer = TickPacer(self.tick_rate)
+
+        # every creature thread waits here at the end of each timestep
+        self.tick_barrier = TickBarrier(
+            self.end_tick, self.lock_profiler.lock('barrier_lock'))
+
+    def open_window(self):
+        """
+        Opens the simulation's window with a canvas the size of the world.
+
+        """
+        import tkinter as tk
+        self.window = tk.Tk()
+        self.window.title("Foxes, Rabbits, & Plants Simulation")
+        self.canvas = tk.Canvas(self.window, width=self.canvas_width,
+                                height=self.canvas_height, bg="white")
+        self.canvas.pack()
+
+    def check_bounds(self, col, row):
+        """
+        Checks if a given column and row are within the bounds of the canvas.
+
+        Args:
+        - col (int): Column value.
+        - row (int): Row value.
+
+        Returns:
+        - bool: True if the column and row are within the bounds, False
+        otherwise.
+
+        """
+        # We had a problem where things could spawn at x = 0 but not move
+        # there so plants and rabbits would be attracted to the top and left
+        # sides of screen and changing the minimum spawn location to x = 1
+        # not 0 fixed the issue
+        if col < 1 or col > self.canvas_width:
+            return False
+        elif row < self.stat_bottom or row > self.canvas_height:
+            return False
+        else:
+            return True
+
+    def publish_snapshot(self, ghost_plants=(), ghost_rabbits=(),
+                         ghost_foxes=(), plant_owns=None):
+        """
+        Takes a snapshot of every creature's position and health and makes it
+        the one creatures look at. Must only be called between ticks.
+
+        Args:
+        - ghost_plants (list): Extra plants to show in the snapshot that
+        aren't in this process (used by the sharded engine). Same for the
+        other ghosts.
+        - ghost_rabbits (list): Extra rabbits to show in the snapshot.
+        - ghost_foxes (list): Extra foxes to show in the snapshot.
+        - plant_owns (function): Returns False for plant spots that belong to
+        another process (see SpeciesView).
+
+        """
+        # spatial grids let creatures find their closest neighbours without
+        # looking at every creature. Plants are packed about minPlantDistance
+        # apart and animals mostly care about things within rabbitRadius, so
+        # those make good cell sizes
+        self.world_view.publish(WorldSnapshot(
+            self.plants + list(ghost_plants),
+            self.rabbits + list(ghost_rabbits),
+            self.foxes + list(ghost_foxes),
+            self.minPlantDistance, self.rabbitRadius, plant_owns))
+        if self.shared_view is not None:
+            self.shared_view.publish(self.stats_collector.ticks,
+                                     self.world_view.current)
+
+    def checkpoint_tick(self, order=None):
+        """
+        Takes a checkpoint if one is due. Must only be called between ticks,
+        after the tick is recorded.
+
+        Args:
+        - order (list): The creatures in the order they are stepped (the pool
+        engine). By default the plants, then the rabbits, then the foxes.
+
+        """
+        if self.checkpointer is None:
+            return
+        ticks = self.stats_collector.ticks
+        if not self.checkpointer.due(ticks) and (self.tick_budget is None or
+                                                 ticks < self.tick_budget):
+            return
+        if order is None:
+            order = self.plants + self.rabbits + self.foxes
+        self.checkpointer.save(ticks, self.sim_random, self.plants,
+                               self.rabbits, self.foxes, self.stats_collector,
+                               order)
+
+    def end_tick(self, barrier_wait, straggler_wait):
+        """
+        Runs once at the end of every tick of the threaded simulation, by the
+        last creature to reach the barrier.
+
+        Args:
+        - barrier_wait (float): Total seconds creatures waited at the
+        barrier.
+        - straggler_wait (float): Seconds the first creature to arrive waited
+        for the last one.
+
+        """
+        self.stats_collector.record_tick(barrier_wait, straggler_wait)
+        self.publish_snapshot()
+        self.checkpoint_tick()
+        # stop once we've used up our tick budget
+        if (self.tick_budget is not None and
+                self.stats_collector.ticks >= self.tick_budget):
+            self.sim_done_event.set()
+        else:
+            self.tick_pacer.pace()